@@ -2,12 +2,11 @@
 import os
 import re
 import cv2
-import torch
 import pytesseract
 from pdf2image import convert_from_path
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+from hf_classifier import HFSanskritClassifier
 
 # === CONFIGURATION ===
 pdf_path = r"C:\Users\divya\Desktop\project\pdf2.pdf"
@@ -18,7 +17,9 @@ os.makedirs(temp_image_dir, exist_ok=True)
 # === LOAD LLM CLASSIFIER ===
 print("Loading classification model...")
 model_name = "naver/splade-cocondenser-ensembledistil"  # replace with Sanskrit/English classifier
-classifier = pipeline("text-classification", model=model_name, tokenizer=model_name, device=0 if torch.cuda.is_available() else -1)
+# Batched by page, length-sorted and cached; see hf_classifier
+# Pages are OCR'd one at a time below, so one Tesseract process shares the CPU.
+classifier = HFSanskritClassifier(model_name, threshold=0.75, max_chars=250, device="auto", ocr_workers=1)
 
 # === CLEANING UTILS ===
 def clean_ocr_text(text):
@@ -38,9 +39,10 @@ def remove_ascii_borders(text):
     return "\n".join(cleaned_lines)
 
 # === LLM FILTERED TRANSLITERATION ===
-def transliterate_if_sanskrit(line):
-    pred = classifier(line[:250])[0]  # Use first 250 chars
-    if pred['label'].lower() == "sanskrit" and pred['score'] > 0.75:
+def transliterate_if_sanskrit(line, is_sanskrit=None):
+    if is_sanskrit is None:
+        is_sanskrit = classifier(line)  # Uses first 250 chars
+    if is_sanskrit:
         iast = transliterate(line, sanscript.ITRANS, sanscript.IAST)
         dev = transliterate(iast, sanscript.IAST, sanscript.DEVANAGARI)
         return f"→ {iast}\n→ {dev}"
@@ -61,12 +63,14 @@ for i, image in enumerate(images):
     text = clean_ocr_text(ocr_text)
     text = remove_ascii_borders(text)
 
-    lines = text.splitlines()
-    processed = [transliterate_if_sanskrit(line.strip()) for line in lines if line.strip()]
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    flags = classifier.classify_many(lines)  # whole page in one batched call
+    processed = [transliterate_if_sanskrit(line, is_san) for line, is_san in zip(lines, flags)]
     all_output += f"\n--- Page {i+1} ---\n" + "\n".join(processed) + "\n"
 
 # === SAVE FINAL OUTPUT ===
 with open("output_llm.txt", "w", encoding="utf-8") as f:
     f.write(all_output)
 
+print(classifier.report())
 print("LLM-based transliteration complete. See output_llm.txt")
@@ -0,0 +1,400 @@
+import os
+import io
+import csv
+import json
+import time
+import random
+import re
+import argparse
+import platform
+import subprocess
+import tempfile
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from instrumentation import RunMetrics
+
+# === CONFIGURATION ===
+SUTRA_DB_PATH = "sutras_db.csv"
+SUTRA_DEVANAGARI_DB_PATH = "sutras_db_devanagari.csv"
+RESULTS_DIR = os.path.join("benchmarks", "results")
+# Fonts must cover IAST diacritics and Devanagari; missing glyphs only affect OCR quality, not timing.
+FONT_PATHS = [
+    r"C:\Windows\Fonts\Nirmala.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+DEVANAGARI_FONT_PATHS = [
+    r"C:\Windows\Fonts\Nirmala.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+    "/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf",
+]
+PAGE_SIZE = (1700, 2200)  # ~200 dpi letter page
+FONT_SIZE = 28
+BOOK_VERSES = 2000  # verse parsers are also timed on a book-length text
+BENCH_LLM_SERVER = "127.0.0.1:50299"
+
+ENGLISH_PROSE = [
+    "Perception is that knowledge which arises from the contact of a sense with its object.",
+    "Inference is knowledge which is preceded by perception, and is of three kinds.",
+    "Comparison is the knowledge of a thing through its similarity to another thing previously well known.",
+    "Verbal testimony is the instructive assertion of a reliable person.",
+    "The objects of right knowledge are soul, body, senses, objects of sense, intellect and mind.",
+    "Desire, aversion, volition, pleasure, pain and intelligence are the marks of the soul.",
+    "Doubt is a conflicting judgment about the precise character of an object.",
+    "Purpose is that with an eye to which one proceeds to act.",
+]
+
+
+# === SYNTHETIC CONTENT ===
+def load_sutras(roman_path=SUTRA_DB_PATH, devanagari_path=SUTRA_DEVANAGARI_DB_PATH):
+    """Returns ``[(sutra_no, iast, devanagari)]`` from the two sutra databases."""
+    def read(path):
+        with open(path, encoding="utf-8") as f:
+            return {row[0].strip(): row[1].strip() for row in csv.reader(f) if len(row) >= 2}
+
+    roman = read(roman_path)
+    devanagari = read(devanagari_path)
+    return [(no, roman[no], devanagari.get(no, "")) for no in roman]
+
+
+def _wrap(text, width=70):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def synthetic_page_text(rng, sutras, verses_per_page=4):
+    """Page text laid out like the books: sutra number, IAST, Devanagari, synonyms, translation."""
+    start = rng.randrange(0, max(1, len(sutras) - verses_per_page))
+    lines = ["BOOK I — CHAPTER I", ""]
+    for no, iast, devanagari in sutras[start:start + verses_per_page]:
+        book, chapter, verse = no.split(".")
+        lines.append(no)
+        lines.extend(_wrap(iast))
+        if devanagari:
+            lines.extend(_wrap(f"{devanagari} ॥{book}।{chapter}।{verse}॥"))
+        words = iast.replace("-", " ").split()[:4]
+        lines.append("; ".join(f"{w} -- {rng.choice(['perception', 'knowledge', 'doubt', 'soul'])}" for w in words))
+        lines.append("TRANSLATION")
+        lines.extend(_wrap(" ".join(rng.sample(ENGLISH_PROSE, 3))))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _load_font(paths, size):
+    for path in paths:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default()
+
+
+def render_synthetic_page(text, noise=8.0, skew=0.5, seed=0):
+    """Draws page text onto a white image, then adds Gaussian noise and rotates by ``skew`` degrees."""
+    font = _load_font(FONT_PATHS, FONT_SIZE)
+    devanagari_font = _load_font(DEVANAGARI_FONT_PATHS, FONT_SIZE)
+    image = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    y = 80
+    for line in text.splitlines():
+        has_devanagari = any("\u0900" <= ch <= "\u097F" for ch in line)
+        draw.text((100, y), line, fill=0, font=devanagari_font if has_devanagari else font)
+        y += int(FONT_SIZE * 1.5)
+        if y > PAGE_SIZE[1] - 80:
+            break
+    pixels = np.asarray(image, dtype=np.float32)
+    if noise:
+        pixels = pixels + np.random.default_rng(seed).normal(0, noise, pixels.shape)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    if skew:
+        image = image.rotate(skew, resample=Image.BICUBIC, fillcolor=255)
+    return image
+
+
+# === STUB LLM ===
+class StubLlama:
+    """Stands in for llama_cpp.Llama: fixed latency, deterministic label."""
+
+    grammar_text = True     # ignores the grammar; its labels already match llm_grammar's
+
+    def __init__(self, latency=0.002):
+        self.latency = latency
+
+    def __call__(self, prompt, max_tokens=1, stop=None, **kwargs):
+        time.sleep(self.latency)
+        is_sanskrit = any(ch in prompt for ch in "āīūṛṣṇśḥṃ") or any("\u0900" <= ch <= "\u097F" for ch in prompt)
+        text = " Sanskrit" if is_sanskrit else " English"
+        return {"choices": [{"text": text}], "usage": {"total_tokens": len(prompt) // 4 + max_tokens}}
+
+
+# === STAGE BENCHMARKS ===
+def _time(metrics, name, fn, repeat):
+    result = None
+    for _ in range(repeat):
+        with metrics.stage(name):
+            result = fn()
+    return result
+
+
+def run_benchmarks(pages=5, repeat=3, noise=8.0, skew=0.5, seed=0, with_ocr=True):
+    """Times every stage on the same synthetic pages; returns a JSON-ready dict."""
+    rng = random.Random(seed)
+    sutras = load_sutras()
+    texts = [synthetic_page_text(rng, sutras) for _ in range(pages)]
+    metrics = RunMetrics("benchmark")
+    skipped = {}
+
+    images = [_time(metrics, "render", lambda t=t, i=i: render_synthetic_page(t, noise, skew, seed + i), 1)
+              for i, t in enumerate(texts)]
+
+    # --- Preprocess profiles & OCR ---
+    try:
+        import pipeline_stages as ps
+    except ImportError as e:
+        ps = None
+        skipped["preprocess"] = skipped["ocr"] = skipped["classify"] = str(e)
+    if ps is not None:
+        for profile in ps.PREPROCESS_PROFILES:
+            for image in images:
+                _time(metrics, f"preprocess/{profile}", lambda: ps.preprocess_page(0, image, profile), repeat)
+        if with_ocr:
+            import pytesseract
+            try:
+                pytesseract.get_tesseract_version()
+                for image in images:
+                    _time(metrics, "ocr/image_to_string", lambda: pytesseract.image_to_string(image, lang="eng"), 1)
+                    _time(metrics, "ocr/ocr_result", lambda: ps.ocr_page(0, image, lang="eng"), 1)
+            except pytesseract.TesseractNotFoundError as e:
+                skipped["ocr"] = str(e)
+
+        # Model-backed stage with the stub LLM.
+        ps._llama = StubLlama()
+        blocks = [[line for line in t.splitlines() if line.strip()] for t in texts]
+        for block in blocks:
+            _time(metrics, "classify/stub_llm", lambda: ps.classify_blocks(0, [block], model_path=None), 1)
+        ps._llama = None
+
+        # Same stub latency per decode, but through llm_server, which batches a page's lines.
+        import llm_server
+        server = llm_server.start_llm_server("stub", BENCH_LLM_SERVER)
+        try:
+            for block in blocks:
+                _time(metrics, "classify/stub_llm_server",
+                      lambda: ps.classify_blocks(0, [block], model_path=None, server=BENCH_LLM_SERVER), 1)
+        finally:
+            server.terminate()
+
+    # --- Text stages (run on the source text, so they need no Tesseract) ---
+    full_text = "\n".join(texts)
+    try:
+        import csv_for5
+    except ImportError as e:
+        csv_for5 = None
+        skipped["clean"] = skipped["parse"] = skipped["csv_write"] = skipped["parse/book"] = str(e)
+
+    if csv_for5 is not None:
+        _time(metrics, "clean/csv_for5", lambda: csv_for5.clean_text(csv_for5.remove_ascii_borders(full_text)), repeat)
+        rows = _time(metrics, "parse/csv_for5", lambda: csv_for5.extract_verses(full_text), repeat)
+        out_path = os.path.join(tempfile.mkdtemp(), "bench.csv")
+        _time(metrics, "csv_write", lambda: csv_for5.write_csv([dict(r) for r in rows], out_path), repeat)
+
+        # Line-tokenized verse parsers on a book-length text (cold transliteration cache).
+        book_rng = random.Random(seed)
+        book_text = "\n".join(synthetic_page_text(book_rng, sutras) for _ in range(BOOK_VERSES // 4))
+        try:
+            import try_csv
+            import transliteration
+            for _ in range(repeat):
+                transliteration.clear_cache()
+                _time(metrics, "parse/csv_for5_book", lambda: csv_for5.extract_verses(book_text), 1)
+            _time(metrics, "parse/try_csv_book", lambda: try_csv.parse_sections(book_text), repeat)
+        except ImportError as e:
+            skipped["parse/book"] = str(e)
+
+    # csv_full's layout puts a (Vs. x.y.z) marker ahead of each verse.
+    try:
+        import csv_full
+        vs_pages = [re.sub(r"(?m)^(\d+\.\d+\.\d+)$", r"(Vs. \1)\n\1", t) for t in texts]
+        vs_text = "\n".join(vs_pages) + "\n"
+        _time(metrics, "parse/csv_full/whole_text",
+              lambda: csv_full.extract_structured_data(csv_full.clean_text(vs_text)), repeat)
+        _time(metrics, "parse/csv_full/streamed", lambda: list(csv_full.iter_structured_rows(vs_pages)), repeat)
+    except ImportError as e:
+        skipped["parse/csv_full"] = str(e)
+
+    # Chained replaces vs the compiled rule sets, over the page text and the IAST sutras.
+    import substitution
+    sutra_text = "\n".join(f"{iast} {devanagari}" for _, iast, devanagari in sutras)
+    for engine in substitution.ENGINES:
+        for label, text in (("pages", full_text), ("sutras", sutra_text)):
+            _time(metrics, f"substitute/{engine.name}/{label}/chained", lambda: engine.apply_chained(text), repeat)
+            _time(metrics, f"substitute/{engine.name}/{label}/compiled", lambda: engine.apply(text), repeat)
+
+    from line_filter import LineFilter, BORDER_RULES, GIBBERISH_RULES, CONTENT_RULES, ASCII_ART_RULES
+    from line_scorer import LineScorer
+    filters = {
+        "borders": LineFilter(BORDER_RULES, keep_stripped=True),
+        "gibberish": LineFilter(GIBBERISH_RULES),
+        "content": LineFilter(CONTENT_RULES, default="drop", keep_stripped=True),
+        "ascii_art": LineFilter(ASCII_ART_RULES),
+        "line_scorer": LineScorer(),
+    }
+    for name, line_filter in filters.items():
+        _time(metrics, f"filter/{name}", lambda: line_filter(full_text), repeat)
+
+    try:
+        from indic_transliteration import sanscript
+        from indic_transliteration.sanscript import transliterate
+        roman_lines = [iast for _, iast, _ in sutras]
+
+        def double_call():
+            for line in roman_lines:
+                iast = transliterate(line, sanscript.ITRANS, sanscript.IAST)
+                transliterate(iast, sanscript.IAST, sanscript.DEVANAGARI)
+
+        _time(metrics, "transliterate/indic_double_call", double_call, repeat)
+
+        import transliteration
+
+        def compiled_dual():
+            for line in roman_lines:
+                transliteration.itrans_to_iast_devanagari(line)
+
+        for _ in range(repeat):
+            transliteration.clear_cache()
+            _time(metrics, "transliterate/compiled_dual_cold", compiled_dual, 1)
+        _time(metrics, "transliterate/compiled_dual_warm", compiled_dual, repeat)
+
+        # Inline glossary swap with every sutra word as a term; build cost is paid once.
+        glossary = {w.strip(",.;-"): w for line in roman_lines for w in line.split()}
+        inline = _time(metrics, "transliterate/inline_build",
+                       lambda: transliteration.InlineTransliterator(glossary), 1)
+        page_lines = full_text.splitlines()
+        _time(metrics, "transliterate/inline_words", lambda: [inline.convert(l) for l in page_lines], repeat)
+
+        # Glossary scan cost should not grow with the number of terms.
+        from glossary import Glossary
+        vocabulary = sorted(glossary)
+        for size in (10, 1000, len(vocabulary)):
+            terms = Glossary.from_dict({w: w for w in vocabulary[:size]})
+            _time(metrics, f"glossary/find_{size}_terms", lambda: terms.find(full_text), repeat)
+    except ImportError as e:
+        skipped["transliterate"] = str(e)
+
+    # Side-output writes: reopening the file per line vs the buffered sink.
+    from text_sink import TextSink
+    sink_dir = tempfile.mkdtemp()
+    corpus_lines = [iast for _, iast, _ in sutras]
+
+    def open_per_line():
+        for line in corpus_lines:
+            with open(os.path.join(sink_dir, "per_line.txt"), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def buffered():
+        with TextSink(os.path.join(sink_dir, "sink.txt")) as sink:
+            for line in corpus_lines:
+                sink.write_line(line)
+
+    _time(metrics, "sink/open_per_line", open_per_line, repeat)
+    _time(metrics, "sink/buffered", buffered, repeat)
+
+    # LM backends on one model built from the sutra corpus; candidates as correct_with_kenlm makes them.
+    import lm_corpus
+    import lm_scoring
+    lm_dir = tempfile.mkdtemp()
+    lm_corpus.build_model({"sutras": corpus_lines}, lm_dir, order=3)
+    lm_path = lm_corpus.latest_model(lm_dir)
+    candidates = [" ".join(words[:i] + [words[i].lower()] + words[i + 1:])
+                  for words in (line.split() for line in corpus_lines) for i in range(len(words))]
+    for backend in ("ngram", "kenlm"):
+        start = time.perf_counter()
+        try:
+            model = lm_scoring.load_lm(lm_path, backend)
+        except (ImportError, FileNotFoundError) as e:
+            skipped[f"lm/{backend}"] = str(e)
+            continue
+        metrics.record(f"lm/{backend}/load", time.perf_counter() - start)   # only loads that succeeded
+        _time(metrics, f"lm/{backend}/score", lambda: [model.score(c) for c in candidates], repeat)
+        _time(metrics, f"lm/{backend}/score_batch", lambda: lm_scoring.score_batch(model, candidates), repeat)
+
+    report = metrics.report()
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"pages": pages, "repeat": repeat, "noise": noise, "skew": skew, "seed": seed},
+        "stages": report["stages"],
+        "skipped": skipped,
+    }
+
+
+# === RESULTS ===
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save_results(results, out_dir=RESULTS_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = results["timestamp"].replace(":", "").replace("-", "")
+    path = os.path.join(out_dir, f"{stamp}_{results['commit']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare(old_path, new_path):
+    """Prints per-stage median time of two result files side by side."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    out = io.StringIO()
+    print(f"{'stage':<34}{old['commit']:>12}{new['commit']:>12}{'speedup':>10}", file=out)
+    for name in sorted(set(old["stages"]) | set(new["stages"])):
+        a = old["stages"].get(name, {}).get("p50_s")
+        b = new["stages"].get(name, {}).get("p50_s")
+        speedup = f"{a / b:.2f}x" if a and b else "-"
+        print(f"{name:<34}{a if a is not None else '-':>12}{b if b is not None else '-':>12}{speedup:>10}", file=out)
+    return out.getvalue()
+
+
+# === MAIN ===
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic pages.")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--noise", type=float, default=8.0)
+    parser.add_argument("--skew", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-ocr", action="store_true", help="skip Tesseract stages")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare(*args.compare))
+        return
+
+    results = run_benchmarks(args.pages, args.repeat, args.noise, args.skew, args.seed, not args.no_ocr)
+    path = save_results(results)
+    for name, s in sorted(results["stages"].items()):
+        print(f"{name:<34} p50={s['p50_s'] * 1000:9.2f} ms  n={s['count']}")
+    for name, reason in results["skipped"].items():
+        print(f"⚠️ Skipped {name}: {reason}")
+    print(f"✅ Results saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import re
+
+from ocr_result import LOW_CONFIDENCE
+
+# === CONFIGURATION ===
+ENGLISH_WORDS_PATH = r"C:\Users\divya\Desktop\project\english_words.txt"
+# Words of context sent on each side of a suspect span.
+CONTEXT_WORDS = 4
+# Suspect spans closer than this many words are merged into one request item.
+MERGE_DISTANCE = 1
+# Per-word log10 probability below which the language model flags a word.
+LM_WORD_THRESHOLD = -6.0
+
+_WORD_CORE = re.compile(r"[^\w\u0900-\u097F]+")
+# Devanagari or IAST diacritics: words the Sanskrit LM can vouch for without a dictionary.
+_SANSKRIT_MARKS = re.compile(r"[\u0900-\u097Fāīūṛṝḷḹṅñṭḍṇśṣṃṁḥ]")
+_ANSWER_LINE = re.compile(r"^\s*(\d+)[.)]\s*(.*)$")
+_PROMPT_HEADER = (
+    "Each numbered item below is OCR text from a scanned book on Nyaya philosophy. "
+    "Only the words inside [[ ]] may contain OCR errors. Correct ONLY those words. "
+    "Do not change Sanskrit words in Devanagari or IAST unless they are clearly misread. "
+    "Reply with one line per item in the form '<number>. <corrected words>' and nothing else.\n\n"
+)
+
+
+# === DICTIONARY ===
+def load_wordlist(path=ENGLISH_WORDS_PATH):
+    """Loads a one-word-per-line dictionary into a lowercase set."""
+    if not os.path.exists(path):
+        print(f"⚠️ Word list not found at {path}; only OCR confidence will be used.")
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
+
+# === STATS ===
+class GateStats:
+    """Tracks how much of the OCR text was flagged, and how much was actually sent to the LLM."""
+
+    def __init__(self):
+        self.pages = 0
+        self.words_total = 0
+        self.words_suspect = 0
+        self.chars_total = 0
+        self.chars_span = 0        # characters of the suspect spans themselves
+        self.chars_sent = 0        # whole prompts: spans, their context and the instructions
+        self.calls = 0             # every request made, failed ones included
+        self.failed = 0
+
+    def fraction_span(self):
+        return self.chars_span / self.chars_total if self.chars_total else 0.0
+
+    def fraction_sent(self):
+        return self.chars_sent / self.chars_total if self.chars_total else 0.0
+
+    def report(self):
+        return (f"Gated LLM correction: {self.pages} pages, {self.calls} calls ({self.failed} failed), "
+                f"{self.words_suspect}/{self.words_total} words suspect, "
+                f"{self.chars_span}/{self.chars_total} chars in suspect spans ({self.fraction_span():.1%}), "
+                f"{self.chars_sent} chars sent with context and prompt ({self.fraction_sent():.1%} of the text)")
+
+
+# === SUSPECT DETECTION ===
+def is_suspect_word(word, conf, dictionary, lm=None, threshold=LOW_CONFIDENCE):
+    """A word is suspect when Tesseract is unsure or neither the dictionary nor the LM knows it.
+
+    Without a dictionary the LM is asked only about words that look like
+    Sanskrit; scored by a Sanskrit LM, every English word would be flagged.
+    """
+    core = _WORD_CORE.sub("", word).lower()
+    if not core or core.isdigit():
+        return False
+    if conf < threshold:
+        return True
+    if not dictionary and lm is None:
+        return False
+    if core in dictionary:
+        return False
+    if lm is not None and (dictionary or _SANSKRIT_MARKS.search(core)):
+        return lm.score(core, bos=False, eos=False) < LM_WORD_THRESHOLD
+    return bool(dictionary)
+
+
+def find_suspect_spans(ocr, dictionary, lm=None, threshold=LOW_CONFIDENCE):
+    """Returns merged ``(start, end)`` word ranges that should go to the LLM."""
+    spans = []
+    for i in range(len(ocr)):
+        if not is_suspect_word(ocr.word(i), float(ocr.conf[i]), dictionary, lm, threshold):
+            continue
+        if spans and i - spans[-1][1] <= MERGE_DISTANCE and ocr.line_ids[i] == ocr.line_ids[spans[-1][0]]:
+            spans[-1] = (spans[-1][0], i + 1)
+        else:
+            spans.append((i, i + 1))
+    return spans
+
+
+# === PROMPT ===
+def build_span_prompt(ocr, spans):
+    """One prompt per page listing every suspect span with its local context."""
+    items = []
+    for n, (start, end) in enumerate(spans, start=1):
+        left = " ".join(ocr.word(i) for i in range(max(0, start - CONTEXT_WORDS), start))
+        span = " ".join(ocr.word(i) for i in range(start, end))
+        right = " ".join(ocr.word(i) for i in range(end, min(len(ocr), end + CONTEXT_WORDS)))
+        items.append(f"{n}. {left} [[{span}]] {right}".strip())
+    return _PROMPT_HEADER + "\n".join(items)
+
+
+def parse_span_answers(answer, count):
+    """Maps item numbers to corrected text; missing or malformed items are skipped."""
+    corrections = {}
+    for line in answer.splitlines():
+        match = _ANSWER_LINE.match(line)
+        if not match:
+            continue
+        n = int(match.group(1))
+        text = match.group(2).replace("[[", "").replace("]]", "").strip()
+        if 1 <= n <= count and text:
+            corrections[n] = text
+    return corrections
+
+
+# === SPLICING ===
+def splice_corrections(ocr, spans, corrections):
+    """Rebuilds the page text line by line with corrected spans put back in place."""
+    replacement_at = {}
+    for n, (start, end) in enumerate(spans, start=1):
+        if n in corrections:
+            replacement_at[start] = (end, corrections[n])
+
+    lines = []
+    starts = ocr.line_starts()
+    for line_no in range(len(starts) - 1):
+        words = []
+        i = starts[line_no]
+        line_end = starts[line_no + 1]
+        while i < line_end:
+            if i in replacement_at:
+                end, text = replacement_at[i]
+                words.append(text)
+                i = end
+            else:
+                words.append(ocr.word(i))
+                i += 1
+        lines.append(" ".join(words))
+    return "\n".join(lines)
+
+
+# === GATED CORRECTION ===
+def gated_correct(ocr, ask_llm, dictionary, lm=None, stats=None, threshold=LOW_CONFIDENCE):
+    """Sends only suspect spans of a page to ``ask_llm(prompt) -> str`` and splices the answers back."""
+    spans = find_suspect_spans(ocr, dictionary, lm, threshold)
+    page_text = ocr.text()
+    if stats is not None:
+        stats.pages += 1
+        stats.words_total += len(ocr)
+        stats.words_suspect += sum(end - start for start, end in spans)
+        stats.chars_total += len(page_text)
+    if not spans:
+        return page_text
+
+    prompt = build_span_prompt(ocr, spans)
+    if stats is not None:
+        stats.calls += 1
+        stats.chars_span += sum(len(ocr.word(i)) for start, end in spans for i in range(start, end))
+        stats.chars_sent += len(prompt)
+    try:
+        answer = ask_llm(prompt)
+    except Exception as e:
+        print(f"   ❌ Gated AI correction failed: {e}")
+        if stats is not None:
+            stats.failed += 1
+        return page_text
+    return splice_corrections(ocr, spans, parse_span_answers(answer, len(spans)))
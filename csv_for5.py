@@ -4,8 +4,9 @@ import csv
 from pdf2image import convert_from_path
 from PIL import Image
 import pytesseract
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
+from transliteration import itrans_to_iast, itrans_to_devanagari, itrans_to_iast_devanagari
+from substitution import clean_text_fixes
+from verse_parser import for5_tokenizer, SUTRA, SYNONYMS, TRANSLATION, HEADING, BLANK
 
 # === CONFIG ===
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf2.pdf"
@@ -16,89 +17,85 @@ pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
 # === CLEANING ===
 def clean_text(text):
-    text = text.replace('I$', 'IS').replace('$', 'S').replace('0f', 'of').replace('0', 'o')
-    text = re.sub(r'\(\s*\)', '', text)
-    return text
+    return clean_text_fixes(text)
 
 def remove_ascii_borders(text):
     return "\n".join([line for line in text.splitlines() if line.count('|') < 5 and len(line.strip()) > 2])
 
 def convert_to_iast(text):
-    return transliterate(text, sanscript.ITRANS, sanscript.IAST)
+    return itrans_to_iast(text)
 
 def convert_to_devanagari(text):
-    return transliterate(text, sanscript.ITRANS, sanscript.DEVANAGARI)
+    return itrans_to_devanagari(text)
+
+FOOTER_NOISE = re.compile(r'(rot.*|॥.*|Vs\|.*|\d+\|\d+\|\d+.*)', re.IGNORECASE)
+SUTRA_IDS = re.compile(r"\d\.\d+\.\d+")
 
 def remove_footer_noise(text):
-    return re.sub(r'(rot.*|॥.*|Vs\|.*|\d+\|\d+\|\d+.*)', '', text, flags=re.IGNORECASE).strip()
+    return FOOTER_NOISE.sub('', text).strip()
 
 # === MAIN PARSER ===
+def _verse_rows(sutra_no, roman_lines, synonym_lines, translation_lines, chapter, subchapter):
+    """One row per sutra number on the header line; transliterations are computed once per verse."""
+    roman = " ".join(roman_lines).strip()
+    synonyms = " ".join(synonym_lines).strip().strip("| ")
+    translation = " ".join(translation_lines).strip().strip("| ")
+    translation = remove_footer_noise(translation)
+
+    if 'jijnasa' in roman.lower() and re.match(r"1\\.2\\.1(?!\\d)", sutra_no):
+        sutra_no = '1.2.10'
+
+    roman_iast, roman_devanagari = itrans_to_iast_devanagari(roman)
+    synonyms_iast = convert_to_iast(synonyms)
+    translation_iast = convert_to_iast(translation)
+    return [{
+        "Chapter Title": chapter,
+        "Sub-Chapter Title": subchapter,
+        "sutra_no": sutra_id,
+        "sutra_translation": roman_iast,
+        "sb_verse_no": sutra_id,
+        "sb_verse_roman": roman_iast,
+        "sb_verse_devanagari": roman_devanagari,
+        "sb_verse_synonyms": synonyms_iast,
+        "sb_verse_translation": translation_iast
+    } for sutra_id in SUTRA_IDS.findall(sutra_no)]
+
 def extract_verses(text):
+    """Builds rows from one token per line: a sutra line opens a verse whose
+    roman text runs up to the first '--' synonyms line; everything after the
+    synonyms, up to the next sutra, is translation."""
     blocks = []
     current_chapter = ""
     current_subchapter = ""
-    lines = text.splitlines()
-    i = 0
-
-    while i < len(lines):
-        line = lines[i].strip()
-
-        if line.isupper() and len(line.split()) > 3:
-            current_subchapter = line
-            i += 1
+    verse = None    # (sutra_no, roman_lines, synonym_lines, translation_lines)
+    state = None    # None before the first sutra, then "roman" → "synonyms" → "translation"
+
+    for kind, line in for5_tokenizer(text):
+        if kind == SUTRA:
+            if verse:
+                blocks.extend(_verse_rows(*verse, current_chapter, current_subchapter))
+            verse = (line, [], [], [])
+            state = "roman"
             continue
 
-        if re.match(r"^\d\.\d+\.\d+", line):
-            sutra_no = line.strip()
-            i += 1
-            roman_lines = []
-            synonym_lines = []
-            translation_lines = []
-            sb_ref = sutra_no
-
-            while i < len(lines) and '--' not in lines[i] and not re.match(r'^\d\.\d+\.\d+', lines[i]):
-                roman_lines.append(lines[i].strip())
-                i += 1
-
-            while i < len(lines) and ('--' in lines[i] or re.search(r"--", lines[i])):
-                synonym_lines.append(lines[i].strip())
-                i += 1
-
-            while i < len(lines):
-                if re.match(r'^\d\.\d+\.\d+', lines[i]):
-                    break
-                if lines[i].strip().upper().startswith("TRANSLATION"):
-                    i += 1
-                    continue
-                if lines[i].strip():
-                    translation_lines.append(lines[i].strip())
-                i += 1
-
-            roman = " ".join(roman_lines).strip()
-            synonyms = " ".join(synonym_lines).strip().strip("| ")
-            translation = " ".join(translation_lines).strip().strip("| ")
-            translation = remove_footer_noise(translation)
-
-            if 'jijnasa' in roman.lower() and re.match(r"1\\.2\\.1(?!\\d)", sutra_no):
-                sutra_no = '1.2.10'
-
-            sutra_parts = re.findall(r"\d\.\d+\.\d+", sutra_no)
-            for sutra_id in sutra_parts:
-                block = {
-                    "Chapter Title": current_chapter,
-                    "Sub-Chapter Title": current_subchapter,
-                    "sutra_no": sutra_id,
-                    "sutra_translation": convert_to_iast(roman),
-                    "sb_verse_no": sutra_id,
-                    "sb_verse_roman": convert_to_iast(roman),
-                    "sb_verse_devanagari": convert_to_devanagari(roman),
-                    "sb_verse_synonyms": convert_to_iast(synonyms),
-                    "sb_verse_translation": convert_to_iast(translation)
-                }
-                blocks.append(block)
+        if state is None:
+            if kind == HEADING:
+                current_subchapter = line
+        elif state == "roman":
+            if kind == SYNONYMS:
+                state = "synonyms"
+                verse[2].append(line)
+            else:
+                verse[1].append(line)
+        elif state == "synonyms" and kind == SYNONYMS:
+            verse[2].append(line)
         else:
-            i += 1
+            state = "translation"
+            if kind not in (TRANSLATION, BLANK):
+                verse[3].append(line)
 
+    if verse:
+        blocks.extend(_verse_rows(*verse, current_chapter, current_subchapter))
     return blocks
 
 # === CSV WRITER ===
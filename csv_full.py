@@ -4,8 +4,9 @@ import csv
 from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 import pytesseract
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
+from transliteration import itrans_to_iast_devanagari
+from pipeline_runner import PipelineRunner
+from substitution import csv_full_fixes
 
 # === CONFIGURATION ===
 # Ensure these paths are correct for your system before running.
@@ -13,17 +14,17 @@ PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf2.pdf"
 OUTPUT_CSV = r"C:\Users\divya\Desktop\project\vedanta_output_final.csv"
 POPPLER_PATH = r"C:\Program Files\poppler-24.08.0\Library\bin"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+RUN_DIR = r"C:\Users\divya\Desktop\project\runs\vedanta_full"  # per-page OCR checkpoints
 
 # Set the Tesseract command path
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
 
 # === DATA CLEANING & CONVERSION ===
-def clean_text(text):
-    """Cleans raw OCR text by removing artifacts and fixing common errors."""
+def clean_page(text):
+    """Cleans one page of raw OCR text by removing artifacts and fixing common errors."""
     # Fix common OCR character mistakes
-    text = text.replace('I$', 'IS').replace('$', 'S').replace('0f', 'of').replace('0', 'o')
-    text = text.replace('1o|', '10.').replace('o|', '0.')
+    text = csv_full_fixes(text)
 
     lines = text.splitlines()
     cleaned_lines = []
@@ -38,14 +39,17 @@ def clean_text(text):
             cleaned_lines.append(line)
 
     text = "\n".join(cleaned_lines)
-    text = re.sub(r'\(\s*\)', '', text)
-    return text.strip()
+    return re.sub(r'\(\s*\)', '', text)
+
+def clean_text(text):
+    """Cleans raw OCR text by removing artifacts and fixing common errors."""
+    return clean_page(text).strip()
 
 def convert_to_iast(text):
     """Transliterates text from ITRANS scheme to IAST."""
     if not text: return ""
     try:
-        return transliterate(text, sanscript.ITRANS, sanscript.IAST)
+        return itrans_to_iast_devanagari(text)[0]
     except Exception:
         return text
 
@@ -53,58 +57,95 @@ def convert_to_devanagari(text):
     """Transliterates text from ITRANS scheme to Devanagari."""
     if not text: return ""
     try:
-        return transliterate(text, sanscript.ITRANS, sanscript.DEVANAGARI)
+        return itrans_to_iast_devanagari(text)[1]
     except Exception:
         return text
 
 
 # === CORE PARSING LOGIC ===
-def extract_structured_data(full_text):
-    """
-    Parses the full text of the document to extract structured verse data.
+VS_MARKER = re.compile(r'\(Vs\.\s*\d+\.\d+\.\d+\.?\)')
+SB_VERSE = re.compile(r'(?m)^(\d{1,2}\.\d{1,2}\.\d{1,2}(?:-\d{1,2})?.*)$')
+SB_VERSE_NO = re.compile(r'(\d{1,2}\.\d{1,2}\.\d{1,2}(?:-\d{1,2})?)')
+SUTRA_NO = re.compile(r'(\d+\.\d+\.\d+)')
+CHAPTER = re.compile(r'CHAPTER\s+\w+', re.IGNORECASE)
+ADHIKARANA = re.compile(r'Adhikarana \d+:(.*)', re.IGNORECASE)
+SYNONYMS = re.compile(r'([^\n]+--[^\n]+.*)', re.DOTALL)
+TRANSLATION = re.compile(r'TRANSLATION\n(.*?)(?=\d{1,2}\.\d{1,2}\.\d{1,2}|$)', re.DOTALL | re.IGNORECASE)
+MARKER_LOOKBACK = 256  # chars kept while waiting for the first (Vs. ...) marker
+
+
+class VerseStreamParser:
+    """Incremental parser for the (Vs. x.y.z) verse blocks.
+
+    ``feed`` takes cleaned text in any chunks (normally one page at a time)
+    and returns the rows of every block that closed, i.e. whose next
+    (Vs. ...) marker has arrived; ``close`` flushes the last block. Only the
+    open block is held in memory, and the current chapter and sub-chapter
+    carry over from block to block exactly as in a whole-book parse.
     """
-    all_rows = []
-    
-    vs_blocks = re.split(r'(\(Vs\.\s*\d+\.\d+\.\d+\.?\))', full_text)
-    
-    current_chapter = ""
-    current_subchapter = ""
 
-    for i in range(1, len(vs_blocks), 2):
-        sutra_no_text = vs_blocks[i]
-        content_block = vs_blocks[i+1]
-        
-        sutra_no_match = re.search(r'(\d+\.\d+\.\d+)', sutra_no_text)
+    def __init__(self):
+        self.current_chapter = ""
+        self.current_subchapter = ""
+        self._buffer = ""       # starts at the open block's marker once one is seen
+        self._open = False
+
+    def feed(self, text):
+        buffer = self._buffer + text
+        markers = list(VS_MARKER.finditer(buffer))
+        if not markers:
+            if not self._open:
+                start = buffer.rfind("(")
+                buffer = buffer[start:] if start != -1 and len(buffer) - start < MARKER_LOOKBACK else ""
+            self._buffer = buffer
+            return []
+
+        # An open block's buffer starts with its own marker, so markers[0] is
+        # either that block or, before any block opened, the first one.
+        rows = []
+        for marker, next_marker in zip(markers, markers[1:]):
+            rows.extend(self._parse_block(buffer[marker.start():next_marker.start()]))
+        self._buffer = buffer[markers[-1].start():]
+        self._open = True
+        return rows
+
+    def close(self):
+        rows = self._parse_block(self._buffer.rstrip()) if self._open else []
+        self._buffer = ""
+        self._open = False
+        return rows
+
+    def _parse_block(self, block):
+        """Rows for one block: its (Vs. ...) marker followed by the content."""
+        marker = VS_MARKER.match(block)
+        content_block = block[marker.end():]
+        sutra_no_match = SUTRA_NO.search(marker.group(0))
         if not sutra_no_match:
-            continue
+            return []
         sutra_no = sutra_no_match.group(1)
 
-        chapter_match = re.search(r'CHAPTER\s+\w+', content_block, re.IGNORECASE)
+        chapter_match = CHAPTER.search(content_block)
         if chapter_match:
-            current_chapter = chapter_match.group(0).strip()
-            current_subchapter = ""
+            self.current_chapter = chapter_match.group(0).strip()
+            self.current_subchapter = ""
 
-        adhikarana_match = re.search(r'Adhikarana \d+:(.*)', content_block, re.IGNORECASE)
+        adhikarana_match = ADHIKARANA.search(content_block)
         if adhikarana_match:
-            current_subchapter = adhikarana_match.group(1).strip()
-            
-        sb_verse_pattern = r'(?m)^(\d{1,2}\.\d{1,2}\.\d{1,2}(?:-\d{1,2})?.*)$'
-        sb_blocks = re.split(sb_verse_pattern, content_block)
-        
-        if len(sb_blocks) < 2:
-            continue
+            self.current_subchapter = adhikarana_match.group(1).strip()
 
+        sb_blocks = SB_VERSE.split(content_block)
+        rows = []
         for j in range(1, len(sb_blocks), 2):
             sb_verse_header = sb_blocks[j].strip()
             sb_content = sb_blocks[j+1]
 
-            sb_verse_no_match = re.match(r'(\d{1,2}\.\d{1,2}\.\d{1,2}(?:-\d{1,2})?)', sb_verse_header)
+            sb_verse_no_match = SB_VERSE_NO.match(sb_verse_header)
             sb_verse_no = sb_verse_no_match.group(1) if sb_verse_no_match else "N/A"
             
-            roman_from_header = re.sub(sb_verse_pattern, '', sb_verse_header, 1).strip()
+            roman_from_header = SB_VERSE.sub('', sb_verse_header, 1).strip()
 
-            synonyms_match = re.search(r'([^\n]+--[^\n]+.*)', sb_content, re.DOTALL)
-            translation_match = re.search(r'TRANSLATION\n(.*?)(?=\d{1,2}\.\d{1,2}\.\d{1,2}|$)', sb_content, re.DOTALL | re.IGNORECASE)
+            synonyms_match = SYNONYMS.search(sb_content)
+            translation_match = TRANSLATION.search(sb_content)
 
             end_of_roman = len(sb_content)
             if synonyms_match:
@@ -112,24 +153,42 @@ def extract_structured_data(full_text):
             elif translation_match:
                 end_of_roman = translation_match.start()
             
-            full_roman_text = roman_from_header + " " + sb_content[:end_of_roman].strip()
+            full_roman_text = ' '.join((roman_from_header + " " + sb_content[:end_of_roman].strip()).split())
 
             synonyms_text = synonyms_match.group(1).strip() if synonyms_match else ""
             translation_text = translation_match.group(1).strip() if translation_match else ""
             
-            row = {
-                "Chapter Title": current_chapter.title(),
-                "Sub-Chapter Title": current_subchapter,
+            rows.append({
+                "Chapter Title": self.current_chapter.title(),
+                "Sub-Chapter Title": self.current_subchapter,
                 "sutra_no": sutra_no,
                 "sb_verse_no": sb_verse_no,
-                "sb_verse_roman": convert_to_iast(' '.join(full_roman_text.split())),
-                "sb_verse_devanagari": convert_to_devanagari(' '.join(full_roman_text.split())),
+                "sb_verse_roman": convert_to_iast(full_roman_text),
+                "sb_verse_devanagari": convert_to_devanagari(full_roman_text),
                 "sb_verse_synonyms": ' '.join(synonyms_text.split()),
                 "sb_verse_translation": ' '.join(translation_text.split())
-            }
-            all_rows.append(row)
+            })
+        return rows
+
 
-    return all_rows
+def iter_structured_rows(pages):
+    """Yields verse rows from raw per-page OCR text, one page in memory at a time."""
+    parser = VerseStreamParser()
+    separator = ""
+    for page_text in pages:
+        cleaned = clean_page(page_text)
+        if cleaned:
+            yield from parser.feed(separator + cleaned)
+            separator = "\n"
+    yield from parser.close()
+
+
+def extract_structured_data(full_text):
+    """
+    Parses the full text of the document to extract structured verse data.
+    """
+    parser = VerseStreamParser()
+    return parser.feed(full_text) + parser.close()
 
 
 # === CSV WRITING ===
@@ -151,6 +210,7 @@ def write_csv(rows, out_path):
                 continue
             seen.add(key)
             writer.writerow(row)
+    return len(seen)
 
 
 # === MAIN EXECUTION BLOCK (WITH PAGE-BY-PAGE PROGRESS) ===
@@ -167,42 +227,37 @@ def main():
         print(f"FATAL ERROR: Could not get PDF info. Check POPPLER_PATH and PDF_PATH. Details: {e}")
         return
 
-    full_text = ""
-    # This loop processes ONE page at a time, showing you progress for each.
-    for page_num in range(1, total_pages + 1):
-        print(f"--- Processing page {page_num}/{total_pages} ---")
-        try:
-            # 1. Convert just the current page to an image. This is fast.
-            image = convert_from_path(
-                PDF_PATH,
-                dpi=300,
-                poppler_path=POPPLER_PATH,
-                first_page=page_num,
-                last_page=page_num
-            )
-
-            # 2. Perform OCR on that single image. This is the slow part.
-            print(f"  - Performing OCR...")
-            text = pytesseract.image_to_string(image[0], lang="eng+san")
-            full_text += text + "\n"
-            print(f"  - Page {page_num} completed.")
-
-        except Exception as e:
-            print(f"  - !!! ERROR processing page {page_num}: {e}")
-            continue # If a page fails, we'll log the error and continue.
-
-    # Now, process the aggregated text all at once for accuracy.
-    print("\n--- All pages processed. Now cleaning and parsing the full text. ---")
-    cleaned_text = clean_text(full_text)
-    
-    print("--- Parsing structured data... ---")
-    all_blocks = extract_structured_data(cleaned_text)
-    
-    print(f"--- Extracted {len(all_blocks)} total entries. Writing to CSV... ---")
-    write_csv(all_blocks, OUTPUT_CSV)
-    
-    print("\nProcessing complete. Output saved to:", OUTPUT_CSV)
+    def ocr_page(page_num, _):
+        # 1. Convert just the current page to an image. This is fast.
+        image = convert_from_path(
+            PDF_PATH,
+            dpi=300,
+            poppler_path=POPPLER_PATH,
+            first_page=page_num,
+            last_page=page_num
+        )
+
+        # 2. Perform OCR on that single image. This is the slow part.
+        print(f"  - Performing OCR...")
+        text = pytesseract.image_to_string(image[0], lang="eng+san")
+        print(f"  - Page {page_num} completed.")
+        return text
 
+    # Each page's OCR text is checkpointed, so an interrupted run resumes where it stopped.
+    runner = PipelineRunner(RUN_DIR, [("ocr", ocr_page)])
+    try:
+        runner.run(range(1, total_pages + 1))
+
+        # Pages are cleaned and parsed as they stream out of the checkpoint;
+        # rows reach the CSV as soon as their (Vs. ...) block closes.
+        print("\n--- All pages processed. Now cleaning and parsing page by page. ---")
+        pages = (text for _, text in runner.iter_outputs())
+        written = write_csv(iter_structured_rows(pages), OUTPUT_CSV)
+    finally:
+        runner.close()
+
+    print(f"--- Wrote {written} unique entries to CSV. ---")
+    print("\nProcessing complete. Output saved to:", OUTPUT_CSV)
 
 if __name__ == "__main__":
     main()
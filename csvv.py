@@ -7,6 +7,7 @@ from PIL import Image
 import pytesseract
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
+from substitution import clean_text_fixes, iast_ocr_typos
 
 # === CONFIG ===
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf2.pdf"
@@ -17,9 +18,7 @@ pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
 # === CLEANING HELPERS ===
 def clean_text(text):
-    text = text.replace('I$', 'IS').replace('$', 'S').replace('0f', 'of').replace('0', 'o')
-    text = re.sub(r'\(\s*\)', '', text)
-    return text
+    return clean_text_fixes(text)
 
 def remove_ascii_borders(text):
     return "\n".join([line for line in text.splitlines() if line.count('|') < 5 and len(line.strip()) > 2])
@@ -28,32 +27,8 @@ def normalize_unicode(text):
     return unicodedata.normalize("NFC", text)
 
 def fix_iast_ocr_typos(text):
-    # Fix common OCR-to-IAST diacritic issues
-    return (
-        text.replace("ġ", "g")
-            .replace("ḻ", "l")
-            .replace("ṭ", "t")
-            .replace("ṭh", "th")
-            .replace("ṭr", "tr")
-            .replace("ḍ", "d")
-            .replace("ṛ", "r")
-            .replace("ṝ", "r̄")
-            .replace("ṇ", "n")
-            .replace("ṅ", "n")
-            .replace("ś", "sh")
-            .replace("ṣ", "sh")
-            .replace("ḷ", "l")
-            .replace("ḥ", "h")
-            .replace("ṃ", "m")
-            .replace("ṉ", "n")
-            .replace("Ḥ", "H")
-            .replace("Ḍ", "D")
-            .replace("Ṛ", "R")
-            .replace("Ṭ", "T")
-            .replace("Ḷ", "L")
-            .replace("k͟h", "kh")
-            .replace("ṡ", "s")
-    )
+    # Fix common OCR-to-IAST diacritic issues (rules in substitution.IAST_OCR_TYPO_RULES)
+    return iast_ocr_typos(text)
 
 def convert_to_iast(text):
     iast = transliterate(text, sanscript.ITRANS, sanscript.IAST)
@@ -3,8 +3,8 @@ import cv2
 import pytesseract
 import re
 from pdf2image import convert_from_path
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
+from transliteration import InlineTransliterator
+from line_filter import LineFilter, BORDER_RULES
 
 # === Configuration ===
 pdf_path = r"C:\Users\divya\Desktop\New folder\pdf2.pdf"
@@ -32,17 +32,10 @@ def clean_ocr_text(text):
     text = re.sub(r"(?<=\w)\)(?=\w)", "", text)
     return text
 
+BORDER_FILTER = LineFilter(BORDER_RULES, keep_stripped=True, name="borders")
+
 def remove_ascii_borders(text):
-    lines = text.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if re.fullmatch(r"[|¦¬\-_=~!.\[\]{}()<>\\/]{4,}", stripped):
-            continue
-        if re.match(r"^[|!¬:;\-_=~]{2,}", stripped) and len(re.findall(r"[a-zA-Z]", stripped)) < 10:
-            continue
-        cleaned_lines.append(stripped)
-    return "\n".join(cleaned_lines)
+    return BORDER_FILTER(text)
 
 # === Detect Verse ===
 def is_sanskrit_verse(line):
@@ -60,17 +53,8 @@ def is_sanskrit_verse(line):
     return False
 
 # === Per-word Transliteration ===
-def transliterate_inline_words(line, mapping):
-    def convert_word(word):
-        clean = re.sub(r'[^\w]', '', word)
-        lower = clean.lower()
-        replacement = mapping.get(clean, mapping.get(lower, None))
-        return word.replace(clean, replacement) if replacement else word
-
-    return " ".join(convert_word(w) for w in line.split())
-
-def convert_to_devanagari(iast_line):
-    return transliterate(iast_line, sanscript.IAST, sanscript.DEVANAGARI)
+# IAST and Devanagari forms of every dictionary word are built once here.
+inline_words = InlineTransliterator(roman_to_iast_dict)
 
 # === Processing ===
 images = convert_from_path(pdf_path, dpi=500, poppler_path=poppler_path, first_page=1, last_page=5)
@@ -98,10 +82,7 @@ for i, image in enumerate(images):
     side_by_side = []
 
     for line in lines:
-        diacritic_line = transliterate_inline_words(line, roman_to_iast_dict)
-        dev_line = transliterate_inline_words(diacritic_line, {
-            v: convert_to_devanagari(v) for v in roman_to_iast_dict.values()
-        })
+        diacritic_line, dev_line = inline_words.convert(line)
 
         page_diacritics.append(diacritic_line)
         page_sanskrit.append(dev_line)
@@ -123,4 +104,5 @@ with open(output_text_sanskrit, "w", encoding="utf-8") as f:
 with open(output_verses_path, "w", encoding="utf-8") as f:
     f.write(output_side_by_side)
 
+print(BORDER_FILTER.report())
 print("✅ Done: All files saved with inline Sanskrit + side-by-side verses.")
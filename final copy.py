@@ -1,8 +1,9 @@
 from pdf2image import convert_from_path
 import cv2
 import pytesseract
-import re
 import os
+from substitution import ocr_clean
+from line_scorer import LineScorer
 
 # === Configuration ===
 pdf_path = r"C:\Users\divya\Desktop\New folder\pdf2.pdf"
@@ -25,42 +26,13 @@ images = convert_from_path(
 # === Cleaning Functions ===
 
 def clean_ocr_text(text):
-    text = text.replace("I$", "IS").replace("$", "S")
-    text = text.replace("0f", "of").replace("0", "o")
-    text = re.sub(r"(?<=\w)\)(?=\w)", "", text)
-    return text
+    return ocr_clean(text)
 
-def remove_ascii_borders(text):
-    lines = text.splitlines()
-    cleaned_lines = []
-
-    for line in lines:
-        stripped = line.strip()
-
-        # Remove lines made entirely of decorative characters
-        if re.fullmatch(r"[|¦¬\-_=~!.\[\]{}()<>\\/]{4,}", stripped):
-            continue
-
-        # Remove symbol-started lines with few letters
-        if re.match(r"^[|!¬:;\-_=~]{2,}", stripped) and len(re.findall(r"[a-zA-Z]", stripped)) < 10:
-            continue
-
-        # Token-based gibberish filtering
-        tokens = stripped.split()
-        real_words = [w for w in tokens if len(w) >= 4 and re.match(r"[a-zA-Z]{3,}", w)]
+BORDER_FILTER = LineScorer(name="borders")
 
-        # Remove if too few real words among many tokens
-        if len(real_words) < 2 and len(tokens) > 4:
-            continue
-
-        # Remove if majority tokens are short gibberish
-        short_words = [w for w in tokens if len(w) <= 3]
-        if len(tokens) > 5 and len(short_words) / len(tokens) > 0.7:
-            continue
-
-        cleaned_lines.append(line)
-
-    return "\n".join(cleaned_lines)
+def remove_ascii_borders(text):
+    # Decorative lines, symbol noise and OCR speckle, scored a page at a time
+    return BORDER_FILTER(text)
 
 # === Main OCR Loop ===
 all_cleaned_text = ""
@@ -89,5 +61,6 @@ for i, image in enumerate(images):
 with open(output_text_path, "w", encoding="utf-8") as f:
     f.write(all_cleaned_text)
 
+print(BORDER_FILTER.report())
 print("OCR completed and cleaned text saved to:")
 print(output_text_path)
@@ -3,9 +3,11 @@ from pdf2image import convert_from_path
 from PIL import Image # Still used for saving images to temp_image_dir
 import pytesseract
 import cv2 # For image processing before OCR
-import re # For cleaning functions
 from llama_cpp import Llama
 from indic_transliteration.sanscript import transliterate, IAST, DEVANAGARI, ITRANS # Keep ITRANS just in case, though LLM should output IAST
+from substitution import ocr_clean
+from line_filter import LineFilter, CONTENT_RULES
+import llm_grammar
 
 # === CONFIGURATION ===
 pdf_path = r"C:\Users\divya\Desktop\New folder\pdf2.pdf" # Make sure this points to your PDF
@@ -25,55 +27,14 @@ pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
 # === Cleaning Functions (Copied from new OCR code) ===
 
 def clean_ocr_text(text):
-    text = text.replace("I$", "IS").replace("$", "S")
-    text = text.replace("0f", "of").replace("0", "o")
-    text = re.sub(r"(?<=\w)\)(?=\w)", "", text)
-    return text
+    return ocr_clean(text)
+
+# Drops borders and symbol lines, then keeps only lines that look like text
+# (headings, keywords, 3+ words, or letter-rich). Rules: line_filter.CONTENT_RULES
+BORDER_FILTER = LineFilter(CONTENT_RULES, default="drop", keep_stripped=True, name="borders")
 
 def remove_ascii_borders(text):
-    lines = text.splitlines()
-    cleaned_lines = []
-
-    for line in lines:
-        stripped = line.strip()
-        if re.fullmatch(r"[|¦¬\-_=~!.\[\]{}()<>\\/]{4,}", stripped):
-            continue
-        # Adjusted this regex to be slightly more robust for mixed characters
-        if re.match(r"^[|!¬:;\-_=~]*[|!¬:;\-_=~]+", stripped) and len(re.findall(r"[a-zA-Z0-9]", stripped)) < 10:
-            continue
-        
-        # This part is meant to be selective and keep content-rich lines.
-        # It's a heuristic, and might need tuning for your specific document.
-        # Original logic:
-        # tokens = stripped.split()
-        # long_words = [w for w in tokens if len(w) > 3]
-        # short_words = [w for w in tokens if len(w) <= 3]
-        # if len(set(tokens)) < len(tokens) * 0.5: # Checks for low word uniqueness
-        #    continue
-
-        # More generalized check for actual text
-        if not stripped: # Skip empty lines after stripping
-            continue
-        # Basic check to see if it looks like a sentence/word rather than just symbols
-        if len(re.findall(r'[a-zA-Z0-9]', stripped)) < 3 and not any(c.isalpha() for c in stripped):
-            continue
-
-        # Keywords and structure checks for keeping lines (can be fine-tuned)
-        if (
-            stripped.isupper() and len(stripped.split()) >= 4 # All uppercase sentences/headings
-        ) or (
-            any(keyword in stripped.lower() for keyword in [
-                "adhikarana", "sastra", "vedanta", "sri", "krsna", "truth", "chapter", "page"
-            ]) # Important keywords
-        ) or (
-            len(stripped.split()) >= 3 and any(c.isalpha() for c in stripped) # At least 3 words and contains letters
-        ):
-            cleaned_lines.append(stripped)
-        # Add a fallback to include lines that are not caught by the above but seem like actual text
-        elif len(stripped) > 15 and len(re.findall(r'[a-zA-Z]', stripped)) / len(stripped) > 0.5:
-            cleaned_lines.append(stripped)
-        
-    return "\n".join(cleaned_lines)
+    return BORDER_FILTER(text)
 
 
 # === STEP 1: Convert PDF to Images ===
@@ -140,50 +101,21 @@ def process_text_chunk(chunk_text):
     # Limit size to prevent context window overflow for very long lines
     cleaned_chunk = chunk_text.replace("'", "`").replace("\"", "`")[:1000] # Use backticks for safety
 
-    # Prompt to classify and normalize Sanskrit
+    # Prompt to classify and normalize Sanskrit; NORMALIZE_GRAMMAR only admits the three answer forms
     prompt_classify_normalize = (
         "You are an expert in Sanskrit and English. Analyze the following text segment. "
         "Your task is to determine if it is a genuine Sanskrit verse (or part of one) "
         "or if it is primarily an English sentence/explanation. "
-        "If it is a Sanskrit verse, normalize it into standard IAST transliteration, "
+        "If it is a Sanskrit verse, answer 'IAST: ' followed by the verse normalized into standard IAST transliteration, "
         "correcting any minor OCR errors, ensuring correct diacritics. "
-        "If it is primarily English, return 'ENGLISH:'. " # Added colon for easier parsing
-        "If it is neither (e.g., garbage, headings, or very mixed), return 'OTHER:'. " # Added colon
-        "Do not add any other text before the output.\n\n"
+        "If it is primarily English, answer 'ENGLISH'. "
+        "If it is neither (e.g., garbage, headings, or very mixed), answer 'OTHER'.\n\n"
         f"Text Segment: '{cleaned_chunk}'\n\n"
-        "Output:" # Expecting "IAST: <transliteration>", "ENGLISH:", or "OTHER:"
+        "Output:"
     )
 
     try:
-        response = llm(
-            prompt_classify_normalize,
-            max_tokens=512, # Increased max_tokens to ensure full IAST generation
-            stop=["\n", "Output:"], # Stop on newline or "Output:" if LLM repeats it
-            temperature=0.1 # Keep it less creative, more factual
-        )
-        llm_raw_output = response["choices"][0]["text"].strip()
-        
-        # More robust parsing of LLM output
-        llm_output_lower = llm_raw_output.lower()
-
-        if llm_output_lower.startswith("english:"):
-            return "ENGLISH", chunk_text # Return original chunk for English
-        elif llm_output_lower.startswith("other:"):
-            return "OTHER", chunk_text # Return original chunk for Other
-        else:
-            # Assume it's Sanskrit and try to extract IAST.
-            # LLM might just output the IAST directly if instructed.
-            # If it starts with "IAST:", remove it.
-            if llm_output_lower.startswith("iast:"):
-                processed_iast = llm_raw_output[len("iast:"):].strip()
-                if processed_iast:
-                    return "SANSKRIT", processed_iast
-                else: # LLM said IAST but provided empty text
-                    return "OTHER", chunk_text 
-            elif len(llm_raw_output) > 5 and any(c.isalpha() for c in llm_raw_output): # Basic check for valid Sanskrit-like output
-                return "SANSKRIT", llm_raw_output
-            else: # If it's not clear IAST, English or Other
-                return "OTHER", chunk_text
+        return llm_grammar.normalize(llm, prompt_classify_normalize, chunk_text, max_tokens=512, temperature=0.1)
     except Exception as e:
         print(f"Error during LLM processing of chunk '{cleaned_chunk[:50]}...': {e}")
         return "ERROR", chunk_text # Indicate an error occurred
@@ -236,6 +168,7 @@ with open(output_file, "w", encoding="utf-8") as f_all, \
             f_all.write(f"PROCESSING ERROR for line:\n{original_line}\n\n")
 
 
+print(BORDER_FILTER.report())
 print(f"\n📄 Done. Output saved to: {output_file}, {sanskrit_only_file}, and {english_only_file}")
 
 # Optional: Clean up temporary images
@@ -4,9 +4,10 @@ import cv2
 import pytesseract
 from concurrent.futures import ThreadPoolExecutor
 from pdf2image import convert_from_path
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
-from transformers import pipeline
+from transliteration import itrans_to_iast_devanagari
+from line_filter import LineFilter, ASCII_ART_RULES
+from glossary import Glossary
+from hf_classifier import HFSanskritClassifier
 from functools import lru_cache
 import configparser
 
@@ -29,7 +30,8 @@ class Config:
             },
             'OCR': {
                 'tesseract_config': '--oem 3 --psm 6',
-                'language': 'san+eng'
+                'language': 'san+eng',
+                'workers': '4'
             }
         }
 
@@ -56,73 +58,70 @@ class Config:
     def get_ocr_config(self):
         return self.config.get('OCR', 'tesseract_config')
 
+    def get_ocr_workers(self):
+        return self.config.getint('OCR', 'workers', fallback=4)
+
 # === TEXT PROCESSING ===
+# Each stage's lookarounds read the previous stage's output (e.g. dropping '¬'
+# exposes in-word punctuation), so these stay separate passes, compiled once.
+OCR_CLEAN_STAGES = [
+    (re.compile(r'I[\$\|¦]'), 'I'),
+    (re.compile(r'\b0([a-z])'), r'o\1'),
+    (re.compile(r'[¦¬\\]'), ''),
+    (re.compile(r'(?<=\w)[^\w\s](?=\w)'), ''),
+    (re.compile(r'[^\w\s.,;:!?\'-]'), ''),
+]
+WHITESPACE = re.compile(r'\s+')
+
 class TextCleaner:
+    def __init__(self):
+        # Per instance, so drop counts and examples aren't shared between runs
+        self.ascii_art_filter = LineFilter(ASCII_ART_RULES, name="ascii_art")
+
     @staticmethod
     def clean_ocr_text(text):
         """Multi-stage OCR text cleaning"""
         if not text:
             return ""
 
-        replacements = {
-            r'I[\$\|¦]': 'I',
-            r'\b0([a-z])': r'o\1',
-            r'[¦¬\\]': '',
-            r'(?<=\w)[^\w\s](?=\w)': ''
-        }
-
-        for pattern, replacement in replacements.items():
-            text = re.sub(pattern, replacement, text)
+        for pattern, replacement in OCR_CLEAN_STAGES:
+            text = pattern.sub(replacement, text)
+        return WHITESPACE.sub(' ', text).strip()
 
-        text = re.sub(r'[^\w\s.,;:!?\'-]', '', text)
-        return re.sub(r'\s+', ' ', text).strip()
-
-    @staticmethod
-    def remove_ascii_art(text):
-        lines = [line for line in text.splitlines()
-                 if not re.match(r'^[\-=\\+*\\/]{4,}$', line.strip())]
-        return '\n'.join(lines)
+    def remove_ascii_art(self, text):
+        return self.ascii_art_filter(text)
 
 # === SANSKRIT PROCESSOR ===
 class SanskritProcessor:
-    def __init__(self):
-        self.glossary = {
+    def __init__(self, threshold=None, ocr_workers=0):
+        self.glossary = Glossary.from_dict({
             'sri': 'auspicious, holy',
             'guru': 'teacher',
             'namaḥ': 'obeisance',
             'shloka': 'verse',
             'bhagavad': 'of the Lord',
-        }
-        self.classifier = None
-
-    def initialize_classifier(self):
-        if not self.classifier:
-            self.classifier = pipeline(
-                "text-classification",
-                model="buddhist-nlp/sanskrit-classification",
-                device=-1
-            )
+        }, 'terms')
+        # Batched, cached HF classifier; threshold from config.ini unless given.
+        # The ONNX backend leaves ocr_workers cores to Tesseract.
+        self.classifier = HFSanskritClassifier("buddhist-nlp/sanskrit-classification", threshold=threshold,
+                                               ocr_workers=ocr_workers)
+
+    def classify_page(self, lines):
+        """Classifies a page's lines in length-sorted batches so process_line hits the cache."""
+        return self.classifier.classify_many(lines)
 
-    @lru_cache(maxsize=1000)
     def is_sanskrit(self, text):
-        self.initialize_classifier()
-        try:
-            result = self.classifier(text[:512])
-            return result[0]['label'] == 'sanskrit' and result[0]['score'] > float(Config().get_processing('classifier_threshold'))
-        except Exception as e:
-            print(f"Classification error: {e}")
-            return False
+        return self.classifier.is_sanskrit(text)
 
     @lru_cache(maxsize=2000)
     def translate_term(self, term):
-        return self.glossary.get(term.lower(), None)
+        return self.glossary.lookup(term)
 
     def process_line(self, text):
         if not self.is_sanskrit(text):
             return {'type': 'other', 'content': text}
 
-        iast = transliterate(text, sanscript.ITRANS, sanscript.IAST)
-        devanagari = transliterate(iast, sanscript.IAST, sanscript.DEVANAGARI)
+        iast, devanagari = itrans_to_iast_devanagari(text)
 
         words = re.findall(r'[\w\']+', text)
         analyzed_words = []
@@ -167,7 +166,8 @@ class OCRProcessor:
 # === MAIN PROCESS ===
 def main():
     config = Config().load()
-    sanskrit_processor = SanskritProcessor()
+    ocr_workers = config.get_ocr_workers()
+    sanskrit_processor = SanskritProcessor(float(config.get_processing('classifier_threshold')), ocr_workers)
 
     # Ensure Poppler path is valid
     poppler_dir = config.get_path('poppler_path')
@@ -195,7 +195,7 @@ def main():
         img.save(img_path, 'JPEG')
 
     # Process images in parallel
-    with ThreadPoolExecutor() as executor:
+    with ThreadPoolExecutor(max_workers=ocr_workers) as executor:
         page_texts = list(executor.map(
             lambda i: OCRProcessor.extract_text(
                 os.path.join(image_dir, f"page_{i+1}.jpg"),
@@ -205,15 +205,15 @@ def main():
         ))
 
     # Analyze and format results
+    cleaner = TextCleaner()
     output = ["# Sanskrit Text Analysis Report\n"]
     for i, text in enumerate(page_texts):
-        cleaned = TextCleaner.clean_ocr_text(TextCleaner.remove_ascii_art(text))
+        cleaned = cleaner.clean_ocr_text(cleaner.remove_ascii_art(text))
         output.append(f"\n## Page {i+1}\n```\n{cleaned}\n```\n")
 
-        for line in cleaned.splitlines():
-            if not line.strip():
-                continue
-
+        lines = [line for line in cleaned.splitlines() if line.strip()]
+        sanskrit_processor.classify_page(lines)
+        for line in lines:
             analysis = sanskrit_processor.process_line(line)
             if analysis['type'] == 'sanskrit':
                 output.extend([
@@ -228,6 +228,8 @@ def main():
     with open(config.get_path('output_file'), 'w', encoding='utf-8') as f:
         f.writelines(output)
 
+    print(cleaner.ascii_art_filter.report())
+    print(sanskrit_processor.classifier.report())
     print(f"Analysis complete! Results saved to {config.get_path('output_file')}")
 
 if __name__ == "__main__":
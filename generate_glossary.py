@@ -1,70 +1,118 @@
 import os
 import re
 import csv
-from pdf2image import convert_from_path
+from collections import Counter
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
+from pipeline_runner import PipelineRunner
 
 # === CONFIGURATION =======================================================
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf3.pdf"
 POPPLER_PATH = r"C:\Program Files\poppler-24.08.0\Library\bin"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
-# --- NEW: Define the specific page range to process ---
-START_PAGE = 26
-END_PAGE = 30
+# --- Page range to mine; END_PAGE = None runs through the last page of the book ---
+START_PAGE = 1
+END_PAGE = None
 
-# The location where this script will save the generated glossary file
-GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db_26_to_30.csv"
+# Per-page OCR text and term counts are checkpointed here, so a rerun only
+# OCRs pages it has not seen before.
+RUN_DIR = r"C:\Users\divya\Desktop\project\runs\glossary"
+
+# The glossary file; corrections already filled in are kept on every merge
+GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db.csv"
+# The pages 26-30 glossary it replaces; its corrections seed the first merge
+OLD_GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db_26_to_30.csv"
+GLOSSARY_HEADER = ["Original", "Corrected IAST", "Frequency", "First Page"]
 
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
+# === PAGE STAGES =========================================================
+def ocr_page(page_num, _):
+    """Renders and OCRs a single page, so only one image is in memory at a time."""
+    image = convert_from_path(PDF_PATH, dpi=300, poppler_path=POPPLER_PATH,
+                              first_page=page_num, last_page=page_num)[0]
+    return pytesseract.image_to_string(image, lang='eng+san')
+
+def extract_terms(page_num, text):
+    """Counts the single-word parenthetical terms on one page."""
+    counts = Counter()
+    for term in re.findall(r'\(([^)]+)\)', text):
+        clean_term = term.replace('-\n', '').replace('\n', ' ').replace('*', '').strip().lower()
+        if ' ' not in clean_term and len(clean_term) > 1 and clean_term.isalpha():
+            counts[clean_term] += 1
+    return dict(counts)
+
+# === GLOSSARY MERGE ======================================================
+def mine_terms(runner):
+    """Book-wide frequency and first page for every term, streamed from the checkpoints."""
+    frequency = Counter()
+    first_seen = {}
+    for page_num, counts in runner.iter_outputs("terms"):
+        for term, n in counts.items():
+            frequency[term] += n
+            first_seen[term] = min(first_seen.get(term, page_num), page_num)
+    return frequency, first_seen
+
+def load_glossary_rows(path):
+    """Existing rows keyed by term; accepts the old two-column layout."""
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row and row[0].strip():
+                row = (row + [""] * len(GLOSSARY_HEADER))[:len(GLOSSARY_HEADER)]
+                rows[row[0].strip()] = row
+    return rows
+
+def merge_glossary(path, frequency, first_seen, seed_path=None):
+    """Adds new terms and refreshes counts; never touches a filled-in correction.
+
+    Until ``path`` exists, existing rows are read from ``seed_path``.
+    """
+    rows = load_glossary_rows(path if os.path.exists(path) or not seed_path else seed_path)
+    new_terms = [t for t in frequency if t not in rows]
+    for term, n in frequency.items():
+        row = rows.setdefault(term, [term, "", "", ""])
+        row[2] = str(n)
+        row[3] = str(first_seen[term])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(GLOSSARY_HEADER)
+        for term in sorted(rows):
+            writer.writerow(rows[term])
+    os.replace(tmp_path, path)
+    return new_terms, sum(1 for row in rows.values() if row[1].strip())
+
 # === MAIN SCRIPT =========================================================
 if __name__ == "__main__":
-    print(f"Starting glossary generation for pages {START_PAGE}-{END_PAGE}...")
     try:
-        # --- MODIFIED: Use the page range to load only the necessary pages ---
-        images = convert_from_path(
-            PDF_PATH,
-            dpi=300,
-            poppler_path=POPPLER_PATH,
-            first_page=START_PAGE,
-            last_page=END_PAGE
-        )
-        
-        all_text = ""
-        print(f"Found {len(images)} pages to process. Performing OCR...")
-        
-        for i, image in enumerate(images):
-            page_num = START_PAGE + i
-            print(f"  - Reading page {page_num}...")
-            all_text += pytesseract.image_to_string(image, lang='eng+san') + "\n"
-        
-        print("\nOCR complete. Finding all unique parenthetical terms...")
-        
-        # This pattern finds all text inside parentheses
-        found_terms = re.findall(r'\(([^)]+)\)', all_text)
-        
-        # Clean up the found terms to get a unique set
-        cleaned_terms = set()
-        for term in found_terms:
-            clean_term = term.replace('-\n', '').replace('\n', ' ').replace('*', '').strip().lower()
-            if ' ' not in clean_term and len(clean_term) > 1 and clean_term.isalpha():
-                cleaned_terms.add(clean_term)
-        
-        unique_sorted_terms = sorted(list(cleaned_terms))
-        
-        # Save the unique glossary to a CSV file, ready for you to edit
-        with open(GLOSSARY_DB_PATH, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Original", "Corrected IAST"]) # Write a header row
-            for term in unique_sorted_terms:
-                writer.writerow([term, ""]) # Write the term in the first column, leaving the second empty
+        end_page = END_PAGE or pdfinfo_from_path(PDF_PATH, poppler_path=POPPLER_PATH)["Pages"]
+        print(f"Starting glossary generation for pages {START_PAGE}-{end_page}...")
+
+        # A page that fails to OCR is reported and skipped; the rest are still mined.
+        runner = PipelineRunner(RUN_DIR, [("ocr", ocr_page), ("terms", extract_terms)])
+        try:
+            runner.run(range(START_PAGE, end_page + 1))
+            print("\nOCR complete. Counting parenthetical terms across all mined pages...")
+            frequency, first_seen = mine_terms(runner)
+        finally:
+            runner.close()
+
+        new_terms, corrected = merge_glossary(GLOSSARY_DB_PATH, frequency, first_seen, OLD_GLOSSARY_DB_PATH)
 
         print("\n" + "="*50)
-        print(f"✅✅✅ Success! Glossary file has been created at: ✅✅✅")
-        print(GLOSSARY_DB_PATH)
+        print(f"✅ Glossary updated at: {GLOSSARY_DB_PATH}")
+        print(f"   {len(frequency)} terms found, {len(new_terms)} new, {corrected} corrections kept.")
         print("="*50)
-        print("\n--> NEXT STEP: Open this CSV file and fill in the 'Corrected IAST' column.")
+        for term in sorted(new_terms, key=lambda t: -frequency[t])[:20]:
+            print(f"   new: {term} (x{frequency[term]}, first on page {first_seen[term]})")
+        print("\n--> NEXT STEP: Fill in the 'Corrected IAST' column for the new terms.")
 
     except Exception as e:
-        print(f"\n❌ An unexpected error occurred: {e}")
\ No newline at end of file
+        print(f"\n❌ An unexpected error occurred: {e}")
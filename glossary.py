@@ -0,0 +1,152 @@
+import re
+import csv
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+# Term glossary matched against running text in one left-to-right scan.
+# Keys are normalised (case, diacritics, '*' marks and line-break hyphens
+# removed), so "Pramāṇa", "pramana" and "pra- mana" are the same term.
+# Multi-word terms live in a trie keyed by normalised word, so the scan costs
+# one dict step per word however many terms are loaded.
+
+# === CONFIGURATION ===
+KEY_CACHE_SIZE = 100_000
+
+GlossaryMatch = namedtuple("GlossaryMatch", "start end text term value")
+
+# A word is a run of letters and combining marks; "pra- meya" and
+# "pra-\nmeya" (hyphenation across a line break) count as one word.
+_LETTER = r"(?:[^\W\d_]|[\u0300-\u036f])"
+_WORD = re.compile(rf"{_LETTER}+(?:-\s*{_LETTER}+)*")
+_JOINER = re.compile(r"[\s\-*]+")
+
+
+# === NORMALISATION ===
+def strip_diacritics(text):
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def normalize_key(term):
+    """'Pra- māṇa*' → 'pramana'. Used for both glossary keys and text words."""
+    return _JOINER.sub("", strip_diacritics(term).lower())
+
+
+def _words(text):
+    return [normalize_key(m.group()) for m in _WORD.finditer(text)]
+
+
+# === GLOSSARY ===
+class Glossary:
+    """Terms with a canonical form and an optional value (gloss or correction).
+
+    ``lookup`` answers a single term; ``find``/``sub`` locate every term in a
+    text, longest multi-word match first.
+    """
+
+    def __init__(self, name="glossary"):
+        self.name = name
+        self.entries = {}      # normalised key -> (term, value)
+        self.trie = {}         # normalised word -> child node; "" holds the key
+        self.collisions = []   # (kept term, dropped term) sharing one key
+        self.max_words = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, term):
+        return self.entry(term) is not None
+
+    def add(self, term, value=None):
+        words = _words(term)
+        if not words:
+            return
+        key = " ".join(words)
+        if key in self.entries:
+            kept = self.entries[key][0]
+            if kept != term:
+                self.collisions.append((kept, term))
+            return
+        self.entries[key] = (term, value)
+        node = self.trie
+        for word in words:
+            node = node.setdefault(word, {})
+        node[""] = key
+        if len(words) > 1:
+            # Also match the compound written as one word ("nyāya-sūtra").
+            self.trie.setdefault("".join(words), {}).setdefault("", key)
+        self.max_words = max(self.max_words, len(words))
+
+    def update(self, mapping):
+        for term, value in mapping.items():
+            self.add(term, value)
+        return self
+
+    @classmethod
+    def from_dict(cls, mapping, name="glossary"):
+        return cls(name).update(mapping)
+
+    @classmethod
+    def from_csv(cls, path, term_col=0, value_col=1, header=True, name=None):
+        """Loads a term list; rows whose value is blank are kept as bare terms."""
+        glossary = cls(name or path)
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            if header:
+                next(reader, None)
+            for row in reader:
+                if len(row) > term_col and row[term_col].strip():
+                    value = row[value_col].strip() if len(row) > value_col else ""
+                    glossary.add(row[term_col].strip(), value or None)
+        return glossary
+
+    # --- Single-term lookup ---
+    def entry(self, term):
+        return self.entries.get(" ".join(_words(term)))
+
+    def lookup(self, term, default=None):
+        """Value for ``term``, or ``default`` if unknown or without a value."""
+        entry = self.entry(term)
+        return entry[1] if entry and entry[1] is not None else default
+
+    # --- Matching in running text ---
+    def find(self, text):
+        """Every glossary term in ``text``, as non-overlapping ``GlossaryMatch``es."""
+        tokens = [(m.start(), m.end(), normalize_key(m.group())) for m in _WORD.finditer(text)]
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self.trie
+            best = best_key = None
+            j = i
+            while j < len(tokens) and j - i < self.max_words:
+                # Multi-word terms may only span whitespace between words.
+                if j > i and text[tokens[j - 1][1]:tokens[j][0]].strip():
+                    break
+                node = node.get(tokens[j][2])
+                if node is None:
+                    break
+                if "" in node:
+                    best, best_key = j, node[""]
+                j += 1
+            if best is None:
+                i += 1
+                continue
+            start, end = tokens[i][0], tokens[best][1]
+            term, value = self.entries[best_key]
+            matches.append(GlossaryMatch(start, end, text[start:end], term, value))
+            i = best + 1
+        return matches
+
+    def sub(self, repl, text):
+        """Replaces every match with ``repl(match)`` (like ``re.sub`` with a function)."""
+        out = []
+        last = 0
+        for match in self.find(text):
+            out.append(text[last:match.start])
+            out.append(repl(match))
+            last = match.end
+        out.append(text[last:])
+        return "".join(out)
@@ -5,6 +5,7 @@ import pytesseract
 from pdf2image import convert_from_path
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
+from line_scorer import LineScorer
 from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 
 # === CONFIGURATION ===
@@ -25,24 +26,10 @@ def clean_ocr_text(text):
     text = re.sub(r"(?<=\w)\)(?=\w)", "", text)
     return text
 
+BORDER_FILTER = LineScorer(name="borders")
+
 def remove_ascii_borders(text):
-    lines = text.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if re.fullmatch(r"[|¦¬\-_=~!\.\[\]{}()<>\\/]{4,}", stripped):
-            continue
-        if re.match(r"^[|!¬:;\-_=~]{2,}", stripped) and len(re.findall(r"[a-zA-Z]", stripped)) < 10:
-            continue
-        tokens = stripped.split()
-        real_words = [w for w in tokens if len(w) >= 4 and re.match(r"[a-zA-Z]{3,}", w)]
-        if len(real_words) < 2 and len(tokens) > 4:
-            continue
-        short_words = [w for w in tokens if len(w) <= 3]
-        if len(tokens) > 5 and len(short_words) / len(tokens) > 0.7:
-            continue
-        cleaned_lines.append(line)
-    return "\n".join(cleaned_lines)
+    return BORDER_FILTER(text)
 
 # === SANITIZE AND TRANSLITERATE ===
 def transliterate_gloss(line):
@@ -87,4 +74,5 @@ for i, image in enumerate(images):
 with open("output.txt", "w", encoding="utf-8") as f:
     f.write(all_cleaned_text)
 
+print(BORDER_FILTER.report())
 print("\u2705 Done. Output written to output.txt")
\ No newline at end of file
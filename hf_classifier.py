@@ -0,0 +1,163 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from label_classifier import classifier_threshold, passes_threshold
+
+# Batched front-end for the Hugging Face Sanskrit/English text classifier.
+# Callers hand over every line of a page at once: uncached lines are
+# deduplicated, sorted by length and run through the transformers pipeline
+# in batches of BATCH_SIZE. The pipeline pads each batch only to its longest
+# line, so sorting keeps the padding (and wasted compute) small. P(Sanskrit)
+# per line is cached in a bounded LRU owned by the instance, which unlike
+# lru_cache on a method doesn't pin the instance or mix instances' results.
+# The threshold is read once, from config.ini's classifier_threshold unless
+# given.
+#
+# backend="onnx" runs an onnx_classifier export (int8 by default) through
+# onnxruntime instead of torch; "auto" picks it when the export and
+# onnxruntime are there. Neither torch nor transformers is imported then.
+# device="auto" is the CPU for ONNX and the first GPU, if any, for torch.
+
+# === CONFIGURATION ===
+HF_MODEL = "buddhist-nlp/sanskrit-classification"
+SANSKRIT_LABEL = "sanskrit"
+BATCH_SIZE = 32
+MAX_CHARS = 512
+CACHE_SIZE = 20_000
+HF_BACKEND = os.environ.get("HF_BACKEND", "auto")    # auto | torch | onnx
+
+
+class BoundedCache:
+    """Thread-safe LRU mapping with at most ``size`` entries."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        """``{key: value}`` for the cached keys, marking them recently used."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            for key, value in items:
+                self._data[key] = value
+                self._data.move_to_end(key)
+                while len(self._data) > self.size:
+                    self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _torch_device():
+    """The first CUDA device for the torch pipeline, or -1 (CPU)."""
+    import torch
+    return 0 if torch.cuda.is_available() else -1
+
+
+class HFSanskritClassifier:
+    """P(Sanskrit) per line from a transformers text-classification model, a page at a time.
+
+    ``classifier(line)`` applies the threshold; call ``classify_many(lines)``
+    with a whole page first so that single-line calls are cache hits.
+    """
+
+    def __init__(self, model=HF_MODEL, threshold=None, batch_size=BATCH_SIZE, max_chars=MAX_CHARS,
+                 cache_size=CACHE_SIZE, device=-1, backend=HF_BACKEND, onnx_dir=None, quantized=True,
+                 ocr_workers=0):
+        import onnx_classifier
+        self.model = model
+        self.onnx_dir = onnx_dir or onnx_classifier.ONNX_DIR
+        self.quantized = quantized
+        self.ocr_workers = ocr_workers
+        if backend == "auto":
+            backend = "onnx" if device in (-1, "auto") and onnx_classifier.onnx_available(self.onnx_dir, model) else "torch"
+        if device == "auto":
+            device = _torch_device() if backend == "torch" else -1
+        self.backend = backend
+        self.threshold = classifier_threshold() if threshold is None else threshold
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.device = device
+        self.cache = BoundedCache(cache_size)
+        self._pipeline = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.batches = 0
+        self.histogram = Counter()         # probability decile -> lines classified
+
+    def _get_pipeline(self):
+        if self._pipeline is None and self.backend == "onnx":
+            from onnx_classifier import OnnxTextClassifier, onnx_threads
+            self._pipeline = OnnxTextClassifier(self.onnx_dir, quantized=self.quantized,
+                                                threads=onnx_threads(self.ocr_workers))
+        elif self._pipeline is None:
+            from transformers import pipeline
+            self._pipeline = pipeline("text-classification", model=self.model, tokenizer=self.model,
+                                      device=self.device)
+        return self._pipeline
+
+    def _sanskrit_probability(self, scores):
+        return next((s["score"] for s in scores if s["label"].lower() == SANSKRIT_LABEL), 0.0)
+
+    def _run(self, texts):
+        """P(Sanskrit) for ``texts``, longest first so each batch pads to similar lengths."""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        with self._lock:                   # one model, one batch stream at a time
+            outputs = self._get_pipeline()([texts[i] for i in order], batch_size=self.batch_size,
+                                           truncation=True, top_k=None)
+        probabilities = [0.0] * len(texts)
+        for i, scores in zip(order, outputs):
+            probabilities[i] = self._sanskrit_probability(scores)
+        self.batches += -(-len(texts) // self.batch_size)
+        return probabilities
+
+    def probabilities(self, lines):
+        """P(Sanskrit) for each line; only uncached lines reach the model."""
+        keys = [line[:self.max_chars] for line in lines]
+        known = self.cache.get_many(keys)
+        missing = [key for key in dict.fromkeys(keys) if key not in known]
+        self.hits += len(keys) - len(missing)
+        if missing:
+            try:
+                scored = list(zip(missing, self._run(missing)))
+            except Exception as e:
+                print(f"⚠️ Classification error: {e}")
+                scored = [(key, 0.0) for key in missing]
+            else:
+                self.cache.put_many(scored)
+            self.calls += len(missing)
+            known.update(scored)
+        probabilities = [known[key] for key in keys]
+        self.histogram.update(min(int(p * 10), 9) for p in probabilities)
+        return probabilities
+
+    def classify_many(self, lines):
+        return passes_threshold(self.probabilities(lines), self.threshold)
+
+    def is_sanskrit(self, line):
+        return self.classify_many([line])[0]
+
+    __call__ = is_sanskrit
+
+    def report(self):
+        lines = [f"=== HF classifier: {self.model} ({self.backend}) ===",
+                 f"Scored {self.calls} lines in {self.batches} batches, {self.hits} cache hits "
+                 f"(threshold {self.threshold})",
+                 "  P(skt) " + " ".join(f"{d / 10:.1f}" for d in range(10)),
+                 "  lines  " + " ".join(f"{self.histogram[d]:>3}" for d in range(10))]
+        return "\n".join(lines)
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # optional: falls back to /proc or getrusage
+    psutil = None
+
+# === CONFIGURATION ===
+RSS_SAMPLE_INTERVAL = 0.5  # seconds
+PERCENTILES = (50, 90, 99)
+
+
+# === MEMORY ===
+def current_rss_mb():
+    """Resident set size of this process in MB (best effort per platform)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1e3
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+    except ImportError:
+        return 0.0
+
+
+def process_memory_mb():
+    """``{"rss", "pss", "uss"}`` of this process in MB; pss/uss only where the
+    platform reports them. Pages of a shared mmap count fully in every
+    worker's RSS but are split between them in PSS."""
+    memory = {"rss": round(current_rss_mb(), 1)}
+    if psutil is not None:
+        try:
+            full = psutil.Process().memory_full_info()
+            memory["uss"] = round(full.uss / 1e6, 1)
+            if hasattr(full, "pss"):
+                memory["pss"] = round(full.pss / 1e6, 1)
+            return memory
+        except (psutil.AccessDenied, AttributeError):
+            pass
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss"] = round(int(line.split()[1]) / 1e3, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summary(values):
+    summary = {"count": len(values), "total_s": round(sum(values), 4), "max_s": round(max(values, default=0.0), 4)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}_s"] = round(percentile(values, pct), 4)
+    return summary
+
+
+# === RUN METRICS ===
+class RunMetrics:
+    """Thread-safe stage timers, counters and peak RSS for one pipeline run."""
+
+    def __init__(self, name="run"):
+        self.name = name
+        self.started = time.time()
+        self.timings = {}      # stage -> [seconds]
+        self.page_times = {}   # page -> {stage: seconds}
+        self.counters = {}
+        self.workers = {}      # pid -> peak {"rss", "pss", "uss"} of worker processes
+        self.peak_rss_mb = current_rss_mb()
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._stop = threading.Event()
+
+    # --- Timers & counters ---
+    @contextmanager
+    def stage(self, name, page=None):
+        """Times a block. Names like ``"ocr/tesseract"`` mark sub-steps of an
+        outer stage; they are reported but left out of per-page totals."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, page)
+
+    def record(self, name, elapsed, page=None):
+        """Adds one timing measured elsewhere, e.g. only once a call has succeeded."""
+        with self._lock:
+            self.timings.setdefault(name, []).append(elapsed)
+            if page is not None:
+                per_page = self.page_times.setdefault(page, {})
+                per_page[name] = per_page.get(name, 0.0) + elapsed
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_worker(self, pid, memory):
+        """Keeps the peak memory seen for a worker process (see process_memory_mb)."""
+        with self._lock:
+            peak = self.workers.setdefault(str(pid), {})
+            for key, value in memory.items():
+                peak[key] = max(peak.get(key, 0.0), value)
+
+    # --- RSS sampling ---
+    def _sample_loop(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.sample_rss()
+
+    def sample_rss(self):
+        rss = current_rss_mb()
+        with self._lock:
+            self.peak_rss_mb = max(self.peak_rss_mb, rss)
+
+    def start_sampling(self):
+        if self._sampler is None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="rss-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop_sampling(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self.sample_rss()
+
+    # --- Reporting ---
+    def report(self):
+        with self._lock:
+            page_totals = [sum(t for s, t in stages.items() if "/" not in s)
+                           for stages in self.page_times.values()]
+            return {
+                "name": self.name,
+                "wall_time_s": round(time.time() - self.started, 3),
+                "peak_rss_mb": round(self.peak_rss_mb, 1),
+                "stages": {name: _summary(values) for name, values in self.timings.items()},
+                "pages": {"count": len(page_totals), **_summary(page_totals)},
+                "per_page": {str(p): {s: round(t, 4) for s, t in stages.items()}
+                             for p, stages in sorted(self.page_times.items())},
+                "counters": dict(self.counters),
+                "workers": {pid: dict(memory) for pid, memory in self.workers.items()},
+            }
+
+    def format_report(self, report=None):
+        report = report or self.report()
+        lines = [
+            f"=== Run report: {report['name']} ===",
+            f"Wall time: {report['wall_time_s']:.1f}s   Peak RSS: {report['peak_rss_mb']:.1f} MB   "
+            f"Pages: {report['pages']['count']}",
+            "",
+            f"{'stage':<16}{'calls':>7}{'total s':>10}{'share':>8}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f"{'max':>9}",
+        ]
+        grand_total = sum(s["total_s"] for name, s in report["stages"].items() if "/" not in name) or 1.0
+        for name, s in sorted(report["stages"].items(), key=lambda item: -item[1]["total_s"]):
+            lines.append(
+                f"{name:<16}{s['count']:>7}{s['total_s']:>10.2f}{s['total_s'] / grand_total:>8.1%}"
+                + "".join(f"{s[f'p{p}_s']:>9.3f}" for p in PERCENTILES) + f"{s['max_s']:>9.3f}"
+            )
+        pages = report["pages"]
+        if pages["count"]:
+            lines.append("")
+            lines.append("Per page: " + "  ".join(f"p{p}={pages[f'p{p}_s']:.2f}s" for p in PERCENTILES)
+                         + f"  max={pages['max_s']:.2f}s")
+        if report["counters"]:
+            lines.append("")
+            lines.append("Counters: " + ", ".join(f"{k}={v}" for k, v in sorted(report["counters"].items())))
+        if report.get("workers"):
+            lines.append("")
+            lines.append("Worker memory (MB):")
+            for pid, memory in sorted(report["workers"].items()):
+                lines.append(f"  pid {pid:<8}" + "  ".join(f"{k}={v:.1f}" for k, v in sorted(memory.items())))
+        return "\n".join(lines)
+
+    def write_report(self, out_dir, prefix=None):
+        """Writes ``<prefix>_report.json`` and ``<prefix>_report.txt``; returns the text report."""
+        prefix = prefix or self.name
+        os.makedirs(out_dir, exist_ok=True)
+        report = self.report()
+        text = self.format_report(report)
+        with open(os.path.join(out_dir, f"{prefix}_report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        with open(os.path.join(out_dir, f"{prefix}_report.txt"), "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        return text
+
+
+# Shared instance for scripts that instrument module-level helpers.
+METRICS = RunMetrics()
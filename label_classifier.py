@@ -0,0 +1,159 @@
+import os
+import threading
+import configparser
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+import llm_grammar
+
+# Confidence-scored Sanskrit/English classification with the llama.cpp model.
+# Instead of reading generated text, each line costs one forward pass: a
+# local Llama's logits give every label's score directly, and a server runs
+# a grammar-constrained one-token completion whose top-k logprobs do.
+# P(Sanskrit) is the softmax over the labels' logprobs at a
+# calibration temperature (fit_temperature() refits it on labelled lines),
+# and a line counts as Sanskrit when it reaches the threshold the HF
+# classifier uses too ([PROCESSING] classifier_threshold in config.ini;
+# both compare through passes_threshold()).
+# Logprobs are cached per line (bounded, least recently used evicted), so
+# recalibrating or moving the threshold never re-runs the model.
+
+# === CONFIGURATION ===
+CONFIG_PATH = "config.ini"
+DEFAULT_THRESHOLD = 0.85
+CACHE_SIZE = 20_000
+CLASSIFY_PROMPT = "Classify this text as Sanskrit or English: '{line}'\nAnswer:"
+TEMPERATURE_GRID = np.geomspace(0.25, 4.0, 41)
+
+
+def classifier_threshold(path=CONFIG_PATH):
+    """[PROCESSING] classifier_threshold from config.ini, shared by the LLM and HF classifiers."""
+    config = configparser.ConfigParser()
+    if os.path.exists(path):
+        config.read(path)
+    return config.getfloat("PROCESSING", "classifier_threshold", fallback=DEFAULT_THRESHOLD)
+
+
+def passes_threshold(probabilities, threshold):
+    """Sanskrit verdicts: a line is Sanskrit when its probability reaches ``threshold``."""
+    return [p >= threshold for p in probabilities]
+
+
+class LLMLabelClassifier:
+    """P(Sanskrit) per line from label logprobs; ``classifier(line)`` applies the threshold.
+
+    ``llm`` is a llama_cpp.Llama or an llm_server.LLMClient; a client's
+    requests for a batch of lines are all in flight at once. Counts go to
+    ``metrics`` (a RunMetrics) when given.
+    """
+
+    def __init__(self, llm, threshold=None, temperature=1.0, labels=llm_grammar.CLASSIFY_LABELS,
+                 prompt=CLASSIFY_PROMPT, cache_size=CACHE_SIZE, metrics=None):
+        self.llm = llm
+        self.threshold = classifier_threshold() if threshold is None else threshold
+        self.temperature = temperature
+        self.labels = labels
+        self.prompt = prompt
+        self.cache_size = cache_size
+        self.metrics = metrics
+        self.local = llm_grammar.is_local(llm)
+        self.token_ids = llm_grammar.label_token_ids(llm, labels) if self.local else None
+        self.request = llm_grammar.label_request(labels)
+        self._cache = OrderedDict()        # line -> label logprobs
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.histogram = Counter()         # probability decile -> lines classified
+
+    def _count(self, name, value=1):
+        if self.metrics is not None:
+            self.metrics.count(name, value)
+
+    def _score(self, lines):
+        """``(label logprobs per line, tokens used)``."""
+        prompts = [self.prompt.format(line=line) for line in lines]
+        if self.local:
+            with self._lock:               # one llama context is not safe to share between threads
+                scored = [llm_grammar.label_scores(self.llm, p, self.token_ids) for p in prompts]
+            return [logprobs for logprobs, _ in scored], sum(tokens for _, tokens in scored)
+        if hasattr(self.llm, "submit"):
+            futures = [self.llm.submit("complete", {"prompt": p, **self.request}) for p in prompts]
+            outputs = [f.result(self.llm.timeout) for f in futures]
+        else:
+            with self._lock:
+                outputs = [llm_grammar.complete(self.llm, p, **self.request) for p in prompts]
+        return ([self._logprobs(output) for output in outputs],
+                sum(o.get("usage", {}).get("total_tokens", 0) for o in outputs))
+
+    def _logprobs(self, output):
+        logprobs = llm_grammar.label_logprobs(output, self.labels)
+        if logprobs is None:               # no logprobs from the backend: the generated label is certain
+            chosen = llm_grammar.generated_label(output, self.labels)
+            logprobs = [0.0 if label == chosen else float("-inf") for label in self.labels]
+        return logprobs
+
+    def logprobs(self, lines):
+        """Label logprobs for each line, running the model once per uncached line."""
+        known = {}
+        with self._lock:
+            for line in lines:
+                if line in self._cache:
+                    self._cache.move_to_end(line)
+                    known[line] = self._cache[line]
+        missing = list(dict.fromkeys(line for line in lines if line not in known))
+        hits = len(lines) - len(missing)
+        self.hits += hits
+        self._count("classify_cache_hits", hits)
+        if missing:
+            scored, tokens = self._score(missing)
+            self.calls += len(missing)
+            self._count("llm_calls", len(missing))
+            self._count("llm_tokens", tokens)
+            with self._lock:
+                for line, logprobs in zip(missing, scored):
+                    known[line] = self._cache[line] = logprobs
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return [known[line] for line in lines]
+
+    def probabilities(self, lines):
+        """Calibrated P(Sanskrit) for each line."""
+        probabilities = [llm_grammar.label_probabilities(lp, self.temperature)[0] for lp in self.logprobs(lines)]
+        self.histogram.update(min(int(p * 10), 9) for p in probabilities)
+        return probabilities
+
+    def probability(self, line):
+        return self.probabilities([line])[0]
+
+    def classify_many(self, lines):
+        return passes_threshold(self.probabilities(lines), self.threshold)
+
+    def is_sanskrit(self, line):
+        return self.classify_many([line])[0]
+
+    __call__ = is_sanskrit
+
+    def fit_temperature(self, lines, is_sanskrit):
+        """Picks the temperature minimising log loss on labelled lines; returns it."""
+        margins = np.array([lp[0] - max(lp[1:]) for lp in self.logprobs(lines)])
+        truth = np.asarray(is_sanskrit, dtype=float)
+        finite = np.isfinite(margins)
+        if not finite.any():
+            return self.temperature
+        margins, truth = margins[finite], truth[finite]
+
+        def log_loss(t):
+            p = np.clip(1.0 / (1.0 + np.exp(-margins / t)), 1e-9, 1 - 1e-9)
+            return -np.mean(truth * np.log(p) + (1 - truth) * np.log(1 - p))
+
+        self.temperature = float(min(TEMPERATURE_GRID, key=log_loss))
+        return self.temperature
+
+    def report(self):
+        lines = ["=== LLM label classifier ===",
+                 f"Scored {self.calls} lines, {self.hits} cache hits "
+                 f"(threshold {self.threshold}, temperature {self.temperature:.2f})",
+                 "  P(skt) " + " ".join(f"{d / 10:.1f}" for d in range(10)),
+                 "  lines  " + " ".join(f"{self.histogram[d]:>3}" for d in range(10))]
+        return "\n".join(lines)
@@ -0,0 +1,183 @@
+import re
+from collections import Counter
+from functools import cached_property
+
+# Keep/drop rules for OCR lines, evaluated on statistics gathered once per
+# line. A rule is ``(name, action, predicate)``; the first rule whose
+# predicate holds decides the line ("keep" or "drop"), otherwise the filter's
+# default applies. Every drop is counted under the rule's name for tuning.
+
+# === CONFIGURATION ===
+EXAMPLES_PER_RULE = 5
+MIN_LETTERS = 10          # symbol-led lines need this many letters to stay
+SHORT_WORD_LEN = 3
+SHORT_WORD_SHARE = 0.7
+KEEP_KEYWORDS = ("adhikarana", "sastra", "vedanta", "sri", "krsna", "truth", "chapter", "page")
+
+_BORDER = re.compile(r"[|¦¬\-_=~!.\[\]{}()<>\\/]{4,}")
+_SYMBOL_LEAD = re.compile(r"[|!¬:;\-_=~]{2,}")
+_SYMBOL_START = re.compile(r"[|!¬:;\-_=~]")
+_ASCII_ART = re.compile(r"[\-=\\+*/]{4,}")
+_WORD_START = re.compile(r"[a-zA-Z]{3}")
+
+_ASCII = bytes(range(128))
+_NOT_LETTERS = bytes(c for c in _ASCII if not chr(c).isalpha())
+_NOT_ALNUM = bytes(c for c in _ASCII if not chr(c).isalnum())
+
+
+# === LINE STATISTICS ===
+class LineStats:
+    """Character-class counts and tokens of one stripped line.
+
+    Each statistic is computed on first use and then shared by every rule,
+    so cheap rules that decide a line early never pay for the token scan.
+    """
+
+    def __init__(self, stripped):
+        self.text = stripped
+        self.length = len(stripped)
+
+    @cached_property
+    def _ascii(self):
+        return self.text.encode("ascii", "ignore")
+
+    @cached_property
+    def letters(self):
+        """Count of [a-zA-Z]."""
+        return len(self._ascii.translate(None, _NOT_LETTERS))
+
+    @cached_property
+    def alnum(self):
+        """Count of [a-zA-Z0-9]."""
+        return len(self._ascii.translate(None, _NOT_ALNUM))
+
+    @cached_property
+    def has_alpha(self):
+        return self.letters > 0 or any(map(str.isalpha, self.text))
+
+    @cached_property
+    def tokens(self):
+        return self.text.split()
+
+    @cached_property
+    def word_counts(self):
+        """``(real_words, short_words)``: tokens of 4+ chars starting with three
+        ASCII letters, and tokens of at most SHORT_WORD_LEN chars."""
+        real = short = 0
+        for token in self.tokens:
+            if len(token) <= SHORT_WORD_LEN:
+                short += 1
+            elif _WORD_START.match(token):
+                real += 1
+        return real, short
+
+
+# === RULES ===
+def is_border(s):
+    return _BORDER.fullmatch(s.text) is not None
+
+def is_symbol_led(s):
+    return _SYMBOL_LEAD.match(s.text) is not None and s.letters < MIN_LETTERS
+
+def is_symbol_started(s):
+    return _SYMBOL_START.match(s.text) is not None and s.alnum < MIN_LETTERS
+
+def has_few_real_words(s):
+    return len(s.tokens) > 4 and s.word_counts[0] < 2
+
+def is_mostly_short_tokens(s):
+    return len(s.tokens) > 5 and s.word_counts[1] / len(s.tokens) > SHORT_WORD_SHARE
+
+def is_ascii_art(s):
+    return _ASCII_ART.fullmatch(s.text) is not None
+
+
+BORDER_RULES = [
+    ("border", "drop", is_border),
+    ("symbol_led", "drop", is_symbol_led),
+]
+
+GIBBERISH_RULES = BORDER_RULES + [
+    ("few_real_words", "drop", has_few_real_words),
+    ("short_tokens", "drop", is_mostly_short_tokens),
+]
+
+# gem1: drop borders and symbol lines, then keep only lines that look like text.
+CONTENT_RULES = [
+    ("border", "drop", is_border),
+    ("symbol_started", "drop", is_symbol_started),
+    ("empty", "drop", lambda s: not s.text),
+    ("no_letters", "drop", lambda s: s.alnum < 3 and not s.has_alpha),
+    ("heading", "keep", lambda s: s.text.isupper() and len(s.tokens) >= 4),
+    ("keyword", "keep", lambda s: any(k in s.text.lower() for k in KEEP_KEYWORDS)),
+    ("words", "keep", lambda s: len(s.tokens) >= 3 and s.has_alpha),
+    ("letter_rich", "keep", lambda s: s.length > 15 and s.letters / s.length > 0.5),
+]
+
+ASCII_ART_RULES = [
+    ("ascii_art", "drop", is_ascii_art),
+]
+
+
+# === FILTER ===
+class LineFilter:
+    """Runs a rule list over every line of a page in one batch.
+
+    ``keep_stripped`` selects whether kept lines are emitted stripped or as
+    read. Drop counts and a few example lines per rule accumulate across
+    calls; see ``report()``.
+    """
+
+    def __init__(self, rules, default="keep", keep_stripped=False, name="lines"):
+        self.rules = list(rules)
+        self.default = default
+        self.keep_stripped = keep_stripped
+        self.name = name
+        self.dropped = Counter()
+        self.kept = Counter()
+        self.examples = {}
+
+    def decide(self, stripped):
+        """Returns ``(action, rule_name)`` for one stripped line."""
+        stats = LineStats(stripped)
+        for name, action, predicate in self.rules:
+            if predicate(stats):
+                return action, name
+        return self.default, "default"
+
+    def filter_lines(self, lines):
+        kept = []
+        for line in lines:
+            stripped = line.strip()
+            action, rule = self.decide(stripped)
+            if action == "keep":
+                self.kept[rule] += 1
+                kept.append(stripped if self.keep_stripped else line)
+            else:
+                self.dropped[rule] += 1
+                examples = self.examples.setdefault(rule, [])
+                if len(examples) < EXAMPLES_PER_RULE:
+                    examples.append(stripped)
+        return kept
+
+    def apply(self, text):
+        return "\n".join(self.filter_lines(text.splitlines()))
+
+    __call__ = apply
+
+    def explain(self, text):
+        """``[(line, action, rule)]`` for every line, without touching the counters."""
+        return [(line, *self.decide(line.strip())) for line in text.splitlines()]
+
+    def report(self):
+        total_dropped = sum(self.dropped.values())
+        lines = [f"=== Line filter: {self.name} ===",
+                 f"Kept {sum(self.kept.values())}, dropped {total_dropped}"]
+        for rule, n in self.dropped.most_common():
+            lines.append(f"  {rule:<16}{n:>7}  e.g. " + " | ".join(repr(e[:40]) for e in self.examples[rule][:3]))
+        return "\n".join(lines)
+
+    def reset(self):
+        self.dropped.clear()
+        self.kept.clear()
+        self.examples.clear()
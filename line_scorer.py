@@ -0,0 +1,250 @@
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+# Batch OCR-garbage scorer. All lines of a page are featurized together with
+# numpy (one code-point array for the page, per-line counts via bincount)
+# and scored by a small logistic model: score = sigmoid(features @ weights)
+# is the probability that a line is junk (borders, speckle, symbol noise).
+# Drop-in for line_filter.LineFilter: same apply/filter_lines/report API.
+# Retrain the weights with ``python line_scorer.py``.
+
+# === CONFIGURATION ===
+GARBAGE_THRESHOLD = 0.5
+EXAMPLES_KEPT = 5
+TOKEN_LENGTH_EDGES = [2, 4, 8]      # token length buckets: 1, 2-3, 4-7, 8+
+TOKEN_COUNT_CAP = 8
+TABLE_SIZE = 0x3001                 # code points past this count as symbols
+WORD_CACHE_SIZE = 100_000
+
+# Words that make a line almost certainly text; extend per book via ``vocabulary``.
+COMMON_WORDS = frozenset("""
+a an the of and or to in on at by for from with as is are was were be been it its this that these
+those which who whom what when where why how not no all any some one two three he she they we you
+his her their our your him them us i my me there here than then so if but into upon unto also only
+such same other each both more most very can may must shall should would will has have had do does
+did done knowledge soul body mind sense object lord truth god verse chapter book page translation
+purport sri krsna vedanta sastra adhikarana brahman atma dharma yoga bhakti sutra
+""".split())
+
+FEATURE_NAMES = [
+    "bias", "letters", "symbols", "digits", "devanagari",
+    "tokens_1", "tokens_2_3", "tokens_4_7", "tokens_8_plus",
+    "dictionary", "token_count",
+]
+
+# Fitted on synthetic pages (benchmark.synthetic_page_text) against generated
+# borders and OCR speckle by ``python line_scorer.py``.
+DEFAULT_WEIGHTS = np.array([
+    0.106, -1.92, 5.76, -2.05, -1.71,
+    3.62, 1.72, -3.42, -1.84,
+    -1.19, -1.03,
+])
+
+# Character classes, looked up by code point.
+OTHER, SPACE, LETTER, DIGIT, SYMBOL, DEVANAGARI = range(6)
+N_CLASSES = 6
+
+
+def _char_class(ch):
+    if ch.isspace():
+        return SPACE
+    if "ऀ" <= ch <= "ॿ":
+        return DEVANAGARI
+    if ch.isalpha() or unicodedata.combining(ch):
+        return LETTER
+    if ch.isdigit():
+        return DIGIT
+    if ch.isprintable():
+        return SYMBOL
+    return OTHER
+
+
+# One extra SYMBOL entry at the end catches every code point past the table.
+_CLASS_TABLE = np.array([_char_class(chr(c)) for c in range(TABLE_SIZE)] + [SYMBOL], dtype=np.uint8)
+_PUNCT = "".join(chr(c) for c in range(128) if _CLASS_TABLE[c] == SYMBOL) + "‘’“”—–।॥"
+
+
+def word_lookup(vocabulary):
+    """Cached ``token -> bool``, ignoring case and edge punctuation."""
+    return lru_cache(maxsize=WORD_CACHE_SIZE)(lambda word: word.lower().strip(_PUNCT) in vocabulary)
+
+
+_common_word = word_lookup(COMMON_WORDS)
+
+
+# === FEATURES ===
+def featurize(lines, is_word=_common_word):
+    """``(len(lines), len(FEATURE_NAMES))`` float array; lines must not contain newlines.
+    ``is_word`` is the dictionary test for a token (see ``word_lookup``)."""
+    n = len(lines)
+    features = np.zeros((n, len(FEATURE_NAMES)))
+    features[:, 0] = 1.0
+    if not n:
+        return features
+
+    joined = "\n".join(lines)
+    codes = np.frombuffer(joined.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    classes = _CLASS_TABLE[np.minimum(codes, TABLE_SIZE)]
+    newline = codes == 10
+    line_id = np.cumsum(newline, dtype=np.int32) - newline
+
+    counts = np.bincount(line_id * N_CLASSES + classes, minlength=n * N_CLASSES).reshape(n, N_CLASSES)
+    visible = np.maximum(counts.sum(axis=1) - counts[:, SPACE], 1)
+    features[:, 1] = counts[:, LETTER] / visible
+    features[:, 2] = (counts[:, SYMBOL] + counts[:, OTHER]) / visible
+    features[:, 3] = counts[:, DIGIT] / visible
+    features[:, 4] = counts[:, DEVANAGARI] / visible
+
+    # Tokens are maximal runs of non-space characters, exactly as str.split().
+    in_token = classes != SPACE
+    starts = in_token & ~np.concatenate(([False], in_token[:-1]))
+    token_id = np.cumsum(starts, dtype=np.int32) - 1
+    lengths = np.bincount(token_id[in_token])
+    token_line = line_id[starts]
+    buckets = np.digitize(lengths, TOKEN_LENGTH_EDGES)
+    histogram = np.bincount(token_line * 4 + buckets, minlength=n * 4).reshape(n, 4)
+    n_tokens = histogram.sum(axis=1)
+    features[:, 5:9] = histogram / np.maximum(n_tokens, 1)[:, None]
+
+    words = joined.split()
+    hits = np.fromiter(map(is_word, words), dtype=bool, count=len(words))
+    features[:, 9] = np.bincount(token_line, weights=hits, minlength=n) / np.maximum(n_tokens, 1)
+    features[:, 10] = np.minimum(n_tokens, TOKEN_COUNT_CAP) / TOKEN_COUNT_CAP
+    return features
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+# === SCORER ===
+class LineScorer:
+    """Scores and filters every line of a page in one batch.
+
+    Blank lines are kept untouched and never scored. ``keep_stripped``
+    selects whether kept lines are emitted stripped or as read. Scores of
+    dropped lines accumulate across calls for ``report()``.
+    """
+
+    def __init__(self, weights=None, threshold=GARBAGE_THRESHOLD, vocabulary=COMMON_WORDS,
+                 keep_stripped=False, name="lines"):
+        self.weights = DEFAULT_WEIGHTS if weights is None else np.asarray(weights, dtype=float)
+        self.threshold = threshold
+        self.is_word = _common_word if vocabulary is COMMON_WORDS else word_lookup(vocabulary)
+        self.keep_stripped = keep_stripped
+        self.name = name
+        self.kept = 0
+        self.dropped = 0
+        self.histogram = Counter()     # score decile -> lines
+        self.examples = []             # (score, line) of dropped lines
+
+    def score(self, lines):
+        """Garbage probability for each stripped line."""
+        return _sigmoid(featurize(lines, self.is_word) @ self.weights)
+
+    def filter_lines(self, lines):
+        stripped = [line.strip() for line in lines]
+        scored = [i for i, s in enumerate(stripped) if s]
+        scores = self.score([stripped[i] for i in scored])
+        deciles = np.bincount(np.minimum(scores * 10, 9).astype(int), minlength=10)
+        self.histogram.update(dict(enumerate(deciles.tolist())))
+        dropped = np.flatnonzero(scores >= self.threshold)
+        for j in dropped[:max(0, EXAMPLES_KEPT - len(self.examples))]:
+            self.examples.append((float(scores[j]), stripped[scored[j]]))
+        drop = {scored[j] for j in dropped}
+        self.kept += len(scored) - len(drop)
+        self.dropped += len(drop)
+        return [stripped[i] if self.keep_stripped else line
+                for i, line in enumerate(lines) if i not in drop]
+
+    def apply(self, text):
+        return "\n".join(self.filter_lines(text.splitlines()))
+
+    __call__ = apply
+
+    def explain(self, text):
+        """``[(line, score, {feature: value})]`` for every non-blank line, without touching the counters."""
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        features = featurize(lines, self.is_word)
+        scores = _sigmoid(features @ self.weights)
+        return [(line, float(score), dict(zip(FEATURE_NAMES[1:], row[1:].round(3))))
+                for line, score, row in zip(lines, scores, features)]
+
+    def report(self):
+        lines = [f"=== Line scorer: {self.name} ===",
+                 f"Kept {self.kept}, dropped {self.dropped} (threshold {self.threshold})",
+                 "  score  " + " ".join(f"{d / 10:.1f}" for d in range(10)),
+                 "  lines  " + " ".join(f"{self.histogram[d]:>3}" for d in range(10))]
+        for score, line in self.examples[:3]:
+            lines.append(f"  e.g. {score:.2f} {line[:40]!r}")
+        return "\n".join(lines)
+
+    def reset(self):
+        self.kept = self.dropped = 0
+        self.histogram.clear()
+        self.examples.clear()
+
+    def fit(self, lines, labels, epochs=2000, learning_rate=0.5, l2=1e-3):
+        """Logistic regression by batch gradient descent; ``labels`` are 1 for garbage."""
+        x = featurize(lines, self.is_word)
+        y = np.asarray(labels, dtype=float)
+        w = np.zeros(x.shape[1])
+        for _ in range(epochs):
+            gradient = x.T @ (_sigmoid(x @ w) - y) / len(y) + l2 * np.r_[0.0, w[1:]]
+            w -= learning_rate * gradient
+        self.weights = w
+        return self
+
+
+# === TRAINING DATA ===
+_BORDER_CHARS = "|¦¬-_=~!.[]{}()<>/\\*+:;'\","
+
+
+def garbage_lines(rng, n):
+    """Decorative borders, speckle and symbol runs as Tesseract emits them."""
+    out = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.3:
+            out.append(rng.choice("|¦¬-_=~.") * rng.randint(4, 60))
+        elif kind < 0.6:
+            out.append(" ".join("".join(rng.choice(_BORDER_CHARS + "ilIeao") for _ in range(rng.randint(1, 3)))
+                                for _ in range(rng.randint(1, 12))))
+        elif kind < 0.8:
+            out.append("".join(rng.choice(_BORDER_CHARS + "     ") for _ in range(rng.randint(3, 40))))
+        else:
+            words = ["|", "!", "i", "ee", "a", "—", "¦", "-", "~", "ae", "I", ".", ",", "wn", "oe"]
+            out.append(" ".join(rng.choice(words) for _ in range(rng.randint(2, 10))))
+    return [line for line in (l.strip() for l in out) if line]
+
+
+def training_set(rng, pages=200):
+    """Text lines from synthetic pages (label 0) and generated garbage (label 1)."""
+    import benchmark
+    sutras = benchmark.load_sutras()
+    text = [l.strip() for _ in range(pages) for l in benchmark.synthetic_page_text(rng, sutras).splitlines()]
+    text = [l for l in text if l]
+    garbage = garbage_lines(rng, len(text))
+    return text + garbage, [0] * len(text) + [1] * len(garbage)
+
+
+# === MAIN ===
+if __name__ == "__main__":
+    import random
+    from line_filter import LineFilter, GIBBERISH_RULES
+
+    lines, labels = training_set(random.Random(0))
+    scorer = LineScorer().fit(lines, labels)
+    print("weights = [" + ", ".join(f"{w:.3g}" for w in scorer.weights) + "]")
+
+    test_lines, test_labels = training_set(random.Random(1), pages=100)
+    y = np.array(test_labels)
+    predicted = scorer.score(test_lines) >= scorer.threshold
+    rules = LineFilter(GIBBERISH_RULES)
+    rule_dropped = np.array([rules.decide(l)[0] == "drop" for l in test_lines])
+    for name, p in (("line_scorer", predicted), ("GIBBERISH_RULES", rule_dropped)):
+        print(f"{name:<16} accuracy {np.mean(p == y):.3f}  "
+              f"text dropped {np.mean(p[y == 0]):.3f}  garbage kept {np.mean(~p[y == 1]):.3f}")
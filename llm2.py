@@ -4,6 +4,8 @@ from PIL import Image
 import pytesseract
 from llama_cpp import Llama
 from indic_transliteration.sanscript import transliterate, SLP1, IAST, DEVANAGARI
+from line_scorer import LineScorer
+import llm_grammar
 # from langdetect import detect, DetectorFactory # Uncomment if using language detection
 # DetectorFactory.seed = 0 # For reproducible results with langdetect
 
@@ -38,13 +40,17 @@ print(f"✅ Saved {len(image_paths)} pages as images.")
 print("🔍 Performing OCR on each page and segmenting lines...")
 # We'll get detailed OCR output with bounding boxes to help with line segmentation
 # If you don't need bounding boxes, image_to_string is fine, but you'll rely on newline chars
+# Junk lines (borders, speckle) are dropped per page so they never cost an LLM call.
+LINE_SCORER = LineScorer(keep_stripped=True, name="llm2 lines")
 ocr_raw_lines = []
 for img_path in image_paths:
     # Use output_type=pytesseract.Output.DICT for more structured output if needed
     # For now, let's stick to string and then split, assuming newlines are somewhat reliable
     text = pytesseract.image_to_string(Image.open(img_path), lang="eng+san")
-    ocr_raw_lines.extend([line.strip() for line in text.split("\n") if line.strip()]) # Get non-empty lines
+    page_lines = [line.strip() for line in text.split("\n") if line.strip()] # Get non-empty lines
+    ocr_raw_lines.extend(LINE_SCORER.filter_lines(page_lines))
 print("✅ OCR complete and lines extracted.")
+print(LINE_SCORER.report())
 
 # === STEP 3: Load Mistral (GGUF) ===
 print("🧠 Loading Mistral 7B GGUF model...")
@@ -62,41 +68,19 @@ def process_text_chunk(chunk_text):
     # Sanitize chunk_text for prompt
     cleaned_chunk = chunk_text.replace("'", "").replace("\"", "")[:500] # Limit size and remove problematic chars
 
-    # Prompt to classify and normalize Sanskrit
+    # Prompt to classify and normalize Sanskrit; NORMALIZE_GRAMMAR only admits the three answer forms
     prompt_classify_normalize = (
         "You are an expert in Sanskrit and English. Analyze the following text segment. "
         "Your task is to determine if it is a genuine Sanskrit verse (or part of one) "
         "or if it is primarily an English sentence/explanation. "
-        "If it is a Sanskrit verse, normalize it into standard IAST transliteration, "
-        "correcting any minor OCR errors. If it is primarily English, return 'ENGLISH'. "
-        "If it is neither (e.g., garbage, headings, or very mixed), return 'OTHER'.\n\n"
+        "If it is a Sanskrit verse, answer 'IAST: ' followed by the verse normalized into standard IAST transliteration, "
+        "correcting any minor OCR errors. If it is primarily English, answer 'ENGLISH'. "
+        "If it is neither (e.g., garbage, headings, or very mixed), answer 'OTHER'.\n\n"
         f"Text Segment: '{cleaned_chunk}'\n\n"
         "Output (IAST, ENGLISH, or OTHER):"
     )
 
-    response = llm(
-        prompt_classify_normalize,
-        max_tokens=256, # Sufficient for IAST conversion or 'ENGLISH'/'OTHER'
-        stop=["\n\n", "Output:"], # Stop sequences
-        temperature=0.1 # Keep it less creative, more factual
-    )
-    llm_output = response["choices"][0]["text"].strip()
-
-    # Post-process LLM output
-    if llm_output.lower().startswith("english"):
-        return "ENGLISH", chunk_text
-    elif llm_output.lower().startswith("other"):
-        return "OTHER", chunk_text
-    else:
-        # Assume it's IAST if not 'ENGLISH' or 'OTHER'
-        # The LLM might output some preamble before the IAST, so try to extract the IAST directly
-        # A more robust parser for LLM output might be needed for complex cases
-        if "IAST:" in llm_output: # if LLM is verbose and writes "IAST: "
-            return "SANSKRIT", llm_output.split("IAST:")[1].strip()
-        elif "Output:" in llm_output: # if LLM is verbose and writes "Output: "
-            return "SANSKRIT", llm_output.split("Output:")[1].strip()
-        else: # direct IAST
-            return "SANSKRIT", llm_output
+    return llm_grammar.normalize(llm, prompt_classify_normalize, chunk_text, max_tokens=256, temperature=0.1)
 
 # === STEP 5: Process Chunks, Transliterate & Save ===
 print("🔠 Analyzing chunks with Mistral and processing content...")
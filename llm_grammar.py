@@ -0,0 +1,206 @@
+import re
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Grammar-constrained decoding for the llama.cpp prompts. A GBNF grammar
+# (llama.cpp's grammar format) limits sampling to valid outputs, so:
+#   * classification is a forced choice between label strings, and its
+#     probability is the next-token mass on each label's possible first
+#     tokens: read from the logits of one forward pass of a local Llama, or
+#     from the top-k logprobs of a one-token completion on a server;
+#   * normalisation can only produce "ENGLISH", "OTHER" or "IAST: <text>"
+#     with IAST letters and verse punctuation, so nothing needs prefix
+#     parsing or fallback heuristics and no tokens are spent on chatter.
+# llama_cpp only keeps logits (and returns logprobs) for a Llama built with
+# logits_all=True, so every classifying constructor passes LLAMA_LOGPROB_KWARGS.
+# Grammars travel as GBNF text: a local llama_cpp.Llama gets them compiled
+# (and cached); clients with ``grammar_text = True`` (llm_server.LLMClient,
+# benchmark stubs) take the text as is.
+
+# === CONFIGURATION ===
+CLASSIFY_LABELS = (" Sanskrit", " English")   # the prompt ends with "Answer:"
+LABEL_LOGPROBS = 10                           # top-k logprobs requested for label probabilities
+LLAMA_LOGPROB_KWARGS = {"logits_all": True}   # Llama(...) kwargs that make ``logprobs`` work
+
+IAST_LETTERS = "a-zA-ZāīūṛṝḷḹṃḥṅñṭḍṇśṣĀĪŪṚṜḶḸṂḤṄÑṬḌṆŚṢ"
+IAST_MARKS = "'’ .,;:!?|।॥()"                # "-" goes last in the class: llama.cpp has no \- escape
+
+NORMALIZE_GRAMMAR = rf'''
+root ::= "ENGLISH" | "OTHER" | "IAST: " iast
+iast ::= [{IAST_LETTERS}] [{IAST_LETTERS}{IAST_MARKS}0-9-]*
+'''
+
+
+def _gbnf_literal(text):
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def label_grammar(labels=CLASSIFY_LABELS):
+    """GBNF that accepts exactly one of ``labels``."""
+    return "root ::= " + " | ".join(_gbnf_literal(label) for label in labels) + "\n"
+
+
+@lru_cache(maxsize=32)
+def compile_grammar(text):
+    from llama_cpp import LlamaGrammar
+    return LlamaGrammar.from_string(text, verbose=False)
+
+
+def complete(llm, prompt, grammar=None, **kwargs):
+    """``llm(prompt, **kwargs)`` restricted to ``grammar`` (GBNF text) on either kind of client."""
+    if grammar is not None:
+        kwargs["grammar"] = grammar if getattr(llm, "grammar_text", False) else compile_grammar(grammar)
+    return llm(prompt, **kwargs)
+
+
+# === CLASSIFICATION ===
+def _logsumexp(values):
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return float("-inf")
+    top = values.max()
+    return float(top + np.log(np.exp(values - top).sum()))
+
+
+def is_local(llm):
+    """A llama_cpp.Llama in this process, whose logits can be read directly."""
+    return hasattr(llm, "eval") and hasattr(llm, "scores")
+
+
+def label_token_ids(llm, labels=CLASSIFY_LABELS, context="Answer:"):
+    """Per label, the ids of the single tokens the label grammar lets it start with after ``context``.
+
+    A label can start with several tokens (" S", " San", " Sans", ...), so
+    each prefix is tokenized after the prompt's last word. Tokens that start
+    more than one label (a bare space) decide nothing and are left out.
+    """
+    prefix = llm.tokenize(context.encode("utf-8"), add_bos=False)
+    ids = []
+    for label in labels:
+        found = []
+        for k in range(1, len(label) + 1):
+            tokens = llm.tokenize((context + label[:k]).encode("utf-8"), add_bos=False)
+            if len(tokens) == len(prefix) + 1 and tokens[:len(prefix)] == prefix and tokens[-1] not in found:
+                found.append(tokens[-1])
+        ids.append(found)
+    return [[i for i in found if not any(i in other for other in ids if other is not found)] for found in ids]
+
+
+def label_scores(llm, prompt, token_ids):
+    """``(logprobs, prompt_tokens)``: each label's next-token log-probability after ``prompt``
+    from one forward pass of a local Llama, summed over the label's ``token_ids``."""
+    if not llm.context_params.logits_all:
+        raise ValueError("label scores need a Llama built with logits_all=True (LLAMA_LOGPROB_KWARGS)")
+    tokens = llm.tokenize(prompt.encode("utf-8"))
+    llm.reset()
+    llm.eval(tokens)
+    logits = np.asarray(llm.scores[llm.n_tokens - 1], dtype=float)
+    norm = _logsumexp(logits)
+    return [_logsumexp(logits[ids]) - norm for ids in token_ids], len(tokens)
+
+
+def label_logprobs(output, labels=CLASSIFY_LABELS):
+    """Each label's first-step logprob from a completion's top-k logprobs, or None without them.
+
+    Every reported token that starts exactly one label counts towards it. A
+    label with no reported token gets the smallest reported logprob.
+    """
+    choice = output["choices"][0]
+    top = ((choice.get("logprobs") or {}).get("top_logprobs") or [None])[0]
+    if not top:
+        return None
+    scores = []
+    for label in labels:
+        matches = [lp for token, lp in top.items() if token.strip() and label.startswith(token)
+                   and not any(other.startswith(token) for other in labels if other != label)]
+        scores.append(_logsumexp(matches) if matches else None)
+    if all(s is None for s in scores):
+        return None
+    floor = float(min(top.values()))
+    return [floor if s is None else s for s in scores]
+
+
+def label_probabilities(logprobs, temperature=1.0):
+    """Softmax over the labels' logprobs at ``temperature``."""
+    scaled = [lp / temperature for lp in logprobs]
+    weights = [math.exp(s - max(scaled)) for s in scaled]
+    return [w / sum(weights) for w in weights]
+
+
+def generated_label(output, labels=CLASSIFY_LABELS):
+    """The label the grammar-constrained text starts, defaulting to the last label."""
+    text = output["choices"][0]["text"].strip()
+    return next((l for l in labels if text and l.strip().startswith(text)), labels[-1])
+
+
+def label_request(labels=CLASSIFY_LABELS):
+    """Completion kwargs for a forced choice between ``labels`` on a server: one generated
+    token, so the prompt's single forward pass yields the labels' top-k logprobs."""
+    return {"grammar": label_grammar(labels), "max_tokens": 1, "temperature": 0.0, "logprobs": LABEL_LOGPROBS}
+
+
+def classify(llm, prompt, labels=CLASSIFY_LABELS):
+    """``(label, probability)`` for a forced choice between ``labels``.
+
+    The probability is None when the backend returns no logprobs.
+    """
+    if is_local(llm):
+        logprobs, _ = label_scores(llm, prompt, label_token_ids(llm, labels))
+    else:
+        output = complete(llm, prompt, **label_request(labels))
+        logprobs = label_logprobs(output, labels)
+        if logprobs is None:
+            return generated_label(output, labels).strip(), None
+    probabilities = label_probabilities(logprobs)
+    best = max(range(len(labels)), key=probabilities.__getitem__)
+    return labels[best].strip(), probabilities[best]
+
+
+# === NORMALISATION ===
+def normalize(llm, prompt, text, max_tokens=None, temperature=0.1):
+    """``(kind, content)``: ("ENGLISH" | "OTHER", text) or ("SANSKRIT", iast).
+
+    Output is constrained by NORMALIZE_GRAMMAR; a reply cut off by
+    ``max_tokens`` before any IAST counts as OTHER.
+    """
+    max_tokens = max_tokens or len(text) // 2 + 16
+    output = complete(llm, prompt, grammar=NORMALIZE_GRAMMAR, max_tokens=max_tokens, temperature=temperature)
+    reply = output["choices"][0]["text"].strip()
+    if reply.startswith("IAST:") and reply[5:].strip():
+        return "SANSKRIT", reply[5:].strip()
+    if reply == "ENGLISH":
+        return "ENGLISH", text
+    return "OTHER", text
+
+
+# === MAIN ===
+def _normalize_accepts(text):
+    if any(answer.startswith(text) for answer in ("ENGLISH", "OTHER", "IAST: ")):
+        return True
+    return re.fullmatch(rf"IAST: [{IAST_LETTERS}][{IAST_LETTERS}{re.escape(IAST_MARKS)}0-9-]*", text) is not None
+
+
+def check_grammars(llm, prompt="Text: 'dharmaḥ satyam'\nOutput:"):
+    """Whether each grammar really constrains ``llm``'s output.
+
+    llama.cpp only logs a grammar it can't parse and then samples
+    unconstrained, so the output itself is checked, not just compilation.
+    """
+    checks = (("label", label_grammar(), lambda t: any(l.startswith(t) for l in CLASSIFY_LABELS)),
+              ("normalize", NORMALIZE_GRAMMAR, _normalize_accepts))
+    results = {}
+    for name, grammar, accepts in checks:
+        text = complete(llm, prompt, grammar=grammar, max_tokens=16, temperature=0.0)["choices"][0]["text"]
+        results[name] = (accepts(text), text)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    from llama_cpp import Llama
+    if len(sys.argv) != 2:
+        sys.exit("usage: python llm_grammar.py <model.gguf>")
+    for name, (ok, text) in check_grammars(Llama(model_path=sys.argv[1], n_ctx=512, verbose=False)).items():
+        print(f"{'✅' if ok else '❌'} {name} grammar: {text!r}")
@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import math
+import time
+import queue
+import argparse
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from lm_scoring import SERVER_KEY_ENV, default_address, listen, parse_address, server_authkey
+
+# One local LLM shared by every pipeline worker. The server process loads the
+# model once and answers completion requests from any number of clients; the
+# scheduler thread drains the request queue into batches (up to MAX_BATCH,
+# waiting at most BATCH_WAIT for stragglers), so requests from many pages and
+# workers are decoded together. Identical requests in a batch run once.
+#
+# Backends:
+#   llama         llama_cpp.Llama in the server process. One context decodes
+#                 one sequence at a time, so a batch runs sorted by prompt and
+#                 llama.cpp reuses the KV cache for the shared prompt prefix.
+#   llama_server  llama.cpp's own server (llama-server --parallel N --cont-batching),
+#                 which does continuous batching on the GPU/CPU itself.
+#   stub          deterministic answers for tests and benchmarks.
+#
+# Clients call LLMClient(address)(prompt, max_tokens=..., stop=...) exactly
+# like a Llama object; one client is safe to share between threads and
+# reconnects after a fork. Like lm_scoring's server it listens on a per-user
+# socket by default and checks this run's key (server_authkey()).
+
+# === CONFIGURATION ===
+LLM_SERVER_ADDRESS = os.environ.get("LLM_SERVER") or default_address("nyaya-llm")   # socket/pipe path, or host:port
+MAX_BATCH = 16
+BATCH_WAIT = 0.01              # seconds to wait for more requests before decoding a batch
+CONNECT_TIMEOUT = 120.0        # a 7B model can take a while to load
+REQUEST_TIMEOUT = 600.0        # seconds LLMClient waits for one reply
+LLAMA_SERVER_URL = "http://127.0.0.1:8080"
+LLAMA_SERVER_PARALLEL = 8
+
+
+# === BACKENDS ===
+class LlamaBackend:
+    """llama_cpp.Llama loaded once in the server process."""
+
+    name = "llama"
+
+    def __init__(self, model_path, n_ctx=2048, n_threads=6, n_gpu_layers=30):
+        from llama_cpp import Llama
+        from llm_grammar import LLAMA_LOGPROB_KWARGS   # label classification asks for logprobs
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads,
+                         n_gpu_layers=n_gpu_layers, verbose=False, **LLAMA_LOGPROB_KWARGS)
+
+    def complete_batch(self, requests):
+        from llm_grammar import compile_grammar
+        results = [None] * len(requests)
+        # Neighbouring prompts share their instruction prefix, which stays in the KV cache.
+        for i in sorted(range(len(requests)), key=lambda i: requests[i]["prompt"]):
+            request = dict(requests[i])
+            if isinstance(request.get("grammar"), str):
+                request["grammar"] = compile_grammar(request["grammar"])
+            results[i] = self.llm(**request)
+        return results
+
+
+class LlamaServerBackend:
+    """Forwards requests to a running llama.cpp server, which batches them on its slots."""
+
+    name = "llama_server"
+
+    def __init__(self, url=LLAMA_SERVER_URL, parallel=LLAMA_SERVER_PARALLEL):
+        self.url = url.rstrip("/")
+        self.pool = ThreadPoolExecutor(max_workers=parallel)
+
+    def _complete(self, request):
+        import urllib.request
+        body = {"prompt": request["prompt"], "n_predict": request.get("max_tokens", 16),
+                "stop": request.get("stop") or [], "temperature": request.get("temperature", 0.8),
+                "cache_prompt": True}
+        if "grammar" in request:
+            body["grammar"] = request["grammar"]
+        if request.get("logprobs"):
+            body["n_probs"] = request["logprobs"]
+        http = urllib.request.Request(f"{self.url}/completion", data=json.dumps(body).encode("utf-8"),
+                                      headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(http) as response:
+            reply = json.load(response)
+        return {"choices": [{"text": reply.get("content", ""),
+                             "logprobs": _top_logprobs(reply.get("completion_probabilities"))}],
+                "usage": {"prompt_tokens": reply.get("tokens_evaluated", 0),
+                          "completion_tokens": reply.get("tokens_predicted", 0),
+                          "total_tokens": reply.get("tokens_evaluated", 0) + reply.get("tokens_predicted", 0)}}
+
+    def complete_batch(self, requests):
+        return list(self.pool.map(self._complete, requests))
+
+
+def _top_logprobs(probabilities):
+    """llama.cpp server token probabilities in llama_cpp's ``{"top_logprobs": [{token: logprob}]}`` shape."""
+    if not probabilities:
+        return None
+    top = []
+    for entry in probabilities:
+        if "top_logprobs" in entry:          # newer servers
+            top.append({p["token"]: p["logprob"] for p in entry["top_logprobs"]})
+        else:                                # older servers report probabilities
+            top.append({p["tok_str"]: math.log(max(p["prob"], 1e-12)) for p in entry.get("probs", [])})
+    return {"top_logprobs": top}
+
+
+class StubBackend:
+    """Fixed latency per batch; answers " Sanskrit" when the prompt has IAST or Devanagari."""
+
+    name = "stub"
+
+    def __init__(self, latency=0.002):
+        self.latency = latency
+
+    def complete_batch(self, requests):
+        time.sleep(self.latency)
+        results = []
+        for request in requests:
+            prompt = request["prompt"]
+            is_sanskrit = any(ch in prompt for ch in "āīūṛṣṇśḥṃ") or any("ऀ" <= ch <= "ॿ" for ch in prompt)
+            results.append({"choices": [{"text": " Sanskrit" if is_sanskrit else " English"}],
+                            "usage": {"total_tokens": len(prompt) // 4 + request.get("max_tokens", 16)}})
+        return results
+
+
+BACKENDS = {"llama": LlamaBackend, "llama_server": LlamaServerBackend, "stub": StubBackend}
+
+
+# === SERVER ===
+class LLMServer:
+    """Request queue plus batching scheduler in front of one backend."""
+
+    def __init__(self, backend, max_batch=MAX_BATCH, batch_wait=BATCH_WAIT):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.requests = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "deduplicated": 0, "max_batch": 0, "busy_s": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _next_batch(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self.requests.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def schedule(self):
+        while True:
+            batch = self._next_batch()
+            unique = {}
+            for _, _, request, key in batch:
+                unique.setdefault(key, request)
+            keys = list(unique)
+            started = time.perf_counter()
+            try:
+                results = dict(zip(keys, self.backend.complete_batch([unique[k] for k in keys])))
+            except Exception as e:
+                # The client gets a plain RuntimeError: the backend's own exception may not pickle.
+                results = {k: RuntimeError(repr(e)) for k in keys}
+            with self._stats_lock:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["deduplicated"] += len(batch) - len(keys)
+                self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+                self.stats["busy_s"] += time.perf_counter() - started
+            for conn, request_id, _, key in batch:
+                conn.reply(request_id, results[key])
+
+    def info(self):
+        from instrumentation import process_memory_mb
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["mean_batch"] = round(stats["requests"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return {"backend": self.backend.name, "pid": os.getpid(), "memory": process_memory_mb(), "stats": stats}
+
+    def serve_connection(self, conn):
+        conn = _ServerConnection(conn)
+        while True:
+            try:
+                request_id, op, payload = conn.conn.recv()
+            except (EOFError, OSError):
+                return
+            if op == "complete":
+                self.requests.put((conn, request_id, payload, json.dumps(payload, sort_keys=True, ensure_ascii=False)))
+            elif op == "info":
+                conn.reply(request_id, self.info())
+            else:
+                conn.reply(request_id, ValueError(f"unknown request {op!r}"))
+
+    def serve(self, address=LLM_SERVER_ADDRESS, authkey=None):
+        threading.Thread(target=self.schedule, name="llm-scheduler", daemon=True).start()
+        with listen(address, authkey or server_authkey()) as listener:
+            print(f"✅ LLM server ({self.backend.name}) on {address} (pid {os.getpid()})")
+            while True:
+                try:
+                    conn = listener.accept()
+                except (AuthenticationError, EOFError) as e:
+                    print(f"⚠️ Rejected an LLM client: {e}")
+                    continue
+                threading.Thread(target=self.serve_connection, args=(conn,), daemon=True).start()
+
+
+class _ServerConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def reply(self, request_id, result):
+        with self.lock:
+            try:
+                self.conn.send((request_id, result))
+            except OSError:
+                pass          # client went away
+            except Exception as e:
+                # An unpicklable result must not stop the scheduler or leave the client waiting.
+                try:
+                    self.conn.send((request_id, RuntimeError(f"unsendable reply: {e!r}")))
+                except Exception:
+                    pass
+
+
+def serve_llm(backend="llama", address=LLM_SERVER_ADDRESS, authkey=None, **backend_kwargs):
+    LLMServer(BACKENDS[backend](**backend_kwargs)).serve(address, authkey)
+
+
+def start_llm_server(backend="llama", address=LLM_SERVER_ADDRESS, **backend_kwargs):
+    """Starts serve_llm in a daemon process with this run's key; returns it once the server answers."""
+    import multiprocessing
+    authkey = server_authkey()
+    process = multiprocessing.Process(target=serve_llm, args=(backend, address, authkey), kwargs=backend_kwargs,
+                                      name="llm-server", daemon=True)
+    process.start()
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        if not process.is_alive():
+            raise RuntimeError(f"LLM server exited with code {process.exitcode} before answering")
+        try:
+            Client(parse_address(address), authkey=authkey).close()
+            break
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+    return process
+
+
+# === CLIENT ===
+class LLMClient:
+    """Callable like llama_cpp.Llama; requests from many threads are in flight at once."""
+
+    grammar_text = True     # grammars go to the server as GBNF text and are compiled there
+
+    def __init__(self, address=LLM_SERVER_ADDRESS, authkey=None, timeout=REQUEST_TIMEOUT):
+        self.address = address
+        self.authkey = authkey or server_authkey()
+        self.timeout = timeout
+        self._reset()
+        self.info()
+
+    def _reset(self):
+        self._conn = None
+        self._pid = None
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"address": self.address, "authkey": self.authkey, "timeout": self.timeout}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _connect(self):
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            try:
+                conn = Client(parse_address(self.address), authkey=self.authkey)
+                break
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+        threading.Thread(target=self._read_replies, args=(conn,), name="llm-client", daemon=True).start()
+        return conn
+
+    def _read_replies(self, conn):
+        while True:
+            try:
+                request_id, result = conn.recv()
+            except (EOFError, OSError) as e:
+                with self._lock:
+                    if self._conn is conn:     # the next submit reconnects
+                        self._conn = None
+                    pending, self._pending = self._pending, {}
+                for future in pending.values():
+                    future.set_exception(ConnectionError(f"LLM server closed the connection: {e}"))
+                return
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def submit(self, op, payload=None):
+        future = Future()
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._pending = {}
+                self._conn, self._pid = self._connect(), os.getpid()
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self._conn.send((request_id, op, payload))
+            except (OSError, ValueError) as e:
+                self._pending.pop(request_id, None)
+                self._conn.close()
+                self._conn = None
+                future.set_exception(ConnectionError(f"LLM server connection lost: {e}"))
+        return future
+
+    def __call__(self, prompt, **kwargs):
+        return self.submit("complete", {"prompt": prompt, **kwargs}).result(self.timeout)
+
+    create_completion = __call__
+
+    def info(self):
+        """Server pid, backend, memory and batching stats."""
+        return self.submit("info").result(self.timeout)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def get_llm(model_path, server=None, **llama_kwargs):
+    """An LLMClient when ``server`` is set, otherwise an in-process Llama."""
+    if server:
+        client = LLMClient(server)
+        print(f"✅ Using LLM server at {server} ({client.info()['backend']})")
+        return client
+    from llama_cpp import Llama
+    return Llama(model_path=model_path, verbose=False, **llama_kwargs)
+
+
+# === MAIN ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve one local LLM to all pipeline workers.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="llama")
+    parser.add_argument("--model", help="GGUF path for the llama backend")
+    parser.add_argument("--address", default=LLM_SERVER_ADDRESS)
+    parser.add_argument("--url", default=LLAMA_SERVER_URL, help="llama.cpp server for the llama_server backend")
+    parser.add_argument("--threads", type=int, default=6)
+    args = parser.parse_args(argv)
+    kwargs = {"llama": {"model_path": args.model, "n_threads": args.threads},
+              "llama_server": {"url": args.url}, "stub": {}}[args.backend]
+    if not os.environ.get(SERVER_KEY_ENV):
+        # Clients started from another shell need the key; give them this one.
+        os.environ[SERVER_KEY_ENV] = os.urandom(32).hex()
+        print(f"⚠️ {SERVER_KEY_ENV} not set; clients must run with {SERVER_KEY_ENV}={os.environ[SERVER_KEY_ENV]}")
+    serve_llm(args.backend, args.address, **kwargs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
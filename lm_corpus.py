@@ -0,0 +1,335 @@
+import os
+import re
+import csv
+import sys
+import json
+import math
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+import unicodedata
+from collections import Counter, defaultdict
+
+from text_sink import iter_lines
+import ngram_lm
+
+# Corpus builder and KenLM trainer. Roman Sanskrit lines from the pipeline's
+# corpus (data.txt, including rotated/gzip sinks) and the sutra database are
+# normalised, deduplicated and sharded, then an n-gram model is built into a
+# new version directory:
+#
+#   <LM_DIR>/v0003/corpus/shard-00000.txt …
+#   <LM_DIR>/v0003/sanskrit.arpa, sanskrit.binary (when build_binary exists)
+#   <LM_DIR>/v0003/sanskrit.ngram/  (numpy tables for ngram_lm)
+#   <LM_DIR>/v0003/manifest.json
+#   <LM_DIR>/LATEST                 -> "v0003"
+#
+# lmplz/build_binary are used when found (KENLM_BIN_DIR or PATH); otherwise
+# a pure-Python absolute-discounting backoff builder writes the ARPA file.
+# A build whose corpus hash matches the latest version is skipped.
+
+# === CONFIGURATION ===
+DATA_TXT_PATH = r"C:\Users\divya\Desktop\project\data.txt"
+SUTRA_DB_PATH = "sutras_db.csv"
+LM_DIR = r"C:\Users\divya\Desktop\project\models\lm"
+KENLM_BIN_DIR = None          # folder with lmplz/build_binary; None searches PATH
+ORDER = 4
+SHARD_LINES = 100_000
+MIN_TOKENS = 2
+LOWERCASE = True
+MODEL_NAME = "sanskrit"
+
+_NOT_WORD = re.compile(r"[^\w\s\-\u0300-\u036f]|[\d_]")
+_HYPHENS = re.compile(r"\s*-\s*-+\s*|(?<!\w)-|-(?!\w)")
+_SPACES = re.compile(r"\s+")
+
+
+# === NORMALISATION ===
+def normalize_line(line, lowercase=LOWERCASE):
+    """NFC, punctuation/digits/dandas removed, whitespace collapsed; compounds keep their hyphens."""
+    line = unicodedata.normalize("NFC", line)
+    if lowercase:
+        line = line.lower()
+    line = _NOT_WORD.sub(" ", line)
+    line = _HYPHENS.sub(" ", line)
+    return _SPACES.sub(" ", line).strip()
+
+
+def _line_key(line):
+    return hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest()
+
+
+# === SOURCES ===
+def corpus_lines(path=DATA_TXT_PATH):
+    if os.path.exists(path) or os.path.exists(path + ".1"):
+        yield from iter_lines(path)
+
+
+def sutra_lines(path=SUTRA_DB_PATH):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2:
+                yield row[1]
+
+
+def default_sources(data_path=DATA_TXT_PATH, sutra_path=SUTRA_DB_PATH):
+    return {"data": corpus_lines(data_path), "sutras": sutra_lines(sutra_path)}
+
+
+# === CORPUS ===
+def write_corpus(sources, out_dir, shard_lines=SHARD_LINES, min_tokens=MIN_TOKENS):
+    """Normalises, deduplicates and shards ``{name: lines}``; returns corpus stats.
+
+    Deduplication keeps an 8-byte hash per distinct line, so memory stays
+    small however large data.txt grows.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    seen = set()
+    digest = hashlib.sha256()
+    stats = {"lines": 0, "tokens": 0, "duplicates": 0, "too_short": 0, "shards": [], "sources": {}}
+    shard = None
+    for name, lines in sources.items():
+        kept = 0
+        for raw in lines:
+            line = normalize_line(raw)
+            if len(line.split()) < min_tokens:
+                stats["too_short"] += 1
+                continue
+            key = _line_key(line)
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            if shard is None or stats["lines"] % shard_lines == 0:
+                if shard:
+                    shard.close()
+                shard_path = os.path.join(out_dir, f"shard-{len(stats['shards']):05d}.txt")
+                stats["shards"].append(os.path.basename(shard_path))
+                shard = open(shard_path, "w", encoding="utf-8")
+            shard.write(line + "\n")
+            digest.update(line.encode("utf-8") + b"\n")
+            stats["lines"] += 1
+            stats["tokens"] += len(line.split())
+            kept += 1
+        stats["sources"][name] = kept
+    if shard:
+        shard.close()
+    stats["sha256"] = digest.hexdigest()
+    return stats
+
+
+def iter_corpus(corpus_dir):
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.startswith("shard-"):
+            with open(os.path.join(corpus_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    yield line.split()
+
+
+# === PURE-PYTHON BUILDER ===
+def _discount(counts):
+    """Absolute discount D = n1 / (n1 + 2 n2) (Ney et al.), 0.5 when undefined."""
+    freq = Counter(counts.values())
+    n1, n2 = freq.get(1, 0), freq.get(2, 0)
+    return n1 / (n1 + 2 * n2) if n1 and n2 else 0.5
+
+
+def build_arpa_python(corpus_dir, arpa_path, order=ORDER):
+    """Writes a normalised backoff ARPA model (absolute discounting, Katz-style backoff weights)."""
+    counts = [None] + [Counter() for _ in range(order)]
+    for words in iter_corpus(corpus_dir):
+        tokens = ["<s>"] + words + ["</s>"]
+        for i in range(1, len(tokens)):
+            for n in range(1, min(order, i + 1) + 1):
+                counts[n][tuple(tokens[i - n + 1:i + 1])] += 1
+
+    # p(w | h) for every seen n-gram, and the mass left over for each context.
+    probs = [None] + [{} for _ in range(order)]
+    backoffs = [None] + [{} for _ in range(order)]
+    total = sum(counts[1].values())
+    d1 = _discount(counts[1])
+    vocab = list(counts[1])
+    for gram in vocab:
+        probs[1][gram] = (counts[1][gram] - d1) / total
+    probs[1][("<unk>",)] = d1 * len(vocab) / total
+    probs[1][("<s>",)] = 0.0
+
+    for n in range(2, order + 1):
+        d = _discount(counts[n])
+        context_total = defaultdict(int)
+        context_types = defaultdict(int)
+        for gram, c in counts[n].items():
+            context_total[gram[:-1]] += c
+            context_types[gram[:-1]] += 1
+        seen_lower = defaultdict(float)
+        for gram, c in counts[n].items():
+            h = gram[:-1]
+            probs[n][gram] = (c - d) / context_total[h]
+            seen_lower[h] += _backoff_prob(probs, backoffs, gram[1:])
+        for h, c in context_total.items():
+            left = d * context_types[h] / c
+            rest = max(1.0 - seen_lower[h], 1e-9)
+            backoffs[n - 1][h] = left / rest
+
+    with open(arpa_path, "w", encoding="utf-8") as f:
+        f.write("\n\\data\\\n")
+        for n in range(1, order + 1):
+            f.write(f"ngram {n}={len(probs[n])}\n")
+        for n in range(1, order + 1):
+            f.write(f"\n\\{n}-grams:\n")
+            for gram in sorted(probs[n]):
+                p = probs[n][gram]
+                logp = -99.0 if p <= 0 else math.log10(p)
+                line = f"{logp:.6f}\t{' '.join(gram)}"
+                if n < order and gram in backoffs[n]:
+                    line += f"\t{math.log10(max(backoffs[n][gram], 1e-99)):.6f}"
+                f.write(line + "\n")
+        f.write("\n\\end\\\n")
+    return {n: len(probs[n]) for n in range(1, order + 1)}
+
+
+def _backoff_prob(probs, backoffs, gram):
+    """Backed-off p(w | h) from the lower orders already computed."""
+    if gram in probs[len(gram)]:
+        return probs[len(gram)][gram]
+    if len(gram) == 1:
+        return probs[1][("<unk>",)]
+    return backoffs[len(gram) - 1].get(gram[:-1], 1.0) * _backoff_prob(probs, backoffs, gram[1:])
+
+
+# === KENLM TOOLS ===
+def find_tool(name, bin_dir=KENLM_BIN_DIR):
+    if bin_dir:
+        for candidate in (name, name + ".exe"):
+            path = os.path.join(bin_dir, candidate)
+            if os.path.exists(path):
+                return path
+        return None
+    return shutil.which(name)
+
+
+def build_arpa_lmplz(lmplz, corpus_dir, arpa_path, order=ORDER):
+    with open(arpa_path, "wb") as out:
+        proc = subprocess.Popen([lmplz, "-o", str(order), "--discount_fallback"],
+                                stdin=subprocess.PIPE, stdout=out)
+        for name in sorted(os.listdir(corpus_dir)):
+            if name.startswith("shard-"):
+                with open(os.path.join(corpus_dir, name), "rb") as f:
+                    shutil.copyfileobj(f, proc.stdin)
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"lmplz exited with {proc.returncode}")
+
+
+# === VERSIONS ===
+def latest_version(lm_dir=LM_DIR):
+    try:
+        with open(os.path.join(lm_dir, "LATEST"), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest(lm_dir=LM_DIR, version=None):
+    version = version or latest_version(lm_dir)
+    if not version:
+        return None
+    with open(os.path.join(lm_dir, version, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest_model(lm_dir=LM_DIR, default=None):
+    """Path of the newest model (binary preferred over ARPA), or ``default``."""
+    manifest = load_manifest(lm_dir) if os.path.isdir(lm_dir) else None
+    if not manifest:
+        return default
+    for name in (manifest["files"].get("binary"), manifest["files"].get("arpa")):
+        if name:
+            return os.path.join(lm_dir, manifest["version"], name)
+    return default
+
+
+def _next_version(lm_dir):
+    numbers = [int(d[1:]) for d in os.listdir(lm_dir) if re.fullmatch(r"v\d+", d)]
+    return f"v{max(numbers, default=0) + 1:04d}"
+
+
+def build_model(sources=None, lm_dir=LM_DIR, order=ORDER, force=False, bin_dir=KENLM_BIN_DIR):
+    """Builds a new model version; returns its manifest (the latest one if nothing changed)."""
+    os.makedirs(lm_dir, exist_ok=True)
+    sources = default_sources() if sources is None else sources
+    staging = os.path.join(lm_dir, f".building-{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    corpus_dir = os.path.join(staging, "corpus")
+
+    started = time.perf_counter()
+    stats = write_corpus(sources, corpus_dir)
+    latest = load_manifest(lm_dir)
+    if latest and not force and latest["corpus"]["sha256"] == stats["sha256"] and latest["order"] == order:
+        shutil.rmtree(staging)
+        print(f"✅ Corpus unchanged; keeping {latest['version']}")
+        return latest
+    if not stats["lines"]:
+        shutil.rmtree(staging)
+        raise ValueError("corpus is empty after normalisation")
+
+    arpa_path = os.path.join(staging, f"{MODEL_NAME}.arpa")
+    binary_path = os.path.join(staging, f"{MODEL_NAME}.binary")
+    lmplz, build_binary = find_tool("lmplz", bin_dir), find_tool("build_binary", bin_dir)
+    if lmplz:
+        build_arpa_lmplz(lmplz, corpus_dir, arpa_path, order)
+        builder = "lmplz"
+    else:
+        print("⚠️ lmplz not found; building the ARPA model in Python")
+        build_arpa_python(corpus_dir, arpa_path, order)
+        builder = "python"
+    files = {"arpa": os.path.basename(arpa_path),
+             "ngram": os.path.basename(ngram_lm.convert_arpa(arpa_path))}
+    if build_binary:
+        subprocess.run([build_binary, arpa_path, binary_path], check=True)
+        files["binary"] = os.path.basename(binary_path)
+
+    version = _next_version(lm_dir)
+    manifest = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "order": order,
+        "builder": builder,
+        "build_seconds": round(time.perf_counter() - started, 2),
+        "corpus": {k: stats[k] for k in ("lines", "tokens", "duplicates", "too_short", "sources", "sha256")},
+        "shards": stats["shards"],
+        "files": files,
+        "previous": latest["version"] if latest else None,
+    }
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(staging, os.path.join(lm_dir, version))
+    with open(os.path.join(lm_dir, "LATEST.tmp"), "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(os.path.join(lm_dir, "LATEST.tmp"), os.path.join(lm_dir, "LATEST"))
+    return manifest
+
+
+# === MAIN ===
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a versioned Sanskrit n-gram model from the pipeline corpus.")
+    parser.add_argument("--data", default=DATA_TXT_PATH)
+    parser.add_argument("--sutras", default=SUTRA_DB_PATH)
+    parser.add_argument("--lm-dir", default=LM_DIR)
+    parser.add_argument("--order", type=int, default=ORDER)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the corpus is unchanged")
+    args = parser.parse_args(argv)
+
+    manifest = build_model(default_sources(args.data, args.sutras), args.lm_dir, args.order, args.force)
+    corpus = manifest["corpus"]
+    print(f"✅ {manifest['version']} ({manifest['builder']}, order {manifest['order']}): "
+          f"{corpus['lines']} lines, {corpus['tokens']} tokens, {corpus['duplicates']} duplicates dropped")
+    print(f"   Model: {latest_model(args.lm_dir)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+import os
+import sys
+import time
+import getpass
+import tempfile
+import threading
+import multiprocessing
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+import numpy as np
+
+# Pluggable language-model scoring for the KenLM correction stage. load_lm()
+# returns an object with kenlm's ``score(sentence, bos=True, eos=True)`` and
+# an ``order``. The "kenlm" backend wraps kenlm.Model. The "ngram" backend is
+# ngram_lm's numpy model, which reads the ARPA file directly and needs no
+# compiled extension. "auto" uses kenlm when it imports and otherwise falls
+# back to ngram, so the pipelines start on machines where kenlm won't build.
+# Add backends with register_backend(name, loader).
+#
+# score_batch(model, sentences) scores every candidate of a page in one call
+# and returns a numpy array. Candidates that share a prefix share its work:
+# kenlm walks a prefix trie of model states, and ngram scores each distinct
+# n-gram window once.
+#
+# Sharing one model between worker processes: get_lm() keeps one model per
+# process. KenLM binaries are opened with KENLM_LOAD_METHOD ("lazy" mmaps the
+# file), and the ngram tables are always mmapped. preload_lm() in the parent
+# before the pool forks lets workers inherit the mapping. Either way the
+# pages live once in the OS page cache; compare PSS rather than RSS per
+# worker. Alternatively, serve_lm()/start_lm_server() runs the model in one
+# process, and workers use load_lm(address, backend="server").
+#
+# The servers unpickle what clients send, so they listen on a per-user Unix
+# socket (a named pipe on Windows) by default and only accept clients that
+# hold this run's authkey: $NYAYA_SERVER_KEY (hex) when set, otherwise the
+# random key multiprocessing gives the main process, which every child
+# process inherits.
+
+# === CONFIGURATION ===
+LM_BACKEND = os.environ.get("LM_BACKEND", "auto")    # auto | kenlm | ngram | server
+KENLM_LOAD_METHOD = "lazy"     # lazy | populate_or_lazy | populate_or_read | read | parallel_read
+SERVER_KEY_ENV = "NYAYA_SERVER_KEY"
+SERVER_CONNECT_TIMEOUT = 30.0
+
+
+class KenLMScorer:
+    """kenlm.Model behind the common interface."""
+
+    name = "kenlm"
+
+    def __init__(self, model):
+        self.model = model
+        self.order = model.order
+
+    def score(self, sentence, bos=True, eos=True):
+        return self.model.score(sentence, bos=bos, eos=eos)
+
+    def score_batch(self, sentences, bos=True, eos=True):
+        """Scores through a trie of kenlm states, so a shared prefix is scored once."""
+        import kenlm
+        root = kenlm.State()
+        if bos:
+            self.model.BeginSentenceWrite(root)
+        else:
+            self.model.NullContextWrite(root)
+        trie = {}                       # (parent node id, word) -> (node id, state, cumulative score)
+        scores = np.zeros(len(sentences))
+        for i, sentence in enumerate(sentences):
+            node, state, total = 0, root, 0.0
+            for word in sentence.split():
+                entry = trie.get((node, word))
+                if entry is None:
+                    out = kenlm.State()
+                    entry = trie[(node, word)] = (len(trie) + 1, out,
+                                                  total + self.model.BaseScore(state, word, out))
+                node, state, total = entry
+            if eos:
+                total += self.model.BaseScore(state, "</s>", kenlm.State())
+            scores[i] = total
+        return scores
+
+
+def _load_kenlm(path):
+    import kenlm
+    config = kenlm.Config()
+    config.load_method = getattr(kenlm.LoadMethod, KENLM_LOAD_METHOD.upper())
+    if path.endswith(".arpa"):
+        print("⚠️ ARPA files are parsed into private memory; build_binary output can be mmapped and shared")
+    return KenLMScorer(kenlm.Model(path, config))
+
+
+def _arpa_for(path):
+    """The ARPA file for a model path: itself, or a sibling of a KenLM binary."""
+    if path.endswith(".arpa"):
+        return path
+    arpa = os.path.splitext(path)[0] + ".arpa"
+    if os.path.exists(arpa):
+        return arpa
+    raise FileNotFoundError(f"the ngram backend needs an ARPA file or {os.path.basename(arpa)} next to {path}")
+
+
+def _load_ngram(path):
+    import ngram_lm
+    if os.path.isdir(path):
+        return ngram_lm.NgramModel.load(path)
+    tables = ngram_lm.model_dir_for(path)
+    if not path.endswith(".arpa") and os.path.exists(os.path.join(tables, "meta.json")):
+        return ngram_lm.NgramModel.load(tables)
+    return ngram_lm.load_arpa(_arpa_for(path))
+
+
+# === SCORING SERVER ===
+def default_address(name):
+    """A Unix socket in the temp dir (a named pipe on Windows), one per user."""
+    user = getpass.getuser()
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}-{user}"
+    return os.path.join(tempfile.gettempdir(), f"{name}-{user}.sock")
+
+
+LM_SERVER_ADDRESS = default_address("nyaya-lm")     # or host:port
+
+
+def server_authkey():
+    """This run's server key: $NYAYA_SERVER_KEY as hex, else the inherited multiprocessing authkey."""
+    key = os.environ.get(SERVER_KEY_ENV)
+    return bytes.fromhex(key) if key else bytes(multiprocessing.current_process().authkey)
+
+
+def listen(address, authkey):
+    """A Listener on ``address``, replacing a socket file left behind by a killed server."""
+    address = parse_address(address)
+    if isinstance(address, str) and not address.startswith("\\\\") and os.path.exists(address):
+        os.unlink(address)
+    return Listener(address, authkey=authkey)
+
+
+def parse_address(address):
+    """``"host:port"`` -> ``(host, port)``; anything else is a Unix socket or named pipe path."""
+    if isinstance(address, tuple):
+        return address
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and not address.startswith("\\\\"):
+        return host, int(port)
+    return address
+
+
+def _serve_connection(model, conn):
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                return
+            op, args = request[0], request[1:]
+            try:
+                if op == "score_batch":
+                    conn.send(score_batch(model, *args))
+                elif op == "info":
+                    from instrumentation import process_memory_mb
+                    conn.send({"name": getattr(model, "name", "lm"), "order": model.order,
+                               "pid": os.getpid(), "memory": process_memory_mb()})
+                else:
+                    conn.send(ValueError(f"unknown request {op!r}"))
+            except Exception as e:
+                conn.send(e)
+
+
+def serve_lm(path, address=LM_SERVER_ADDRESS, backend=LM_BACKEND, authkey=None):
+    """Serves one model to any number of worker connections (a thread each) until killed."""
+    model = get_lm(path, backend)
+    with listen(address, authkey or server_authkey()) as listener:
+        print(f"✅ LM server on {address} (pid {os.getpid()})")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError) as e:
+                print(f"⚠️ Rejected an LM client: {e}")
+                continue
+            threading.Thread(target=_serve_connection, args=(model, conn), daemon=True).start()
+
+
+def start_lm_server(path, address=LM_SERVER_ADDRESS, backend=LM_BACKEND):
+    """Starts serve_lm in a daemon process with this run's key; returns it once the server answers."""
+    authkey = server_authkey()
+    process = multiprocessing.Process(target=serve_lm, args=(path, address, backend, authkey),
+                                      name="lm-server", daemon=True)
+    process.start()
+    RemoteLM(address, authkey).close()
+    return process
+
+
+class RemoteLM:
+    """Client for serve_lm with the local scoring interface.
+
+    Connects lazily and again after a fork, so one instance can be handed
+    to worker processes.
+    """
+
+    name = "server"
+
+    def __init__(self, address=LM_SERVER_ADDRESS, authkey=None):
+        self.address = address
+        self.authkey = authkey or server_authkey()
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.info = self._request("info")
+        self.order = self.info["order"]
+
+    def __getstate__(self):
+        return {"address": self.address, "authkey": self.authkey, "info": self.info, "order": self.order}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _conn=None, _pid=None, _lock=threading.Lock())
+
+    def _connect(self):
+        deadline = time.monotonic() + SERVER_CONNECT_TIMEOUT
+        while True:
+            try:
+                return Client(parse_address(self.address), authkey=self.authkey)
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def _request(self, op, *args):
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self._conn, self._pid = self._connect(), os.getpid()
+            self._conn.send((op, *args))
+            reply = self._conn.recv()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def score_batch(self, sentences, bos=True, eos=True):
+        return self._request("score_batch", list(sentences), bos, eos)
+
+    def score(self, sentence, bos=True, eos=True):
+        return float(self.score_batch([sentence], bos, eos)[0])
+
+    def server_info(self):
+        """The server's pid, backend and current memory."""
+        return self._request("info")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _load_server(address):
+    return RemoteLM(address)
+
+
+BACKENDS = {"kenlm": _load_kenlm, "ngram": _load_ngram, "server": _load_server}
+
+
+def register_backend(name, loader):
+    """``loader(path)`` must return an object with ``score`` and ``order``."""
+    BACKENDS[name] = loader
+
+
+def score_batch(model, sentences, bos=True, eos=True):
+    """log10 scores of ``sentences`` as a numpy array, batched when the backend supports it."""
+    if hasattr(model, "score_batch"):
+        return model.score_batch(sentences, bos=bos, eos=eos)
+    return np.array([model.score(s, bos=bos, eos=eos) for s in sentences], dtype=float)
+
+
+def generate_candidates(text):
+    """The text plus one variant per word with that word lowercased."""
+    words = text.split()
+    candidates = [text]
+    for i in range(len(words)):
+        candidates.append(' '.join(words[:i] + [words[i].lower()] + words[i + 1:]))
+    return candidates
+
+
+def best_candidates(model, candidate_lists):
+    """Index of the best-scoring candidate in each list, from one batched call."""
+    flat = [c for candidates in candidate_lists for c in candidates]
+    scores = score_batch(model, flat)
+    best, start = [], 0
+    for candidates in candidate_lists:
+        best.append(int(np.argmax(scores[start:start + len(candidates)])) if candidates else -1)
+        start += len(candidates)
+    return best, scores
+
+
+def kenlm_available():
+    try:
+        import kenlm  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def load_lm(path, backend=LM_BACKEND, required=True):
+    """Loads ``path`` with ``backend``. With ``required=False`` a model that can't be
+    used (no kenlm and no ARPA file, a missing file, no server) gives None instead."""
+    if not required:
+        try:
+            return load_lm(path, backend)
+        except (ImportError, OSError) as e:
+            print(f"⚠️ No usable language model at {path} ({e}); running without one")
+            return None
+    if backend == "auto":
+        if os.path.isdir(path) or not kenlm_available():
+            if not os.path.isdir(path):
+                print("⚠️ kenlm not installed; scoring with the numpy n-gram backend")
+            backend = "ngram"
+        else:
+            backend = "kenlm"
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown LM backend {backend!r}; choose from {sorted(BACKENDS)}")
+    model = BACKENDS[backend](path)
+    print(f"✅ Language model ({getattr(model, 'name', backend)}, order {model.order}): {path}")
+    return model
+
+
+# === REGISTRY ===
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def get_lm(path, backend=LM_BACKEND, required=True):
+    """The process-wide model for ``path``, loaded on first use (None if not required and unusable)."""
+    key = (path, backend)
+    with _MODELS_LOCK:
+        if _MODELS.get(key) is None:
+            _MODELS[key] = load_lm(path, backend, required)
+        return _MODELS[key]
+
+
+def preload_lm(path, backend=LM_BACKEND, required=True):
+    """Loads the model in this process so workers forked afterwards inherit it."""
+    return get_lm(path, backend, required)
@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import math
+import hashlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+# Array-backed n-gram language model, a drop-in for kenlm.Model.score when the
+# kenlm extension is not available. Each order keeps three parallel numpy
+# arrays: sorted 64-bit n-gram hashes, log10 probabilities and log10 backoff
+# weights. Every word of every sentence in a batch is scored with one
+# searchsorted per order, using the ARPA backoff rule (KenLM's scores for the
+# same ARPA file). The arrays are plain .npy files in a model directory and load
+# with mmap, so opening a model costs nothing until it is used.
+#
+# An n-gram's key folds its word hashes: k = h(w1); k = k * MULTIPLIER + h(wi).
+
+# === CONFIGURATION ===
+STUPID_BACKOFF = 0.4          # alpha for models built straight from counts
+WORD_CACHE_SIZE = 200_000
+MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+MODEL_SUFFIX = ".ngram"       # sanskrit.arpa -> sanskrit.ngram/
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def word_hash(word):
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _hashes(words):
+    return np.fromiter(map(word_hash, words), dtype=np.uint64, count=len(words))
+
+
+def _gram_keys(grams):
+    """Keys of equal-length n-grams, folded column by column."""
+    return _fold(np.stack([_hashes(column) for column in zip(*grams)], axis=1))
+
+
+def _fold(columns):
+    """Keys of the n-grams in the rows of a ``(m, n)`` hash matrix."""
+    keys = columns[:, 0].copy()
+    for j in range(1, columns.shape[1]):
+        keys = keys * MULTIPLIER + columns[:, j]
+    return keys
+
+
+class NgramModel:
+    """n-gram tables for orders 1..order; ``unk`` is log10 p(<unk>)."""
+
+    name = "ngram"
+
+    def __init__(self, keys, logprobs, backoffs, unk, kind="arpa", source=None):
+        self.keys = keys              # per order, sorted uint64
+        self.logprobs = logprobs      # per order, float32
+        self.backoffs = backoffs      # per order, float32 (zero where absent)
+        self.order = len(keys)
+        self.unk = float(unk)
+        self.kind = kind
+        self.source = source
+
+    # --- Scoring ---
+    def _lookup(self, n, keys, valid):
+        table = self.keys[n - 1]
+        if not len(table):
+            return np.zeros(len(keys), dtype=bool), np.zeros(len(keys), dtype=np.intp)
+        idx = np.minimum(np.searchsorted(table, keys), len(table) - 1)
+        return valid & (table[idx] == keys), idx
+
+    def window_scores(self, windows, available):
+        """log10 p(w | history) for each row of ``windows``.
+
+        ``windows`` is ``(m, order)`` word hashes with the predicted word in
+        the last column; ``available`` counts the real tokens at the end of
+        each row. Uses the longest matching n-gram plus the backoff weights
+        of every longer context, as KenLM does.
+        """
+        m = len(windows)
+        found = np.zeros((self.order, m), dtype=bool)
+        logprob = np.zeros((self.order, m), dtype=np.float32)
+        for n in range(1, self.order + 1):
+            hit, idx = self._lookup(n, _fold(windows[:, self.order - n:]), available >= n)
+            found[n - 1] = hit
+            logprob[n - 1] = np.where(hit, self.logprobs[n - 1][idx], 0.0)
+        match = np.cumprod(found, axis=0).sum(axis=0)
+        scores = np.where(match > 0, logprob[np.maximum(match - 1, 0), np.arange(m)], self.unk)
+        for k in range(1, self.order):
+            hit, idx = self._lookup(k, _fold(windows[:, self.order - 1 - k:self.order - 1]), available > k)
+            backoff = np.where(hit, self.backoffs[k - 1][idx], 0.0)
+            scores = scores + np.where(k >= np.maximum(match, 1), backoff, 0.0)
+        return scores
+
+    def score_batch(self, sentences, bos=True, eos=True):
+        """log10 probabilities of many sentences (e.g. every candidate of a page) as one array.
+
+        Each word's score depends only on its last ``order`` tokens, so
+        candidates that share a prefix (or any n-gram state) share the
+        lookup: only distinct windows are scored.
+        """
+        words = [(["<s>"] if bos else []) + s.split() + (["</s>"] if eos else []) for s in sentences]
+        lengths = np.fromiter(map(len, words), dtype=np.intp, count=len(words))
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(len(words))
+        rows = np.repeat(np.arange(len(words)), lengths)
+        cols = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        hashes = np.zeros((len(words), int(lengths.max())), dtype=np.uint64)
+        hashes[rows, cols] = _hashes([w for ws in words for w in ws])
+
+        scored = cols >= (1 if bos else 0)
+        rows, cols = rows[scored], cols[scored]
+        offsets = cols[:, None] + np.arange(1 - self.order, 1)
+        windows = np.where(offsets >= 0, hashes[rows[:, None], np.maximum(offsets, 0)], np.uint64(0))
+        available = np.minimum(cols + 1, self.order)
+        state = _fold(windows) * MULTIPLIER + available.astype(np.uint64)
+        _, first, inverse = np.unique(state, return_index=True, return_inverse=True)
+        word_scores = self.window_scores(windows[first], available[first])[inverse.ravel()]
+        return np.bincount(rows, weights=word_scores, minlength=len(words))
+
+    def score(self, sentence, bos=True, eos=True):
+        """log10 probability of a whitespace-tokenised sentence, as kenlm.Model.score."""
+        return float(self.score_batch([sentence], bos, eos)[0])
+
+    def perplexity(self, sentence):
+        words = len(sentence.split()) + 1
+        return 10.0 ** (-self.score(sentence) / words)
+
+    # --- Storage ---
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for n in range(1, self.order + 1):
+            np.save(os.path.join(directory, f"keys_{n}.npy"), self.keys[n - 1])
+            np.save(os.path.join(directory, f"logprob_{n}.npy"), self.logprobs[n - 1])
+            np.save(os.path.join(directory, f"backoff_{n}.npy"), self.backoffs[n - 1])
+        meta = {"order": self.order, "unk": self.unk, "kind": self.kind, "source": self.source,
+                "ngrams": [len(k) for k in self.keys]}
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: [np.load(os.path.join(directory, f"{name}_{n}.npy"), mmap_mode=mode)
+                         for n in range(1, meta["order"] + 1)]
+                  for name in ("keys", "logprob", "backoff")}
+        return cls(arrays["keys"], arrays["logprob"], arrays["backoff"], meta["unk"], meta["kind"], meta["source"])
+
+    # --- Building ---
+    @classmethod
+    def _from_entries(cls, entries, unk, kind, source):
+        """``entries[n-1]`` is a list of ``(gram, logprob, backoff)``."""
+        keys, logprobs, backoffs = [], [], []
+        for grams in entries:
+            if grams:
+                k = _gram_keys([g for g, _, _ in grams])
+                order = np.argsort(k)
+                keys.append(k[order])
+                logprobs.append(np.array([p for _, p, _ in grams], dtype=np.float32)[order])
+                backoffs.append(np.array([b for _, _, b in grams], dtype=np.float32)[order])
+            else:
+                keys.append(np.zeros(0, dtype=np.uint64))
+                logprobs.append(np.zeros(0, dtype=np.float32))
+                backoffs.append(np.zeros(0, dtype=np.float32))
+        return cls(keys, logprobs, backoffs, unk, kind, source)
+
+    @classmethod
+    def from_arpa(cls, path):
+        entries, order, unk = [], 0, -100.0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("ngram ") or line in ("\\data\\", "\\end\\"):
+                    continue
+                if line.endswith("-grams:"):
+                    order = int(line[1:line.index("-")])
+                    entries.append([])
+                    continue
+                if not order:
+                    continue
+                parts = line.split()
+                gram = tuple(parts[1:order + 1])
+                logprob = float(parts[0])
+                backoff = float(parts[order + 1]) if len(parts) > order + 1 else 0.0
+                entries[order - 1].append((gram, logprob, backoff))
+                if gram == ("<unk>",):
+                    unk = logprob
+        return cls._from_entries(entries, unk, "arpa", os.path.abspath(path))
+
+    @classmethod
+    def from_corpus(cls, sentences, order=3, alpha=STUPID_BACKOFF):
+        """Stupid-backoff model (Brants et al.) from token lists: relative
+        frequencies with a fixed ``alpha`` per backoff step. Scores are not
+        normalised probabilities, but rank candidates the same way."""
+        counts = [Counter() for _ in range(order)]
+        for words in sentences:
+            tokens = ["<s>"] + list(words) + ["</s>"]
+            for i in range(len(tokens)):
+                for n in range(1, min(order, i + 1) + 1):
+                    counts[n - 1][tuple(tokens[i - n + 1:i + 1])] += 1
+        total = sum(c for g, c in counts[0].items() if g != ("<s>",))
+        log_alpha = math.log10(alpha)
+        entries = []
+        for n in range(1, order + 1):
+            grams = []
+            for gram, c in counts[n - 1].items():
+                denominator = total if n == 1 else counts[n - 2][gram[:-1]]
+                backoff = log_alpha if n < order else 0.0
+                grams.append((gram, math.log10(c / denominator), backoff))
+            entries.append(grams)
+        return cls._from_entries(entries, math.log10(alpha / max(total, 1)), "stupid_backoff", None)
+
+
+# === CONVERSION ===
+def model_dir_for(arpa_path):
+    return os.path.splitext(arpa_path)[0] + MODEL_SUFFIX
+
+
+def convert_arpa(arpa_path, directory=None):
+    """Writes the array tables for an ARPA file; returns the model directory."""
+    directory = directory or model_dir_for(arpa_path)
+    NgramModel.from_arpa(arpa_path).save(directory)
+    return directory
+
+
+def load_arpa(arpa_path, mmap=True):
+    """Array model for an ARPA file, converting it first when the tables are missing or stale."""
+    directory = model_dir_for(arpa_path)
+    meta = os.path.join(directory, "meta.json")
+    if not os.path.exists(meta) or os.path.getmtime(meta) < os.path.getmtime(arpa_path):
+        convert_arpa(arpa_path, directory)
+    return NgramModel.load(directory, mmap=mmap)
+
+
+# === MAIN ===
+if __name__ == "__main__":
+    # python ngram_lm.py model.arpa [sentences.txt]: convert, then compare with kenlm if installed.
+    arpa = sys.argv[1]
+    model = load_arpa(arpa)
+    print(f"✅ {model_dir_for(arpa)}: order {model.order}, " + ", ".join(f"{len(k)} {n + 1}-grams"
+                                                                    for n, k in enumerate(model.keys)))
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], encoding="utf-8") as f:
+            sentences = [line.strip() for line in f if line.strip()]
+        try:
+            import kenlm
+        except ImportError:
+            kenlm = None
+            print("⚠️ kenlm not installed; skipping comparison")
+        if kenlm:
+            reference = kenlm.Model(arpa)
+            worst = max(abs(model.score(s) - reference.score(s)) for s in sentences)
+            print(f"Max |ngram - kenlm| over {len(sentences)} sentences: {worst:.5f}")
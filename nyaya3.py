@@ -2,14 +2,16 @@ import os
 import re
 import csv
 import numpy as np
-import kenlm
 from PIL import Image
 from pdf2image import convert_from_path
 import pytesseract
 import cv2
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
-from llama_cpp import Llama
+from transliteration import itrans_to_iast_devanagari
+from llm_server import get_llm
+from label_classifier import LLMLabelClassifier
+from llm_grammar import LLAMA_LOGPROB_KWARGS
+from lm_scoring import load_lm
+from text_sink import TextSink
 
 # === CONFIGURATION ===
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf3.pdf"
@@ -18,24 +20,20 @@ DATA_TXT_PATH = r"C:\Users\divya\Desktop\project\data.txt"
 POPPLER_PATH = r"C:\Program Files\poppler-24.08.0\Library\bin"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 LLAMA_PATH = r"C:\Users\divya\Desktop\models\mistral\mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+LLM_SERVER = os.environ.get("LLM_SERVER")   # address of a running llm_server; unset loads Mistral in-process
 KENLM_MODEL_PATH = r"C:\Users\divya\Desktop\project\sanskrit.binary"  # ✅ Your KenLM binary path
 
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 
 # === LOAD MODELS ===
-llm = Llama(model_path=LLAMA_PATH, n_ctx=2048, n_threads=6, n_gpu_layers=30, verbose=False)
-lm = kenlm.Model(KENLM_MODEL_PATH)
-classification_cache = {}
+llm = get_llm(LLAMA_PATH, server=LLM_SERVER, n_ctx=2048, n_threads=6, n_gpu_layers=30,
+              **LLAMA_LOGPROB_KWARGS)   # label logprobs for the classifier
+lm = load_lm(KENLM_MODEL_PATH, required=False)   # kenlm, the numpy n-gram fallback, or None
+classifier = LLMLabelClassifier(llm)   # threshold from config.ini [PROCESSING] classifier_threshold
 
 # === LANGUAGE CLASSIFICATION ===
 def classify_sanskrit(line):
-    if line in classification_cache:
-        return classification_cache[line]
-    prompt = f"Classify this text as Sanskrit or English: '{line}'\nAnswer:"
-    output = llm(prompt=prompt, max_tokens=1, stop=["\n"])
-    is_sanskrit = "sanskrit" in output["choices"][0]["text"].lower()
-    classification_cache[line] = is_sanskrit
-    return is_sanskrit
+    return classifier.is_sanskrit(line)
 
 # === OCR CLEANUP ===
 def is_likely_reference(line):
@@ -46,9 +44,7 @@ def clean_text_block(lines):
 
 # === TRANSLITERATION ===
 def transliterate_line(line):
-    iast = transliterate(line, sanscript.ITRANS, sanscript.IAST)
-    devanagari = transliterate(iast, sanscript.IAST, sanscript.DEVANAGARI)
-    return iast, devanagari
+    return itrans_to_iast_devanagari(line)
 
 # === KENLM CORRECTION ===
 def correct_with_kenlm(text):
@@ -131,9 +127,7 @@ def write_csv(rows, output_path):
 def main():
     pages = list(range(26, 31))  # ✅ Pages 26–30
     output_rows = []
-
-    with open(DATA_TXT_PATH, "w", encoding="utf-8") as f:
-        f.write("")
+    corpus = TextSink(DATA_TXT_PATH, truncate=True)
 
     for page_num in pages:
         print(f"Processing page {page_num}...")
@@ -144,7 +138,7 @@ def main():
             book_no, chapter_no, chapter_title = detect_chapter_metadata(raw_text)
 
             for ref, lines in blocks:
-                classified_lines = [(line, classify_sanskrit(line)) for line in lines]
+                classified_lines = list(zip(lines, classifier.classify_many(lines)))
                 sanskrit_lines = [line for line, is_san in classified_lines if is_san]
                 english_lines = [line for line, is_san in classified_lines if not is_san]
 
@@ -153,9 +147,7 @@ def main():
                     sanskrit_block = clean_text_block(sanskrit_lines)
                     corrected = correct_with_kenlm(sanskrit_block)
                     roman, devanagari = transliterate_line(corrected)
-
-                    with open(DATA_TXT_PATH, "a", encoding="utf-8") as f:
-                        f.write(roman.strip() + "\n")
+                    corpus.write_line(roman.strip())
 
                 row = {
                     "book_no": book_no,
@@ -173,6 +165,7 @@ def main():
             print(f"❌ Error on page {page_num}: {e}")
             continue
 
+    corpus.close()
     write_csv(output_rows, OUTPUT_CSV)
     print(f"✅ Output written to {OUTPUT_CSV}")
     print(f"✅ KenLM training data saved to {DATA_TXT_PATH}")
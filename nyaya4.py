@@ -6,6 +6,7 @@ from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
+from glossary import Glossary
 
 # === CONFIGURATION =======================================================
 # Ensure all these paths and your API key are correct.
@@ -94,6 +95,12 @@ You are a meticulous archivist correcting a text transcription from a scanned do
 
 
 # === STAGE 4: FINAL POLISHING ==============================================
+# The sixteen categories of Nyāya sūtra 1.1.1, keyed by their plain spelling.
+POLISH_GLOSSARY = Glossary.from_dict({term: term for term in [
+    "pramāṇa", "prameya", "saṁśaya", "prayojana", "dṛṣṭānta", "siddhānta", "avayava", "tarka",
+    "nirṇaya", "vāda", "jalpa", "vitaṇḍā", "hetvābhāsa", "chala", "jāti", "nigrahasthāna",
+]}, "Nyāya categories")
+
 def final_polish(text):
     """Applies final deterministic cleaning rules for a perfect output."""
     print("-> Applying final polishing rules...")
@@ -102,29 +109,20 @@ def final_polish(text):
     if text.lstrip().lower().startswith("n * nr"):
         text = re.sub(r'^\s*N \* nr\s*', '', text, flags=re.IGNORECASE)
 
-    # Add diacritics to parenthetical terms
-    replacements = {
-        "(pramana)": "(*pramāṇa*)",
-        "(pra- meya)": "(*prameya*)", # Handles space
-        "(prameya)": "(*prameya*)",
-        "(samsaya)": "(*saṁśaya*)",
-        "(prayojana)": "(*prayojana*)",
-        "(drstanta)": "(*dṛṣṭānta*)",
-        "(siddhanta)": "(*siddhānta*)",
-        "(avayava)": "(*avayava*)",
-        "(tarka*)": "(*tarka*)*", # Keep the asterisk outside
-        "(nirnaya)": "(*nirṇaya*)",
-        "(vada)": "(*vāda*)",
-        "(jalpa)": "(*jalpa*)",
-        "(vitanda)": "(*vitaṇḍā*)",
-        "(hetvabhasa)": "(*hetvābhāsa*)",
-        "(chala)": "(*chala*)",
-        "(jati)": "(*jāti*)",
-        "(nigrahasthana)": "(*nigrahasthāna*)"
-    }
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
+    # Diacritics for the categories wherever they appear, in one scan of the text
+    text = POLISH_GLOSSARY.sub(lambda m: m.term, text)
+
+    # Italicise parenthetical terms; "(pra- meya)" and "(Pramana)" match too.
+    def add_diacritics(match):
+        inner = match.group(1)
+        term = POLISH_GLOSSARY.lookup(inner)
+        if term is None:
+            return match.group(0)
+        # Keep a footnote mark outside: "(tarka*)" → "(*tarka*)*"
+        footnote = "*" if inner.rstrip().endswith("*") and not inner.lstrip().startswith("*") else ""
+        return f"(*{term}*){footnote}"
+    text = re.sub(r'\(([^)]+)\)', add_diacritics, text)
+
     return text
 
 
@@ -7,6 +7,7 @@ from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
+from text_sink import TextSink
 from indic_transliteration import sanscript
 from indic_transliteration.sanscript import transliterate
 
@@ -119,7 +120,7 @@ CORRECTED TEXT:
 # === MAIN WORKFLOW (No changes) ==========================================
 if __name__ == "__main__":
     try:
-        with open(OUTPUT_TXT_PATH, "w", encoding="utf-8") as f:
+        with TextSink(OUTPUT_TXT_PATH, truncate=True) as f:
             print(f"✅ Opened output file for writing: {OUTPUT_TXT_PATH}")
             for page_num in range(START_PAGE, END_PAGE + 1):
                 print("\n" + "="*70)
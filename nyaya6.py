@@ -7,6 +7,7 @@ from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
+from text_sink import TextSink
 
 # === CONFIGURATION =======================================================
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf3.pdf"
@@ -102,7 +103,7 @@ if __name__ == "__main__":
     model = genai.GenerativeModel('gemini-1.5-flash')
 
     try:
-        with open(OUTPUT_TXT_PATH, "w", encoding="utf-8") as f:
+        with TextSink(OUTPUT_TXT_PATH, truncate=True) as f:
             print(f"✅ Opened output file for writing: {OUTPUT_TXT_PATH}")
             for page_num in range(START_PAGE, END_PAGE + 1):
                 print("\n" + "="*70)
@@ -7,6 +7,7 @@ from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
+from text_sink import TextSink
 
 # === CONFIGURATION =======================================================
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf3.pdf"
@@ -78,7 +79,7 @@ if __name__ == "__main__":
     genai.configure(api_key=GOOGLE_API_KEY)
 
     try:
-        with open(FINAL_OUTPUT_PATH, "w", encoding="utf-8") as f:
+        with TextSink(FINAL_OUTPUT_PATH, truncate=True) as f:
             start_page, end_page = PAGE_RANGE
             
             for page_num in range(start_page, end_page + 1):
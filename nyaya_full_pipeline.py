@@ -2,47 +2,57 @@ import os
 import re
 import csv
 import numpy as np
-import kenlm
 from PIL import Image
 from pdf2image import convert_from_path
 import pytesseract
 import cv2
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
-from llama_cpp import Llama
+from transliteration import itrans_to_iast_devanagari
+from llm_server import get_llm
+from label_classifier import LLMLabelClassifier
+from llm_grammar import LLAMA_LOGPROB_KWARGS
+from lm_scoring import get_lm, best_candidates, generate_candidates
+from ocr_result import OCRResult, BLOCK_GAP_RATIO
+from pipeline_runner import PipelineRunner
+from instrumentation import METRICS
+from text_sink import open_sink
+import lm_corpus
 
 # === CONFIGURATION ===
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf3.pdf"
 OUTPUT_CSV = r"C:\Users\divya\Desktop\project\nyaya_output_pages26to30.csv"
 DATA_TXT_PATH = r"C:\Users\divya\Desktop\project\data.txt"
-KENLM_MODEL_PATH = r"C:\Users\divya\Desktop\project\sanskrit.binary"
+LM_DIR = r"C:\Users\divya\Desktop\project\models\lm"   # versioned models from lm_corpus
+KENLM_MODEL_PATH = lm_corpus.latest_model(LM_DIR, default=r"C:\Users\divya\Desktop\project\sanskrit.binary")
+REBUILD_LM = True   # train a new model version from data.txt + sutras_db.csv after the run
 POPPLER_PATH = r"C:\Program Files\poppler-24.08.0\Library\bin"
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 LLAMA_PATH = r"C:\Users\divya\Desktop\models\mistral\mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+LLM_SERVER = os.environ.get("LLM_SERVER")   # address of a running llm_server; unset loads Mistral in-process
+RUN_DIR = r"C:\Users\divya\Desktop\project\runs\nyaya_pages26to30"  # checkpoints + per-stage output
 
 pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
 DEBUG = True
+DEBUG_LOG_PATH = "kenlm_debug_log.txt"
 
 # === LOAD MODELS ===
-llm = Llama(model_path=LLAMA_PATH, n_ctx=2048, n_threads=6, n_gpu_layers=30, verbose=False)
-lm = kenlm.Model(KENLM_MODEL_PATH)
-classification_cache = {}
+llm = get_llm(LLAMA_PATH, server=LLM_SERVER, n_ctx=2048, n_threads=6, n_gpu_layers=30,
+              **LLAMA_LOGPROB_KWARGS)   # label logprobs for the classifier
+lm = get_lm(KENLM_MODEL_PATH, required=False)   # kenlm, the numpy n-gram fallback, or None
+# P(Sanskrit) from label logprobs, cached per line; threshold from config.ini [PROCESSING]
+classifier = LLMLabelClassifier(llm, metrics=METRICS)
+
+# KenLM training corpus and debug log are buffered; see text_sink.
+CORPUS = open_sink(DATA_TXT_PATH)
+DEBUG_LOG = open_sink(DEBUG_LOG_PATH) if DEBUG else None
 
 # === DEBUG LOGGER ===
 def log_debug(text):
-    if DEBUG:
-        with open("kenlm_debug_log.txt", "a", encoding="utf-8") as f:
-            f.write(text.strip() + "\n")
+    if DEBUG_LOG:
+        DEBUG_LOG.write_line(text.strip())
 
 # === CLASSIFICATION ===
 def classify_sanskrit(line):
-    if line in classification_cache:
-        return classification_cache[line]
-    prompt = f"Classify this text as Sanskrit or English: '{line}'\nAnswer:"
-    output = llm(prompt=prompt, max_tokens=1, stop=["\n"])
-    is_sanskrit = "sanskrit" in output["choices"][0]["text"].lower()
-    classification_cache[line] = is_sanskrit
-    return is_sanskrit
+    return classifier.is_sanskrit(line)
 
 # === OCR CLEANUP ===
 def clean_text_block(lines):
@@ -50,25 +60,22 @@ def clean_text_block(lines):
 
 # === TRANSLITERATION ===
 def transliterate_line(line):
-    iast = transliterate(line, sanscript.ITRANS, sanscript.IAST)
-    devanagari = transliterate(iast, sanscript.IAST, sanscript.DEVANAGARI)
-    return iast, devanagari
+    return itrans_to_iast_devanagari(line)
 
 # === KENLM CORRECTION ===
-def generate_candidates(text):
-    words = text.split()
-    candidates = [text]
-    for i in range(len(words)):
-        noisy = words[:i] + [words[i].lower()] + words[i+1:]
-        candidates.append(' '.join(noisy))
-    return candidates
+def correct_page_with_kenlm(texts):
+    """Corrects every Sanskrit block of a page with one batched LM call."""
+    if lm is None:
+        return texts
+    candidate_lists = [generate_candidates(text) for text in texts]
+    best, _ = best_candidates(lm, candidate_lists)
+    corrected = [candidates[i] for candidates, i in zip(candidate_lists, best)]
+    for text, fixed in zip(texts, corrected):
+        log_debug(f"Original: {text}\nBest: {fixed}\n")
+    return corrected
 
 def correct_with_kenlm(text):
-    candidates = generate_candidates(text)
-    scored = [(cand, lm.score(cand)) for cand in candidates]
-    best = max(scored, key=lambda x: x[1])
-    log_debug(f"Original: {text}\nBest: {best[0]}\n")
-    return best[0]
+    return correct_page_with_kenlm([text])[0]
 
 # === IMAGE PREPROCESSING ===
 def preprocess_image(image_pil):
@@ -88,24 +95,26 @@ def preprocess_image(image_pil):
     return Image.fromarray(thresh)
 
 # === BLOCK EXTRACTOR ===
-def extract_blocks(image):
-    processed = preprocess_image(image)
-    raw_text = pytesseract.image_to_string(processed, lang='eng+san')
-    lines = raw_text.splitlines()
+def extract_blocks(image, page=None):
+    with METRICS.stage("ocr/preprocess", page):
+        processed = preprocess_image(image)
+    with METRICS.stage("ocr/tesseract", page):
+        ocr = OCRResult.from_image(processed, lang='eng+san')
     blocks = []
     buffer = []
-    for line in lines:
+    # A new block starts at a sutra number, a danda line, or a wide vertical gap.
+    for line, gap in zip(ocr.line_texts(), ocr.line_gap_ratios()):
         line = line.strip()
         if not line:
             continue
-        if re.match(r'^\d+\.\d+\.\d+', line) or re.search(r'[॥।]', line):
+        if re.match(r'^\d+\.\d+\.\d+', line) or re.search(r'[॥।]', line) or gap > BLOCK_GAP_RATIO:
             if buffer:
                 blocks.append(buffer)
                 buffer = []
         buffer.append(line)
     if buffer:
         blocks.append(buffer)
-    return blocks, raw_text
+    return blocks, ocr
 
 # === METADATA DETECTION ===
 def detect_chapter_metadata(text):
@@ -139,52 +148,76 @@ def write_csv(rows, output_path):
         writer.writeheader()
         writer.writerows(rows)
 
+# === PAGE STAGES ===
+def ocr_stage(page, _):
+    with METRICS.stage("ocr/render", page):
+        image = convert_from_path(PDF_PATH, dpi=300, poppler_path=POPPLER_PATH,
+                                  first_page=page, last_page=page)[0]
+    blocks, ocr = extract_blocks(image, page)
+    book_no, chapter_no, chapter_title = detect_chapter_metadata("\n".join(ocr.heading_lines()))
+    if not chapter_title:
+        book_no, chapter_no, chapter_title = detect_chapter_metadata(ocr.text())
+    return {"blocks": blocks, "book_no": book_no, "chapter_no": chapter_no, "chapter_title": chapter_title}
+
+def rows_stage(page, ocr_output):
+    rows = []
+    split_blocks = []
+    for block in ocr_output["blocks"]:
+        classified = list(zip(block, classifier.classify_many(block)))
+        sanskrit = [line for line, is_san in classified if is_san]
+        english = [line for line, is_san in classified if not is_san]
+        split_blocks.append((block, sanskrit, english))
+
+    # All Sanskrit blocks of the page go through the LM in one batch.
+    joined = [clean_text_block(sanskrit) for _, sanskrit, _ in split_blocks if sanskrit]
+    corrected = iter(correct_page_with_kenlm(joined) if joined else [])
+
+    for block, sanskrit, english in split_blocks:
+        roman = devanagari = ""
+        if sanskrit:
+            roman, devanagari = transliterate_line(next(corrected))
+
+        sutra_no_match = re.search(r'\d+\.\d+\.\d+', ' '.join(block))
+        rows.append({
+            "book_no": ocr_output["book_no"],
+            "chapter_no": ocr_output["chapter_no"],
+            "chapter_title": ocr_output["chapter_title"],
+            "sutra_no": sutra_no_match.group(0) if sutra_no_match else "",
+            "sutra_devanagari": devanagari,
+            "sutra_roman": roman,
+            "sutra_translation": clean_text_block(english),
+            "sutra_commentary": ""
+        })
+    return rows
+
+def write_corpus(runner):
+    """Rewrites the KenLM corpus from every checkpointed page's rows, so a resumed run never repeats lines."""
+    CORPUS.truncate()
+    for page, rows in runner.iter_outputs("rows"):
+        for row in rows:
+            if row["sutra_roman"]:
+                CORPUS.write_line(row["sutra_roman"])
+    CORPUS.flush()
+
 # === MAIN ===
 def main():
     pages = list(range(26, 31))
-    output_rows = []
-    with open(DATA_TXT_PATH, "w", encoding="utf-8") as f:
-        f.write("")
-
-    for page in pages:
-        print(f"Processing page {page}...")
-        try:
-            image = convert_from_path(PDF_PATH, dpi=300, poppler_path=POPPLER_PATH,
-                                      first_page=page, last_page=page)[0]
-            blocks, raw_text = extract_blocks(image)
-            book_no, chapter_no, chapter_title = detect_chapter_metadata(raw_text)
-
-            for block in blocks:
-                classified = [(line, classify_sanskrit(line)) for line in block]
-                sanskrit = [line for line, is_san in classified if is_san]
-                english = [line for line, is_san in classified if not is_san]
-
-                roman = devanagari = ""
-                if sanskrit:
-                    joined = clean_text_block(sanskrit)
-                    corrected = correct_with_kenlm(joined)
-                    roman, devanagari = transliterate_line(corrected)
-                    with open(DATA_TXT_PATH, "a", encoding="utf-8") as f:
-                        f.write(roman + "\n")
-
-                sutra_no_match = re.search(r'\d+\.\d+\.\d+', ' '.join(block))
-                row = {
-                    "book_no": book_no,
-                    "chapter_no": chapter_no,
-                    "chapter_title": chapter_title,
-                    "sutra_no": sutra_no_match.group(0) if sutra_no_match else "",
-                    "sutra_devanagari": devanagari,
-                    "sutra_roman": roman,
-                    "sutra_translation": clean_text_block(english),
-                    "sutra_commentary": ""
-                }
-                output_rows.append(row)
-
-        except Exception as e:
-            print(f"❌ Error on page {page}: {e}")
-            continue
-
-    write_csv(output_rows, OUTPUT_CSV)
+    runner = PipelineRunner(RUN_DIR, [("ocr", ocr_stage), ("rows", rows_stage)], metrics=METRICS)
+
+    try:
+        runner.run(pages)
+        # Rows are streamed back from the checkpoint store, one page at a time.
+        write_csv((row for page, rows in runner.iter_outputs("rows") if page in pages for row in rows), OUTPUT_CSV)
+        write_corpus(runner)
+        if REBUILD_LM:
+            manifest = lm_corpus.build_model(lm_corpus.default_sources(DATA_TXT_PATH), LM_DIR)
+            print(f"✅ KenLM model {manifest['version']}: {manifest['corpus']['lines']} corpus lines")
+    finally:
+        runner.close()
+        CORPUS.close()
+        if DEBUG_LOG:
+            DEBUG_LOG.close()
+        print(METRICS.write_report(RUN_DIR, "nyaya_full_pipeline"))
     print("✅ Done. Output written to CSV.")
 
 if __name__ == "__main__":
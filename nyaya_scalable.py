@@ -8,6 +8,10 @@ from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
+from glossary import Glossary
+from ocr_result import OCRResult
+from confidence_gate import GateStats, gated_correct, load_wordlist
+from lm_scoring import load_lm
 
 # === CONFIGURATION =======================================================
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf3.pdf"
@@ -16,7 +20,8 @@ TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 # --- REQUIRED: Paths to your database files ---
 SUTRA_DB_PATH = r"C:\Users\divya\Desktop\project\sutras_db.csv"
-GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db_26_to_30.csv"
+GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db.csv"
+KENLM_MODEL_PATH = r"C:\Users\divya\Desktop\project\sanskrit.binary"   # vouches for Sanskrit words in the gate
 
 # --- Define the final output file ---
 FINAL_OUTPUT_PATH = r"C:\Users\divya\Desktop\project\nyaya_book_final_output_26_to_30.txt"
@@ -41,7 +46,7 @@ def load_database_from_csv(db_path, db_name="Database"):
             # Skip header row if it exists
             next(reader, None)  
             for rows in reader:
-                if len(rows) == 2 and rows[0] and rows[1]:
+                if len(rows) >= 2 and rows[0] and rows[1]:
                     db_map[rows[0].strip()] = rows[1].strip()
         print(f"✅ Successfully loaded {len(db_map)} items from {os.path.basename(db_path)}.")
         return db_map
@@ -61,26 +66,11 @@ def preprocess_image(pil_image):
     _, thresh = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     return thresh
 
-def clean_english_with_ai(raw_text):
-    """(AI Task) Uses Gemini API ONLY to correct English grammar and spelling."""
-    print("-> Using AI to clean up English text...")
-    prompt = f"""Correct the spelling and grammar of the following text. Do not change any Sanskrit words in Devanagari script or inside parentheses. Only fix the English prose.
+def ask_gemini(prompt):
+    """Sends a single prompt to Gemini and returns the raw response text."""
+    return genai.GenerativeModel('gemini-1.5-flash').generate_content(prompt).text
 
-TEXT TO CORRECT:
----
-{raw_text}
----
-
-CORRECTED TEXT:
-"""
-    try:
-        response = genai.GenerativeModel('gemini-1.5-flash').generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"   ❌ AI English cleanup failed: {e}")
-        return raw_text
-
-def apply_programmatic_corrections(text, sutra_map, glossary_map):
+def apply_programmatic_corrections(text, sutra_map, glossary):
     """(Code Task) Inserts sūtras and adds diacritics using the ground truth maps."""
     print("-> Applying programmatic corrections...")
 
@@ -92,10 +82,14 @@ def apply_programmatic_corrections(text, sutra_map, glossary_map):
         text = pattern.sub(replacement, text, count=1)
 
     # 2. Add Diacritics from your glossary
+    # Every glossary term in the text gets its corrected spelling in one scan, multi-word
+    # terms and "pra- meya" line-break hyphenation included; parenthesized terms are then
+    # set in italics.
+    text = glossary.sub(lambda m: m.value or m.text, text)
     def replace_diacritics(match):
         word = match.group(1).lower().replace('*', '').strip()
-        # Use the glossary map; if a word is not found, leave it as is.
-        corrected_word = glossary_map.get(word, word)
+        # Case, diacritics and "pra- meya" line-break hyphens do not affect the lookup.
+        corrected_word = glossary.lookup(word, word)
         return f"(*{corrected_word}*)"
     text = re.sub(r'\(([^)]+)\)', replace_diacritics, text)
 
@@ -107,6 +101,7 @@ if __name__ == "__main__":
     # Load all ground truth data from your files first
     SUTRA_GROUND_TRUTH = load_database_from_csv(SUTRA_DB_PATH, "Sūtra Database")
     GLOSSARY_GROUND_TRUTH = load_database_from_csv(GLOSSARY_DB_PATH, "Glossary Database")
+    GLOSSARY = Glossary.from_dict(GLOSSARY_GROUND_TRUTH, "Glossary Database")
     
     # Configure Gemini client
     if not GOOGLE_API_KEY or GOOGLE_API_KEY == "YOUR_API_KEY":
@@ -114,6 +109,16 @@ if __name__ == "__main__":
         exit()
     genai.configure(api_key=GOOGLE_API_KEY)
 
+    # Words the gate trusts without asking the AI: English dictionary plus glossary terms.
+    # Without the dictionary the set stays empty so the gate falls back to OCR confidence
+    # (and the LM) instead of flagging every word outside the glossary.
+    KNOWN_WORDS = load_wordlist()
+    if KNOWN_WORDS:
+        KNOWN_WORDS.update(GLOSSARY_GROUND_TRUTH.keys())
+        KNOWN_WORDS.update(v.lower() for v in GLOSSARY_GROUND_TRUTH.values())
+    LM = load_lm(KENLM_MODEL_PATH, required=False)   # None: the gate goes without it
+    gate_stats = GateStats()
+
     try:
         with open(FINAL_OUTPUT_PATH, "w", encoding="utf-8") as f:
             print(f"✅ Opened output file for writing: {FINAL_OUTPUT_PATH}")
@@ -127,9 +132,10 @@ if __name__ == "__main__":
                 
                 try:
                     page_image = convert_from_path(PDF_PATH, poppler_path=POPPLER_PATH, dpi=300, first_page=page_num, last_page=page_num)[0]
-                    raw_text = pytesseract.image_to_string(preprocess_image(page_image), lang='eng+san', config='--psm 4')
-                    ai_corrected_text = clean_english_with_ai(raw_text)
-                    perfect_text = apply_programmatic_corrections(ai_corrected_text, SUTRA_GROUND_TRUTH, GLOSSARY_GROUND_TRUTH)
+                    ocr = OCRResult.from_image(preprocess_image(page_image), lang='eng+san', config='--psm 4', page_num=page_num)
+                    # Only low-confidence / unknown spans go to Gemini; the rest is kept as OCR'd.
+                    ai_corrected_text = gated_correct(ocr, ask_gemini, KNOWN_WORDS, lm=LM, stats=gate_stats)
+                    perfect_text = apply_programmatic_corrections(ai_corrected_text, SUTRA_GROUND_TRUTH, GLOSSARY)
                     
                     f.write(f"\n\n{'='*25} START OF PAGE {page_num} {'='*25}\n\n")
                     f.write(perfect_text)
@@ -146,6 +152,7 @@ if __name__ == "__main__":
                     time.sleep(2)
         
         print("\n" + "="*70)
+        print(gate_stats.report())
         print(f"ALL PAGES PROCESSED. Final output saved to:\n{FINAL_OUTPUT_PATH}")
         print("="*70)
 
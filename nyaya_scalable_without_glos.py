@@ -8,6 +8,7 @@ from pdf2image import convert_from_path
 from PIL import Image
 import numpy as np
 import google.generativeai as genai
+from glossary import Glossary
 
 # === CONFIGURATION =======================================================
 # Ensure all paths and your API key are correct.
@@ -18,7 +19,7 @@ TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
 # --- REQUIRED: Paths to your database files ---
 SUTRA_DB_PATH = r"C:\Users\divya\Desktop\project\sutras_db.csv"
-GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db_26_to_30.csv"
+GLOSSARY_DB_PATH = r"C:\Users\divya\Desktop\project\glossary_db.csv"
 
 # --- Define the final output file ---
 FINAL_OUTPUT_PATH = r"C:\Users\divya\Desktop\project\nyaya_book_final_output.txt"
@@ -43,7 +44,7 @@ def load_database_from_csv(db_path, db_name="Database"):
             # Skip header row if it exists
             next(reader, None)  
             for rows in reader:
-                if len(rows) == 2 and rows[0] and rows[1]:
+                if len(rows) >= 2 and rows[0] and rows[1]:
                     db_map[rows[0].strip().lower()] = rows[1].strip()
         print(f"✅ Successfully loaded {len(db_map)} items from {os.path.basename(db_path)}.")
         return db_map
@@ -90,7 +91,7 @@ CORRECTED TEXT:
         print(f"   ❌ AI English cleanup failed: {e}")
         return raw_text
 
-def apply_programmatic_corrections(text, sutra_map, glossary_map):
+def apply_programmatic_corrections(text, sutra_map, glossary):
     """(Code Task) Inserts canonical sūtras and formats glossary terms with 100% reliability."""
     print("-> Applying programmatic corrections...")
 
@@ -103,10 +104,15 @@ def apply_programmatic_corrections(text, sutra_map, glossary_map):
         text = pattern.sub(replacement, text, count=1)
 
     # 2. Add Diacritics using your glossary
+    # Every glossary term in the text gets its corrected spelling in one scan, multi-word
+    # terms and "pra- meya" line-break hyphenation included; parenthesized terms are then
+    # set in italics.
+    text = glossary.sub(lambda m: m.value or m.text, text)
     def replace_diacritics(match):
         word = match.group(1).lower().replace('*', '').strip()
-        # Look up the corrected version in your glossary; if not found, leave it unchanged.
-        corrected_word = glossary_map.get(word, word)
+        # Look up the corrected version in your glossary (ignoring case, diacritics and
+        # line-break hyphens); if not found, leave it unchanged.
+        corrected_word = glossary.lookup(word, word)
         return f"(*{corrected_word}*)"
     text = re.sub(r'\(([^)]+)\)', replace_diacritics, text)
 
@@ -118,6 +124,7 @@ if __name__ == "__main__":
     # --- Load all your data at the start ---
     SUTRA_GROUND_TRUTH = load_database_from_csv(SUTRA_DB_PATH, "Sūtra Database")
     GLOSSARY_GROUND_TRUTH = load_database_from_csv(GLOSSARY_DB_PATH, "Glossary Database")
+    GLOSSARY = Glossary.from_dict(GLOSSARY_GROUND_TRUTH, "Glossary Database")
     
     # --- Configure Gemini client ---
     if not GOOGLE_API_KEY or GOOGLE_API_KEY == "YOUR_API_KEY":
@@ -147,7 +154,7 @@ if __name__ == "__main__":
                     ai_corrected_text = clean_english_with_ai(raw_text)
                     
                     # 3. Final Programmatic Correction & Polishing
-                    perfect_text = apply_programmatic_corrections(ai_corrected_text, SUTRA_GROUND_TRUTH, GLOSSARY_GROUND_TRUTH)
+                    perfect_text = apply_programmatic_corrections(ai_corrected_text, SUTRA_GROUND_TRUTH, GLOSSARY)
                     
                     # 4. Write to File
                     f.write(f"\n\n{'='*25} START OF PAGE {page_num} {'='*25}\n\n")
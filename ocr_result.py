@@ -0,0 +1,184 @@
+import numpy as np
+import pytesseract
+
+# === CONFIGURATION ===
+# Words below this Tesseract confidence (0-100) are treated as suspect.
+LOW_CONFIDENCE = 60.0
+# A vertical gap larger than this many median line heights starts a new block.
+BLOCK_GAP_RATIO = 1.5
+# Lines taller than this many median line heights are treated as headings.
+HEADING_HEIGHT_RATIO = 1.3
+
+
+# === OCR RESULT MODEL ===
+class OCRResult:
+    """Word-level OCR output for one page, stored as flat numpy columns.
+
+    Word strings live in one joined buffer addressed by ``offsets`` so a page
+    costs a handful of arrays instead of thousands of small Python objects.
+    Words are kept in Tesseract reading order, so every line is a contiguous
+    run of rows sharing one ``line_id``.
+    """
+
+    def __init__(self, words, conf, boxes, line_ids, page_num=None):
+        self.page_num = page_num
+        self.chars = "".join(words)
+        lengths = np.fromiter((len(w) for w in words), dtype=np.int32, count=len(words))
+        self.offsets = np.zeros(len(words) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)  # left, top, width, height
+        self.line_ids = np.asarray(line_ids, dtype=np.int32).reshape(-1)
+        self._line_starts = None
+
+    # --- Construction ---
+    @classmethod
+    def from_data(cls, data, page_num=None):
+        """Builds a result from a pytesseract ``image_to_data`` dict."""
+        words, conf, boxes, line_ids = [], [], [], []
+        last_key = None
+        line_id = -1
+        for i, text in enumerate(data["text"]):
+            text = (text or "").strip()
+            word_conf = float(data["conf"][i])
+            if not text or word_conf < 0:
+                continue
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            if key != last_key:
+                line_id += 1
+                last_key = key
+            words.append(text)
+            conf.append(word_conf)
+            boxes.append((data["left"][i], data["top"][i], data["width"][i], data["height"][i]))
+            line_ids.append(line_id)
+        return cls(words, conf, boxes, line_ids, page_num=page_num)
+
+    @classmethod
+    def from_image(cls, image, lang="eng+san", config="", page_num=None):
+        """Runs Tesseract on an image and keeps positions and confidences."""
+        data = pytesseract.image_to_data(image, lang=lang, config=config,
+                                         output_type=pytesseract.Output.DICT)
+        return cls.from_data(data, page_num=page_num)
+
+    # --- Word access ---
+    def __len__(self):
+        return len(self.conf)
+
+    def word(self, i):
+        return self.chars[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def words(self):
+        return [self.word(i) for i in range(len(self))]
+
+    # --- Line views ---
+    def line_starts(self):
+        """Returns the index of the first word of every line (plus an end sentinel)."""
+        if self._line_starts is None:
+            if len(self):
+                change = np.flatnonzero(np.diff(self.line_ids)) + 1
+                self._line_starts = np.concatenate(([0], change, [len(self)])).astype(np.int32)
+            else:
+                self._line_starts = np.zeros(1, dtype=np.int32)
+        return self._line_starts
+
+    def line_count(self):
+        return len(self.line_starts()) - 1
+
+    def line_texts(self):
+        starts = self.line_starts()
+        return [" ".join(self.word(i) for i in range(starts[n], starts[n + 1]))
+                for n in range(len(starts) - 1)]
+
+    def line_confidences(self):
+        """Mean word confidence for every line."""
+        starts = self.line_starts()
+        if len(starts) < 2:
+            return np.zeros(0, dtype=np.float32)
+        sums = np.add.reduceat(self.conf, starts[:-1])
+        return (sums / np.diff(starts)).astype(np.float32)
+
+    def line_boxes(self):
+        """Bounding box (left, top, width, height) of every line."""
+        starts = self.line_starts()
+        if len(starts) < 2:
+            return np.zeros((0, 4), dtype=np.int32)
+        left = self.boxes[:, 0]
+        top = self.boxes[:, 1]
+        right = left + self.boxes[:, 2]
+        bottom = top + self.boxes[:, 3]
+        idx = starts[:-1]
+        l = np.minimum.reduceat(left, idx)
+        t = np.minimum.reduceat(top, idx)
+        r = np.maximum.reduceat(right, idx)
+        b = np.maximum.reduceat(bottom, idx)
+        return np.stack([l, t, r - l, b - t], axis=1)
+
+    def line_gap_ratios(self):
+        """Vertical gap above each line, in units of the median line height."""
+        boxes = self.line_boxes()
+        if len(boxes) == 0:
+            return np.zeros(0, dtype=np.float32)
+        median_height = max(float(np.median(boxes[:, 3])), 1.0)
+        gaps = np.zeros(len(boxes), dtype=np.float32)
+        gaps[1:] = (boxes[1:, 1] - (boxes[:-1, 1] + boxes[:-1, 3])) / median_height
+        return gaps
+
+    def heading_lines(self):
+        """Lines set noticeably larger than the body text (titles, chapter heads)."""
+        boxes = self.line_boxes()
+        if len(boxes) == 0:
+            return []
+        median_height = max(float(np.median(boxes[:, 3])), 1.0)
+        tall = boxes[:, 3] > HEADING_HEIGHT_RATIO * median_height
+        texts = self.line_texts()
+        return [texts[n] for n in np.flatnonzero(tall)]
+
+    def text(self):
+        """Plain text with one line per OCR line, like ``image_to_string``."""
+        return "\n".join(self.line_texts())
+
+    # --- Confidence ---
+    def low_confidence_mask(self, threshold=LOW_CONFIDENCE):
+        return self.conf < threshold
+
+    def low_confidence_spans(self, threshold=LOW_CONFIDENCE):
+        """Returns ``(start, end)`` word ranges of consecutive suspect words within a line."""
+        mask = self.low_confidence_mask(threshold)
+        spans = []
+        start = None
+        for i in range(len(mask)):
+            if mask[i] and start is not None and self.line_ids[i] != self.line_ids[i - 1]:
+                spans.append((start, i))
+                start = i
+            elif mask[i] and start is None:
+                start = i
+            elif not mask[i] and start is not None:
+                spans.append((start, i))
+                start = None
+        if start is not None:
+            spans.append((start, len(mask)))
+        return spans
+
+    # --- Persistence ---
+    def save(self, path):
+        """Stores the result as a compressed columnar ``.npz`` file."""
+        np.savez_compressed(
+            path,
+            chars=np.array(self.chars),
+            offsets=self.offsets,
+            conf=self.conf,
+            boxes=self.boxes,
+            line_ids=self.line_ids,
+            page_num=np.array(-1 if self.page_num is None else self.page_num),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            chars = str(data["chars"])
+            offsets = data["offsets"]
+            words = [chars[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            page_num = int(data["page_num"])
+            return cls(words, data["conf"], data["boxes"], data["line_ids"],
+                       page_num=None if page_num < 0 else page_num)
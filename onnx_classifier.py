@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+# ONNX Runtime backend for the HF Sanskrit/English classifier. export_onnx()
+# runs once with torch and transformers installed. It writes model.onnx
+# with dynamic batch and sequence axes, plus model.int8.onnx with dynamic
+# int8 quantization of the weights (MatMul/Gemm in int8, activations
+# quantized on the fly), tokenizer.json and labels.json. OnnxTextClassifier
+# needs only onnxruntime, numpy and the Rust ``tokenizers`` package, so
+# neither torch nor transformers is imported at runtime. It is called like a
+# transformers text-classification pipeline, so hf_classifier uses it as a
+# drop-in (backend="onnx"). Batches are padded to their longest line.
+#
+# The CPU is shared with the Tesseract workers, so onnx_threads() gives the
+# session the cores the OCR workers leave free. Compare accuracy and latency
+# of torch, ONNX fp32 and ONNX int8 on labelled synthetic lines with
+#   python onnx_classifier.py export --model <hf model>
+#   python onnx_classifier.py compare --model <hf model>
+
+# === CONFIGURATION ===
+ONNX_DIR = os.path.join("models", "sanskrit_classifier_onnx")
+ONNX_OPSET = 17
+MAX_LENGTH = 512
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def onnx_threads(ocr_workers=0):
+    """Intra-op threads for the session: the cores left over by ``ocr_workers`` Tesseract processes."""
+    return max(1, (os.cpu_count() or 1) - ocr_workers)
+
+
+def onnx_available(model_dir=ONNX_DIR, model=None):
+    """Whether onnxruntime imports and ``model_dir`` holds an export (of ``model``, when given)."""
+    try:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+    except ImportError:
+        return False
+    meta = os.path.join(model_dir, "labels.json")
+    if not os.path.exists(meta):
+        return False
+    with open(meta, encoding="utf-8") as f:
+        return model is None or json.load(f)["model"] == model
+
+
+# === EXPORT ===
+def export_onnx(model, model_dir=ONNX_DIR, quantize=True, opset=ONNX_OPSET):
+    """Exports HF ``model`` to ``model_dir``; returns the written file paths."""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    if not tokenizer.is_fast:
+        raise ValueError(f"{model} has no fast tokenizer; the runtime needs tokenizer.json")
+    network = AutoModelForSequenceClassification.from_pretrained(model).eval()
+    sample = tokenizer(["a short line", "a somewhat longer sample line"], padding=True, return_tensors="pt")
+    inputs = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in inputs}
+    fp32 = os.path.join(model_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(network, tuple(sample[name] for name in inputs), fp32,
+                          input_names=inputs, output_names=["logits"],
+                          dynamic_axes={**dynamic, "logits": {0: "batch"}}, opset_version=opset)
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, "tokenizer.json"))
+    with open(os.path.join(model_dir, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump({"model": model, "inputs": inputs, "pad_id": tokenizer.pad_token_id or 0,
+                   "labels": [network.config.id2label[i] for i in range(network.config.num_labels)]}, f, indent=2)
+    paths = [fp32]
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        int8 = os.path.join(model_dir, INT8_FILE)
+        quantize_dynamic(fp32, int8, weight_type=QuantType.QInt8)
+        paths.append(int8)
+    print(f"✅ Exported {model} to {model_dir}")
+    return paths
+
+
+# === RUNTIME ===
+class OnnxTextClassifier:
+    """``classifier(texts, batch_size=..., truncation=True, top_k=None)`` like a transformers pipeline."""
+
+    def __init__(self, model_dir=ONNX_DIR, quantized=True, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        with open(os.path.join(model_dir, "labels.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.labels = meta["labels"]
+        self.inputs = meta["inputs"]
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_LENGTH)
+        self.tokenizer.enable_padding(pad_id=meta["pad_id"])     # to the longest text of each batch
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or onnx_threads()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.name = f"onnx-{'int8' if quantized else 'fp32'}"
+
+    def logits(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        feeds = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                 "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                 "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)}
+        return self.session.run(["logits"], {name: feeds[name] for name in self.inputs})[0]
+
+    def __call__(self, texts, batch_size=32, truncation=True, top_k=None):
+        results = []
+        for start in range(0, len(texts), batch_size):
+            logits = self.logits(texts[start:start + batch_size])
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probabilities = exp / exp.sum(axis=1, keepdims=True)
+            for row in probabilities:
+                scores = [{"label": label, "score": float(p)} for label, p in zip(self.labels, row)]
+                results.append(sorted(scores, key=lambda s: -s["score"]))
+        return results
+
+
+# === COMPARISON ===
+def labelled_lines(rng, pages=20):
+    """Sanskrit (IAST and Devanagari sutra lines, label 1) and English prose lines (label 0)."""
+    import benchmark
+    sutras = benchmark.load_sutras()
+    sanskrit = [line for _, iast, devanagari in sutras for text in (iast, devanagari) if text
+                for line in benchmark._wrap(text)]
+    english = [line for _ in range(pages) for line in benchmark._wrap(" ".join(rng.sample(benchmark.ENGLISH_PROSE, 4)))]
+    sanskrit = rng.sample(sanskrit, min(len(sanskrit), len(english)))
+    return sanskrit + english, [1] * len(sanskrit) + [0] * len(english)
+
+
+def compare_backends(model, model_dir=ONNX_DIR, pages=20, batch_size=32, repeat=3, seed=0):
+    """Accuracy, agreement with torch and per-line latency of each available backend."""
+    import random
+    from hf_classifier import HFSanskritClassifier
+    lines, labels = labelled_lines(random.Random(seed), pages)
+    truth = np.array(labels, dtype=bool)
+    backends = {"torch": ("torch", False), "onnx-fp32": ("onnx", False), "onnx-int8": ("onnx", True)}
+    results, reference = {}, None
+    for name, (backend, quantized) in backends.items():
+        try:
+            classifier = HFSanskritClassifier(model, threshold=0.5, batch_size=batch_size, backend=backend,
+                                              onnx_dir=model_dir, quantized=quantized)
+            classifier._get_pipeline()(lines[:batch_size], batch_size=batch_size)    # load and warm up
+        except Exception as e:
+            print(f"⚠️ Skipped {name}: {e}")
+            continue
+        timings = []
+        for _ in range(repeat):
+            classifier.cache.clear()
+            start = time.perf_counter()
+            probabilities = np.array(classifier.probabilities(lines))
+            timings.append(time.perf_counter() - start)
+        predicted = probabilities > 0.5
+        if reference is None:
+            reference = probabilities
+        results[name] = {"accuracy": float((predicted == truth).mean()),
+                         "agreement": float((predicted == (reference > 0.5)).mean()),
+                         "max_prob_diff": float(np.abs(probabilities - reference).max()),
+                         "ms_per_line": 1000 * float(np.median(timings)) / len(lines)}
+    return results
+
+
+# === MAIN ===
+def main():
+    parser = argparse.ArgumentParser(description="Export the Sanskrit classifier to ONNX and compare backends.")
+    parser.add_argument("command", choices=["export", "compare"])
+    parser.add_argument("--model", default="buddhist-nlp/sanskrit-classification")
+    parser.add_argument("--out", default=ONNX_DIR)
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, args.out, quantize=not args.no_quantize)
+        return
+    results = compare_backends(args.model, args.out, args.pages, args.batch_size)
+    print(f"{'backend':<12}{'accuracy':>10}{'agreement':>11}{'max Δp':>9}{'ms/line':>10}")
+    for name, r in results.items():
+        print(f"{name:<12}{r['accuracy']:>10.3f}{r['agreement']:>11.3f}{r['max_prob_diff']:>9.4f}{r['ms_per_line']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import json
+import hashlib
+import threading
+
+# === CONFIGURATION ===
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def content_hash(data):
+    """Stable sha256 of a JSON-serialisable stage output."""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _repair_tail(path):
+    """Drops a partially written last line left behind by a crash."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        data = f.read()
+        f.truncate(data.rfind(b"\n") + 1)
+
+
+def _append_durable(f, record):
+    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+
+# === STAGE STORE ===
+class StageStore:
+    """Append-only JSONL file holding one stage's output for every page.
+
+    Only byte offsets are kept in memory; outputs are read back on demand.
+    If a page was written more than once (e.g. after a crash), the last
+    record wins. Appends are serialised, so concurrent stage workers may
+    share one store.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        _repair_tail(path)
+        self.offsets = {}
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                offset = f.tell()
+                for line in iter(f.readline, b""):
+                    try:
+                        self.offsets[json.loads(line)["page"]] = offset
+                    except (ValueError, KeyError):
+                        pass
+                    offset = f.tell()
+        self._f = open(path, "ab")
+        self._lock = threading.Lock()
+
+    def append(self, page, data):
+        line = json.dumps({"page": page, "data": data}, ensure_ascii=False) + "\n"
+        with self._lock:
+            offset = self._f.tell()
+            self._f.write(line.encode("utf-8"))
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self.offsets[page] = offset
+
+    def read(self, page):
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[page])
+            return json.loads(f.readline())["data"]
+
+    def __contains__(self, page):
+        return page in self.offsets
+
+    def iter_pages(self):
+        """Yields ``(page, data)`` in page order, one record in memory at a time."""
+        with open(self.path, "rb") as f:
+            for page in sorted(self.offsets):
+                f.seek(self.offsets[page])
+                yield page, json.loads(f.readline())["data"]
+
+    def close(self):
+        self._f.close()
+
+
+# === PIPELINE RUNNER ===
+class PipelineRunner:
+    """Runs page-by-page stages with durable per-stage output and resume.
+
+    ``stages`` is an ordered list of ``(name, fn)`` where ``fn(page, previous)``
+    receives the page number and the previous stage's output (``None`` for
+    the first stage) and returns a JSON-serialisable result. After every
+    stage the result is appended to ``<run_dir>/<name>.jsonl`` and a
+    ``page -> stage -> content hash`` record is appended to the manifest, so
+    a restarted run skips whatever already finished. Pass ``metrics`` (an
+    ``instrumentation.RunMetrics``) to time every stage per page.
+    """
+
+    def __init__(self, run_dir, stages, metrics=None):
+        self.run_dir = run_dir
+        self.stages = stages
+        self.metrics = metrics
+        os.makedirs(run_dir, exist_ok=True)
+        self.manifest_path = os.path.join(run_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        self.stores = {name: StageStore(os.path.join(run_dir, f"{name}.jsonl")) for name, _ in stages}
+        self._manifest_f = open(self.manifest_path, "a", encoding="utf-8")
+
+    def _load_manifest(self):
+        _repair_tail(self.manifest_path)
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    manifest.setdefault(record["page"], {})[record["stage"]] = record["hash"]
+        return manifest
+
+    def is_done(self, page, stage):
+        return stage in self.manifest.get(page, {}) and page in self.stores[stage]
+
+    def completed_pages(self):
+        last = self.stages[-1][0]
+        return sorted(p for p in self.manifest if self.is_done(p, last))
+
+    def _cached(self, page, stage):
+        """Returns the stored output if it still matches the manifest hash, else ``None``."""
+        if not self.is_done(page, stage):
+            return None
+        data = self.stores[stage].read(page)
+        if content_hash(data) != self.manifest[page][stage]:
+            return None
+        return data
+
+    def run_page(self, page):
+        previous = None
+        for name, fn in self.stages:
+            cached = self._cached(page, name)
+            if cached is not None:
+                previous = cached
+                if self.metrics is not None:
+                    self.metrics.count("checkpoint_hits")
+                continue
+            if self.metrics is not None:
+                with self.metrics.stage(name, page):
+                    previous = fn(page, previous)
+            else:
+                previous = fn(page, previous)
+            self.stores[name].append(page, previous)
+            digest = content_hash(previous)
+            _append_durable(self._manifest_f, {"page": page, "stage": name, "hash": digest})
+            self.manifest.setdefault(page, {})[name] = digest
+        return previous
+
+    def run(self, pages):
+        """Processes pages in order; pages already complete are skipped entirely."""
+        last = self.stages[-1][0]
+        if self.metrics is not None:
+            self.metrics.start_sampling()
+        try:
+            for page in pages:
+                if self._cached(page, last) is not None:
+                    print(f"⏭️ Page {page} already complete, skipping.")
+                    continue
+                print(f"Processing page {page}...")
+                try:
+                    self.run_page(page)
+                except Exception as e:
+                    print(f"❌ Error on page {page}: {e}")
+        finally:
+            if self.metrics is not None:
+                self.metrics.stop_sampling()
+
+    def iter_outputs(self, stage=None):
+        """Streams ``(page, data)`` for one stage (default: the last)."""
+        return self.stores[stage or self.stages[-1][0]].iter_pages()
+
+    def close(self):
+        for store in self.stores.values():
+            store.close()
+        self._manifest_f.close()
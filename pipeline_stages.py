@@ -0,0 +1,187 @@
+import re
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+from pdf2image import convert_from_path
+
+from ocr_result import OCRResult, BLOCK_GAP_RATIO
+from instrumentation import METRICS
+from transliteration import itrans_to_iast_devanagari
+from substitution import ocr_clean
+from lm_scoring import get_lm, generate_candidates, best_candidates
+from label_classifier import LLMLabelClassifier, passes_threshold
+from llm_grammar import LLAMA_LOGPROB_KWARGS
+
+# Stage functions for stage_graph. Each one takes the page number followed by
+# its upstream outputs; settings are bound with functools.partial so the
+# functions stay picklable for process-pool stages.
+
+
+# === RENDER ===
+def render_page(page, pdf_path, poppler_path, dpi=300):
+    return convert_from_path(pdf_path, dpi=dpi, poppler_path=poppler_path,
+                             first_page=page, last_page=page)[0]
+
+
+# === PREPROCESS PROFILES ===
+def preprocess_otsu(image_pil):
+    """CLAHE + Otsu threshold (nyaya_scalable, nyaya_using_AI)."""
+    img = np.array(image_pil.convert("L"))
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    img = clahe.apply(img)
+    _, thresh = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thresh
+
+def preprocess_median(image_pil):
+    """Stronger CLAHE + Otsu + median blur (nyaya4)."""
+    img = np.array(image_pil.convert("L"))
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    img = clahe.apply(img)
+    _, thresh = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return cv2.medianBlur(thresh, 3)
+
+def preprocess_denoise_deskew(image_pil):
+    """CLAHE + fastNlMeansDenoising + deskew + adaptive threshold (nyaya_full_pipeline)."""
+    img = np.array(image_pil.convert("RGB"))
+    gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    contrast = clahe.apply(gray)
+    denoised = cv2.fastNlMeansDenoising(contrast, h=30)
+    coords = np.column_stack(np.where(denoised < 255))
+    angle = cv2.minAreaRect(coords)[-1]
+    angle = -(90 + angle) if angle < -45 else -angle
+    (h, w) = denoised.shape
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    deskewed = cv2.warpAffine(denoised, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    thresh = cv2.adaptiveThreshold(deskewed, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY, 11, 2)
+    return Image.fromarray(thresh)
+
+def preprocess_gaussian(image_pil):
+    """Grayscale + minimal Gaussian blur (feedback, final copy, gp1)."""
+    gray = cv2.cvtColor(np.array(image_pil.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    return cv2.GaussianBlur(gray, (1, 1), 0)
+
+PREPROCESS_PROFILES = {
+    "otsu": preprocess_otsu,
+    "median": preprocess_median,
+    "denoise_deskew": preprocess_denoise_deskew,
+    "gaussian": preprocess_gaussian,
+}
+
+def preprocess_page(page, image, profile="denoise_deskew"):
+    return PREPROCESS_PROFILES[profile](image)
+
+
+# === OCR ===
+def ocr_page(page, image, lang="eng+san", config=""):
+    return OCRResult.from_image(image, lang=lang, config=config, page_num=page)
+
+
+# === CLEAN ===
+def clean_ocr_text(text):
+    return ocr_clean(text)
+
+def segment_blocks(page, ocr):
+    """Splits the page into blocks at sutra numbers, danda lines and wide vertical gaps."""
+    blocks = []
+    buffer = []
+    for line, gap in zip(ocr.line_texts(), ocr.line_gap_ratios()):
+        line = line.strip()
+        if not line:
+            continue
+        if re.match(r'^\d+\.\d+\.\d+', line) or re.search(r'[॥।]', line) or gap > BLOCK_GAP_RATIO:
+            if buffer:
+                blocks.append(buffer)
+                buffer = []
+        buffer.append(line)
+    if buffer:
+        blocks.append(buffer)
+    return blocks
+
+
+# === LLAMA CLASSIFICATION ===
+_llama = None
+_llama_lock = threading.Lock()
+
+def _get_llama(model_path, n_threads):
+    global _llama
+    if _llama is None:
+        from llama_cpp import Llama
+        _llama = Llama(model_path=model_path, n_ctx=2048, n_threads=n_threads, n_gpu_layers=30, verbose=False,
+                       **LLAMA_LOGPROB_KWARGS)
+    return _llama
+
+_clients = {}
+
+def _get_client(server):
+    if server not in _clients:
+        from llm_server import LLMClient
+        _clients[server] = LLMClient(server)
+    return _clients[server]
+
+_classifiers = {}
+
+def _get_classifier(model_path, n_threads, server):
+    key = server or model_path
+    with _llama_lock:
+        if key not in _classifiers:
+            llm = _get_client(server) if server else _get_llama(model_path, n_threads)
+            _classifiers[key] = LLMLabelClassifier(llm, metrics=METRICS)
+        return _classifiers[key]
+
+def classify_blocks(page, blocks, model_path, n_threads=6, server=None, threshold=None):
+    """Splits every block into (sanskrit_lines, english_lines) by the local Mistral model's P(Sanskrit).
+
+    ``threshold`` defaults to config.ini's classifier_threshold. With
+    ``server`` (an llm_server address) every line of the page is sent at
+    once and the server batches them with other workers' pages.
+    """
+    classifier = _get_classifier(model_path, n_threads, server)
+    threshold = classifier.threshold if threshold is None else threshold
+    verdicts = iter(passes_threshold(classifier.probabilities([line for block in blocks for line in block]), threshold))
+    classified = []
+    for block in blocks:
+        is_sanskrit = [next(verdicts) for _ in block]
+        classified.append(([l for l, s in zip(block, is_sanskrit) if s], [l for l, s in zip(block, is_sanskrit) if not s]))
+    return classified
+
+
+# === KENLM CORRECTION ===
+def correct_blocks(page, classified, lm_path, backend="auto"):
+    """Replaces each block's Sanskrit lines with the best LM candidate, one batch per page.
+
+    The model comes from the worker's registry (see lm_scoring.get_lm), so a
+    pool preloaded before fork, or a scoring server, keeps one copy resident.
+    """
+    texts = [' '.join(line.strip() for line in sanskrit if line.strip()) for sanskrit, _ in classified if sanskrit]
+    if not texts:
+        return classified
+    lm = get_lm(lm_path, backend, required=False)
+    if lm is None:
+        return classified
+    candidate_lists = [generate_candidates(text) for text in texts]
+    best, _ = best_candidates(lm, candidate_lists)
+    corrected = iter(candidates[i] for candidates, i in zip(candidate_lists, best))
+    return [([next(corrected)], english) if sanskrit else (sanskrit, english) for sanskrit, english in classified]
+
+
+# === ROWS ===
+def build_rows(page, classified):
+    rows = []
+    for sanskrit, english in classified:
+        roman = devanagari = ""
+        if sanskrit:
+            joined = ' '.join(line.strip() for line in sanskrit if line.strip())
+            roman, devanagari = itrans_to_iast_devanagari(joined)
+        sutra_no_match = re.search(r'\d+\.\d+\.\d+', ' '.join(sanskrit + english))
+        rows.append({
+            "page": page,
+            "sutra_no": sutra_no_match.group(0) if sutra_no_match else "",
+            "sutra_devanagari": devanagari,
+            "sutra_roman": roman,
+            "sutra_translation": ' '.join(line.strip() for line in english if line.strip()),
+        })
+    return rows
@@ -0,0 +1,140 @@
+import os
+import csv
+import configparser
+from functools import partial
+
+import pytesseract
+
+import pipeline_stages as ps
+import lm_scoring
+import llm_server
+from stage_graph import Stage, StageGraph
+from pipeline_runner import StageStore
+from instrumentation import METRICS
+
+# === CONFIGURATION ===
+# Paths, page range and per-stage concurrency come from config.ini
+# ([PATHS], [PROCESSING], [OCR], [PIPELINE]).
+CONFIG_PATH = "config.ini"
+TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+
+
+def load_config(path=CONFIG_PATH):
+    config = configparser.ConfigParser()
+    config.read(path)
+    return config
+
+
+def lm_settings(config):
+    """``(path, backend)`` the correct stage's workers load, or None when KenLM correction is off.
+    With ``lm_server`` set, workers talk to the scoring server at that address."""
+    pipe = config["PIPELINE"]
+    if not pipe.get("kenlm_path", "").strip():
+        return None
+    if pipe.get("lm_server", "").strip():
+        return pipe.get("lm_server").strip(), "server"
+    return pipe.get("kenlm_path").strip(), pipe.get("lm_backend", "auto")
+
+
+# === GRAPH ===
+def build_graph(config):
+    """render → preprocess → ocr → blocks → classify → [correct] → rows."""
+    pipe = config["PIPELINE"]
+    queue_size = pipe.getint("queue_size", 4)
+
+    def workers(name):
+        return pipe.getint(f"{name}_workers", 1)
+
+    stages = [
+        Stage("render", partial(ps.render_page,
+                                pdf_path=config.get("PATHS", "pdf_path"),
+                                poppler_path=config.get("PATHS", "poppler_path"),
+                                dpi=config.getint("PROCESSING", "dpi")),
+              workers=workers("render"), queue_size=queue_size),
+        Stage("preprocess", partial(ps.preprocess_page, profile=pipe.get("preprocess_profile", "denoise_deskew")),
+              after=["render"], workers=workers("preprocess"), queue_size=queue_size),
+        Stage("ocr", partial(ps.ocr_page,
+                             lang=config.get("OCR", "language"),
+                             config=config.get("OCR", "tesseract_config")),
+              after=["preprocess"], workers=workers("ocr"), queue_size=queue_size),
+        Stage("blocks", ps.segment_blocks, after=["ocr"], queue_size=queue_size),
+        Stage("classify", partial(ps.classify_blocks, model_path=pipe.get("llama_path"),
+                                  server=pipe.get("llm_server", "").strip() or None,
+                                  threshold=config.getfloat("PROCESSING", "classifier_threshold", fallback=0.85)),
+              after=["blocks"], workers=workers("classify"), queue_size=queue_size),
+    ]
+    lm = lm_settings(config)
+    if lm:
+        # KenLM correction runs in worker processes that share one resident model.
+        stages.append(Stage("correct", partial(ps.correct_blocks, lm_path=lm[0], backend=lm[1]),
+                            after=["classify"], workers=workers("correct"), queue_size=queue_size,
+                            use_processes=True))
+    stages.append(Stage("rows", ps.build_rows, after=["correct" if lm else "classify"], queue_size=queue_size))
+    return StageGraph(stages)
+
+
+# === MAIN ===
+def main():
+    config = load_config()
+    pipe = config["PIPELINE"]
+    run_dir = pipe.get("run_dir", "runs/stage_graph")
+    os.makedirs(run_dir, exist_ok=True)
+
+    stores = {
+        "rows": StageStore(os.path.join(run_dir, "rows.jsonl")),
+    }
+    start = config.getint("PROCESSING", "start_page")
+    end = config.getint("PROCESSING", "end_page")
+    # Pages whose rows are already stored from an earlier run are not processed again.
+    pages = [p for p in range(start, end + 1) if p not in stores["rows"]]
+    print(f"Processing {len(pages)} pages ({end - start + 1 - len(pages)} already done)...")
+
+    def on_result(stage, page, output):
+        stores[stage].append(page, output)
+        print(f"✅ Page {page}: {stage} stored.")
+
+    # One LLM server process serves every classify worker (see llm_server).
+    llm_process = None
+    if pipe.get("llm_server", "").strip():
+        backend = pipe.get("llm_backend", "llama")
+        kwargs = {"model_path": pipe.get("llama_path")} if backend == "llama" else {}
+        llm_process = llm_server.start_llm_server(backend, pipe.get("llm_server").strip(), **kwargs)
+
+    lm = lm_settings(config)
+    server = None
+    if lm and lm[1] == "server":
+        server = lm_scoring.start_lm_server(pipe.get("kenlm_path").strip(), lm[0], pipe.get("lm_backend", "auto"))
+    elif lm:
+        lm_scoring.preload_lm(*lm, required=False)   # before the process pool forks
+
+    try:
+        build_graph(config).run(pages, on_result=on_result, metrics=METRICS)
+        if server is not None:
+            info = lm_scoring.RemoteLM(lm[0]).server_info()
+            METRICS.record_worker(f"{info['pid']} (lm server)", info["memory"])
+        if llm_process is not None:
+            info = llm_server.LLMClient(pipe.get("llm_server").strip()).info()
+            METRICS.record_worker(f"{info['pid']} (llm server)", info["memory"])
+            print(f"LLM server batching: {info['stats']}")
+
+        headers = ["page", "sutra_no", "sutra_devanagari", "sutra_roman", "sutra_translation"]
+        with open(pipe.get("output_csv", "stage_graph_output.csv"), "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=headers, quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            for page, rows in stores["rows"].iter_pages():
+                if start <= page <= end:
+                    writer.writerows(rows)
+    finally:
+        if server is not None:
+            server.terminate()
+        if llm_process is not None:
+            llm_process.terminate()
+        for store in stores.values():
+            store.close()
+        print(METRICS.write_report(run_dir, "run_pipeline"))
+    print("✅ Done.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import process_memory_mb
+
+# === CONFIGURATION ===
+DEFAULT_QUEUE_SIZE = 4
+
+_END = object()
+_FAILED = object()      # sent downstream in place of the output of a page that failed
+
+
+def _run_in_worker(fn, page, *inputs):
+    """Process-pool entry point; reports the worker's memory with the output."""
+    output = fn(page, *inputs)
+    return output, os.getpid(), process_memory_mb()
+
+
+# === STAGE DECLARATION ===
+class Stage:
+    """One node of the pipeline DAG.
+
+    ``fn(page, *inputs)`` is called once per page with the outputs of the
+    stages listed in ``after`` (in that order); source stages (no ``after``)
+    get only the page number. ``workers`` threads run the stage concurrently
+    and at most ``queue_size`` pages wait in front of it, so a slow stage
+    applies back-pressure instead of letting work pile up in memory. With
+    ``use_processes=True`` calls go to a shared process pool, which suits
+    pure-Python CPU work; C extensions that release the GIL (Tesseract,
+    OpenCV, llama.cpp, HTTP clients) are fine on threads. Each process call
+    reports the worker's memory to ``metrics.record_worker``.
+    """
+
+    def __init__(self, name, fn, after=(), workers=1, queue_size=DEFAULT_QUEUE_SIZE, use_processes=False):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.workers = workers
+        self.queue_size = queue_size
+        self.use_processes = use_processes
+
+
+# === STAGE GRAPH ===
+class StageGraph:
+    """Runs a DAG of stages over a stream of pages with bounded queues between them."""
+
+    def __init__(self, stages):
+        self.stages = {s.name: s for s in stages}
+        for s in stages:
+            for upstream in s.after:
+                if upstream not in self.stages:
+                    raise ValueError(f"Stage '{s.name}' depends on unknown stage '{upstream}'")
+        self.order = self._topological_order()
+        self.downstream = {name: [] for name in self.stages}
+        for s in stages:
+            for upstream in s.after:
+                self.downstream[upstream].append(s.name)
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle in stage graph at '{name}'")
+            state[name] = "visiting"
+            for upstream in self.stages[name].after:
+                visit(upstream)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def sinks(self):
+        return [name for name in self.order if not self.downstream[name]]
+
+    def run(self, pages, on_result=None, metrics=None):
+        """Pushes pages through the graph.
+
+        Sink outputs go to ``on_result(stage, page, output)`` when given;
+        otherwise they are collected and returned as ``{stage: {page: output}}``.
+        With ``metrics`` (an ``instrumentation.RunMetrics``) every stage call
+        is timed per page and queue waits are counted. A page whose stage
+        call raises is reported and dropped from every stage below it.
+        """
+        results = {name: {} for name in self.sinks()}
+        results_lock = threading.Lock()
+        if on_result is None:
+            def on_result(stage, page, output):
+                with results_lock:
+                    results[stage][page] = output
+
+        pool = None
+        if any(s.use_processes for s in self.stages.values()):
+            pool = ProcessPoolExecutor(max_workers=max(s.workers for s in self.stages.values() if s.use_processes))
+
+        inboxes = {name: queue.Queue(maxsize=self.stages[name].queue_size) for name in self.order}
+        work = {name: queue.Queue(maxsize=self.stages[name].queue_size) for name in self.order}
+        threads = []
+
+        def emit(name, page, output):
+            if not self.downstream[name]:
+                on_result(name, page, output)
+            for child in self.downstream[name]:
+                if metrics is not None and inboxes[child].full():
+                    metrics.count(f"{child}_queue_full")
+                inboxes[child].put((name, page, output))
+
+        def finish(name):
+            for child in self.downstream[name]:
+                inboxes[child].put((name, _END, None))
+
+        def fail(name, page):
+            for child in self.downstream[name]:
+                inboxes[child].put((name, page, _FAILED))
+
+        def dispatcher(name):
+            """Joins the inputs of a page and hands complete pages to the workers."""
+            stage = self.stages[name]
+            pending = {}
+            failed = {}          # page -> inputs still expected after one of them failed
+            open_inputs = set(stage.after)
+            while open_inputs:
+                upstream, page, output = inboxes[name].get()
+                if page is _END:
+                    open_inputs.discard(upstream)
+                    continue
+                if output is _FAILED and page not in failed:
+                    # The page can never complete here: drop its other inputs and tell downstream.
+                    failed[page] = len(stage.after) - len(pending.pop(page, {}))
+                    fail(name, page)
+                if page in failed:
+                    failed[page] -= 1
+                    if not failed[page]:
+                        del failed[page]
+                    continue
+                slot = pending.setdefault(page, {})
+                slot[upstream] = output
+                if len(slot) == len(stage.after):
+                    del pending[page]
+                    work[name].put((page, tuple(slot[u] for u in stage.after)))
+            for _ in range(stage.workers):
+                work[name].put((_END, None))
+
+        def worker(name, remaining):
+            stage = self.stages[name]
+            while True:
+                page, inputs = work[name].get()
+                if page is _END:
+                    break
+                try:
+                    if metrics is not None:
+                        with metrics.stage(name, page):
+                            output = self._call(stage, pool, page, inputs, metrics)
+                    else:
+                        output = self._call(stage, pool, page, inputs)
+                except Exception as e:
+                    print(f"❌ Stage '{name}' failed on page {page}: {e}")
+                    fail(name, page)
+                    continue
+                emit(name, page, output)
+            with remaining[1]:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                finish(name)
+
+        def feeder():
+            sources = [name for name in self.order if not self.stages[name].after]
+            for page in pages:
+                for name in sources:
+                    work[name].put((page, ()))
+            for name in sources:
+                for _ in range(self.stages[name].workers):
+                    work[name].put((_END, None))
+
+        for name in self.order:
+            stage = self.stages[name]
+            remaining = [stage.workers, threading.Lock()]
+            if stage.after:
+                threads.append(threading.Thread(target=dispatcher, args=(name,), name=f"{name}-join", daemon=True))
+            for n in range(stage.workers):
+                threads.append(threading.Thread(target=worker, args=(name, remaining), name=f"{name}-{n}", daemon=True))
+        threads.append(threading.Thread(target=feeder, name="feeder", daemon=True))
+
+        try:
+            if metrics is not None:
+                metrics.start_sampling()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            if metrics is not None:
+                metrics.stop_sampling()
+            if pool is not None:
+                pool.shutdown()
+        return results
+
+    @staticmethod
+    def _call(stage, pool, page, inputs, metrics=None):
+        if stage.use_processes:
+            output, pid, memory = pool.submit(_run_in_worker, stage.fn, page, *inputs).result()
+            if metrics is not None:
+                metrics.record_worker(pid, memory)
+            return output
+        return stage.fn(page, *inputs)
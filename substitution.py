@@ -0,0 +1,246 @@
+import re
+from collections import namedtuple
+
+# Ordered rewrite rules compiled into a single pass over the text. A rule is
+# either a ``(literal, replacement)`` pair or a ``RegexRule``. All literal
+# rules run together: at every position the longest matching literal wins and
+# nothing a literal writes is matched again. Regex rules then run in the order
+# given, on the output of the literal pass.
+
+RegexRule = namedtuple("RegexRule", "pattern replacement")
+
+
+# === RULE SETS ===
+# OCR artifacts in roman text (clean_ocr_text in gem1, final copy, pipeline_stages).
+OCR_CLEAN_RULES = [
+    ("I$", "IS"),
+    ("$", "S"),
+    ("0f", "of"),
+    ("0", "o"),
+    RegexRule(r"(?<=\w)\)(?=\w)", ""),
+]
+
+# clean_text in csv_for5 / csvv.
+CLEAN_TEXT_RULES = [
+    ("I$", "IS"),
+    ("$", "S"),
+    ("0f", "of"),
+    ("0", "o"),
+    RegexRule(r"\(\s*\)", ""),
+]
+
+# clean_text in csv_full. The old chain relied on '0' → 'o' running before
+# 'o|' → '0.'; here the '0|' form is spelled out instead.
+CSV_FULL_FIX_RULES = [
+    ("I$", "IS"),
+    ("$", "S"),
+    ("0f", "of"),
+    ("0|", "0."),
+    ("o|", "0."),
+    ("0", "o"),
+]
+
+# fix_iast_ocr_typos in csvv: strip IAST diacritics OCR tends to garble.
+IAST_OCR_TYPO_RULES = [
+    ("ġ", "g"),
+    ("ḻ", "l"),
+    ("ṭ", "t"),
+    ("ṭh", "th"),
+    ("ṭr", "tr"),
+    ("ḍ", "d"),
+    ("ṛ", "r"),
+    ("ṝ", "r̄"),
+    ("ṇ", "n"),
+    ("ṅ", "n"),
+    ("ś", "sh"),
+    ("ṣ", "sh"),
+    ("ḷ", "l"),
+    ("ḥ", "h"),
+    ("ṃ", "m"),
+    ("ṉ", "n"),
+    ("Ḥ", "H"),
+    ("Ḍ", "D"),
+    ("Ṛ", "R"),
+    ("Ṭ", "T"),
+    ("Ḷ", "L"),
+    ("k͟h", "kh"),
+    ("k͟ḥ", "kh"),
+    ("ṡ", "s"),
+]
+
+
+# === CONFLICT DETECTION ===
+def _charwise(text, singles):
+    return "".join(singles.get(ch, ch) for ch in text)
+
+
+def find_conflicts(rules):
+    """Returns ``[(kind, rule_index, message)]`` for rules that would misbehave as a chain of replaces.
+
+    * ``duplicate`` – the same literal twice with different replacements (an error).
+    * ``shadowed``  – a literal listed after a shorter literal it contains; as a
+      chain the later rule never fires, in one pass the longer match wins.
+    * ``cascade``   – a replacement contains a later literal; a chain would
+      rewrite it again, one pass does not.
+    * ``redundant`` – a multi-character literal that its single-character rules
+      already produce.
+    * ``overlap``   – a regex rule that also matches a literal pattern; the
+      literal takes precedence.
+    * ``order``     – a regex rule listed before a literal rule; literals
+      always run first.
+    """
+    conflicts = []
+    literals = [(i, r[0], r[1]) for i, r in enumerate(rules) if not isinstance(r, RegexRule)]
+    regexes = [(i, re.compile(r.pattern)) for i, r in enumerate(rules) if isinstance(r, RegexRule)]
+    singles = {}
+    seen = {}
+    for i, pattern, replacement in literals:
+        if not pattern:
+            conflicts.append(("duplicate", i, f"rule {i}: empty literal pattern"))
+        elif pattern in seen and seen[pattern] != replacement:
+            conflicts.append(("duplicate", i, f"rule {i}: {pattern!r} → {replacement!r} "
+                                           f"conflicts with {pattern!r} → {seen[pattern]!r}"))
+        seen.setdefault(pattern, replacement)
+        if len(pattern) == 1:
+            singles.setdefault(pattern, replacement)
+
+    for i, a, a_repl in literals:
+        for j, b, _ in literals:
+            if j <= i or not a or a == b:
+                continue
+            if a in b:
+                conflicts.append(("shadowed", j, f"rule {j}: {b!r} comes after {a!r} (rule {i}) and "
+                                              f"is never reached by chained replaces"))
+            if _touches(a_repl, b):
+                conflicts.append(("cascade", i, f"rule {i}: output {a_repl!r} can form {b!r} (rule {j})"))
+    for i, pattern, replacement in literals:
+        if len(pattern) > 1 and _charwise(pattern, singles) == replacement:
+            conflicts.append(("redundant", i, f"rule {i}: {pattern!r} → {replacement!r} "
+                                           f"follows from the single-character rules"))
+    for i, regex in regexes:
+        later = [j for j, _, _ in literals if j > i]
+        if later:
+            conflicts.append(("order", i, f"rule {i}: /{regex.pattern}/ is listed before literal "
+                                          f"rule {later[0]} but runs after the literal pass"))
+        for j, pattern, _ in literals:
+            if pattern and regex.fullmatch(pattern):
+                conflicts.append(("overlap", i, f"rule {i}: /{regex.pattern}/ also matches "
+                                             f"{pattern!r} (rule {j})"))
+    return conflicts
+
+
+# === ENGINE ===
+def _touches(output, pattern):
+    """True if ``pattern`` can match inside ``output`` or across its edges."""
+    if pattern in output or (output in pattern and output != pattern):
+        return True
+    for k in range(1, min(len(output), len(pattern))):
+        if output[-k:] == pattern[:k] or output[:k] == pattern[-k:]:
+            return True
+    return False
+
+
+def _overlaps(a, b):
+    """True if an end of ``a`` can be the start of ``b`` or the other way round."""
+    return any(a[-k:] == b[:k] or b[-k:] == a[:k] for k in range(1, min(len(a), len(b))))
+
+
+def _independent(ordered, literals):
+    """True if running ``ordered`` as ``str.replace`` calls gives the same
+    text as one longest-match pass: no output may feed a later pattern and no
+    two patterns may partly overlap."""
+    for i, a in enumerate(ordered):
+        if any(_touches(literals[a], p) for p in ordered[i + 1:]):
+            return False
+        if any(_overlaps(a, b) for b in ordered[i + 1:]):
+            return False
+    return True
+
+
+class SubstitutionEngine:
+    """Applies an ordered rule set with single-pass semantics for all literals.
+
+    When no literal can create or hide a match for another, the rules are
+    compiled to a minimal ``str.replace`` plan (longest pattern first,
+    redundant rules dropped), which CPython runs faster than either a
+    ``str.translate`` table on non-ASCII text or a Python-level callback;
+    otherwise all literals share one longest-first alternation regex.
+    """
+
+    def __init__(self, rules, name="rules"):
+        self.name = name
+        self.rules = list(rules)
+        self.conflicts = find_conflicts(self.rules)
+        errors = [msg for kind, _, msg in self.conflicts if kind == "duplicate"]
+        if errors:
+            raise ValueError(f"{name}: " + "; ".join(errors))
+
+        # Redundant literals are dropped unless they decide a longest match.
+        multi_patterns = [r[0] for r in self.rules if not isinstance(r, RegexRule) and len(r[0]) > 1]
+        redundant = {self.rules[i][0] for kind, i, _ in self.conflicts if kind == "redundant"}
+        redundant = {p for p in redundant
+                     if not any(p != q and (p in q or q in p or _overlaps(p, q)) for q in multi_patterns)}
+        self.literals = {}
+        self.regexes = []
+        for rule in self.rules:
+            if isinstance(rule, RegexRule):
+                self.regexes.append((re.compile(rule.pattern), rule.replacement))
+            elif rule[0] not in redundant:
+                self.literals.setdefault(rule[0], rule[1])
+
+        self._replaces = None
+        self._pattern = None
+        ordered = sorted(self.literals, key=len, reverse=True)
+        if _independent(ordered, self.literals):
+            self._replaces = [(p, self.literals[p]) for p in ordered]
+        else:
+            self._pattern = re.compile("|".join(re.escape(p) for p in ordered))
+
+    @property
+    def mode(self):
+        if self._pattern is not None:
+            return "alternation"
+        return f"{len(self._replaces)} replaces"
+
+    def _lookup(self, match):
+        return self.literals[match.group()]
+
+    def apply(self, text):
+        if not text:
+            return text
+        if self._pattern is not None:
+            text = self._pattern.sub(self._lookup, text)
+        else:
+            for pattern, replacement in self._replaces:
+                text = text.replace(pattern, replacement)
+        for regex, replacement in self.regexes:
+            text = regex.sub(replacement, text)
+        return text
+
+    __call__ = apply
+
+    def apply_chained(self, text):
+        """Reference implementation: each rule as its own pass, in the given order."""
+        for rule in self.rules:
+            if isinstance(rule, RegexRule):
+                text = re.sub(rule.pattern, rule.replacement, text)
+            else:
+                text = text.replace(rule[0], rule[1])
+        return text
+
+
+# === SHARED ENGINES ===
+ocr_clean = SubstitutionEngine(OCR_CLEAN_RULES, "ocr_clean")
+clean_text_fixes = SubstitutionEngine(CLEAN_TEXT_RULES, "clean_text")
+csv_full_fixes = SubstitutionEngine(CSV_FULL_FIX_RULES, "csv_full_fixes")
+iast_ocr_typos = SubstitutionEngine(IAST_OCR_TYPO_RULES, "iast_ocr_typos")
+
+ENGINES = [ocr_clean, clean_text_fixes, csv_full_fixes, iast_ocr_typos]
+
+
+# === MAIN ===
+if __name__ == "__main__":
+    for engine in ENGINES:
+        print(f"{engine.name}: {len(engine.rules)} rules ({engine.mode})")
+        for kind, _, msg in engine.conflicts:
+            print(f"  ⚠️ {kind}: {msg}")
@@ -0,0 +1,210 @@
+import os
+import gzip
+import time
+import atexit
+import threading
+
+# Buffered append-only text files for side outputs (KenLM corpus, debug logs,
+# per-page AI text). Writes collect in memory and reach the file in one
+# append per flush: every FLUSH_LINES lines, on the first write FLUSH_SECONDS
+# after the last flush, on flush()/close(), and at interpreter exit. A flush holds an OS
+# file lock on "<path>.lock", so threads and worker processes appending to
+# the same path never interleave inside a flush. The lock file stays in place
+# (deleting it would race other writers); .gitignore keeps *.lock out of git.
+# With ``compress`` each flush appends a gzip member; gzip.open() and zcat
+# read the concatenated members back as one stream.
+
+# === CONFIGURATION ===
+FLUSH_LINES = 1000
+FLUSH_SECONDS = 5.0
+BACKUPS = 3          # rotated files kept as <path>.1 (newest) … <path>.N
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+_OPEN_SINKS = set()        # unclosed sinks, flushed at exit
+_SHARED = {}
+
+
+class TextSink:
+    """Thread- and process-safe buffered writer for one text file.
+
+    ``write`` takes text like a file object, so it can replace an
+    ``open(path, "w")`` handle. ``truncate=True`` starts the file empty.
+    ``max_bytes`` rotates the file to ``<path>.1`` before a flush that
+    would exceed it.
+    """
+
+    def __init__(self, path, truncate=False, flush_lines=FLUSH_LINES, flush_seconds=FLUSH_SECONDS,
+                 max_bytes=None, backups=BACKUPS, compress=None, encoding="utf-8"):
+        self.path = path
+        self.flush_lines = flush_lines
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self.encoding = encoding
+        self.flushes = 0
+        self.bytes_written = 0
+        self.closed = False
+        self._buffer = []
+        self._lines = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        _OPEN_SINKS.add(self)
+        if truncate:
+            self.truncate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Writing ---
+    def write(self, text):
+        if self.closed:
+            raise ValueError(f"write to closed sink {self.path}")
+        with self._lock:
+            self._check_fork()
+            self._buffer.append(text)
+            self._lines += text.count("\n")
+            if self._lines >= self.flush_lines or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush_locked()
+        return len(text)
+
+    def write_line(self, line):
+        self.write(line + "\n")
+
+    def flush(self):
+        with self._lock:
+            self._check_fork()
+            self._flush_locked()
+
+    def close(self):
+        if not self.closed:
+            self.flush()
+            self.closed = True
+            _OPEN_SINKS.discard(self)
+
+    def truncate(self):
+        """Drops anything buffered and empties the file (rotated backups are kept)."""
+        with self._lock, self._file_lock():
+            self._buffer.clear()
+            self._lines = 0
+            open(self.path, "wb").close()
+
+    # --- Internals ---
+    def _check_fork(self):
+        # A forked child inherits the parent's buffer; the parent flushes it.
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._buffer.clear()
+            self._lines = 0
+
+    def _file_lock(self):
+        return _FileLock(self.path + ".lock")
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        data = "".join(self._buffer).encode(self.encoding)
+        self._buffer.clear()
+        self._lines = 0
+        if self.compress:
+            data = gzip.compress(data)
+        with self._file_lock():
+            if self.max_bytes and os.path.exists(self.path):
+                size = os.path.getsize(self.path)
+                if size and size + len(data) > self.max_bytes:
+                    self._rotate()
+            with open(self.path, "ab") as f:
+                f.write(data)
+        self.flushes += 1
+        self.bytes_written += len(data)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class _FileLock:
+    """Exclusive OS lock on a side file, held across one flush or rotation."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a+b")
+        _lock_file(self.file)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            _unlock_file(self.file)
+        finally:
+            self.file.close()
+
+
+# === SHARED SINKS ===
+def open_sink(path, **kwargs):
+    """One sink per path for the whole process, so every caller shares its buffer."""
+    key = os.path.abspath(path)
+    sink = _SHARED.get(key)
+    if sink is None or sink.closed:
+        sink = _SHARED[key] = TextSink(path, **kwargs)
+    return sink
+
+
+def iter_lines(path, include_backups=True):
+    """Lines of a sink's file, oldest rotated backup first; reads gzip output too."""
+    paths = []
+    if include_backups:
+        directory, name = os.path.split(os.path.abspath(path))
+        numbered = [f for f in os.listdir(directory) if f.startswith(name + ".") and f[len(name) + 1:].isdigit()]
+        paths = [os.path.join(directory, f) for f in sorted(numbered, key=lambda f: -int(f[len(name) + 1:]))]
+    if os.path.exists(path):
+        paths.append(path)
+    for p in paths:
+        with open(p, "rb") as probe:
+            compressed = probe.read(2) == b"\x1f\x8b"
+        opener = gzip.open if compressed else open
+        with opener(p, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+@atexit.register
+def _flush_all():
+    for sink in list(_OPEN_SINKS):
+        try:
+            sink.close()
+        except Exception as e:
+            print(f"⚠️ Could not flush {sink.path}: {e}")
@@ -0,0 +1,260 @@
+import re
+from functools import lru_cache
+
+import regex
+from indic_transliteration import sanscript
+from indic_transliteration.sanscript.schemes import roman
+
+# === CONFIGURATION ===
+WORD_CACHE_SIZE = 100_000
+
+_SPACE = re.compile(r"(\s+)")
+
+
+# === COMPILED TABLES ===
+class _SideTable:
+    """Output side of one indic_transliteration SchemeMap, flattened into plain dicts."""
+
+    def __init__(self, scheme_map):
+        self.vowels = scheme_map.vowels
+        self.vowel_marks = scheme_map.vowel_marks
+        self.consonants = scheme_map.consonants
+        self.others = scheme_map.non_marks_viraama
+        self.virama = scheme_map.virama.get("", "")
+        self.to_roman = scheme_map.to_scheme.is_roman
+        self.accent_pattern = None
+        if not self.to_roman and scheme_map.accents:
+            self.accent_pattern = regex.compile("([%s])([%s])" % (
+                "".join(scheme_map.accents.values()), "".join(scheme_map.to_scheme["yogavaahas"])))
+
+
+class _CompiledMap:
+    """One SchemeMap as a token trie plus its output tables; ``compiled(word)`` matches
+    ``transliterate(word, scheme_map=...)``."""
+
+    def __init__(self, scheme_map):
+        self.scheme_map = scheme_map
+        self.side = _SideTable(scheme_map)
+        # The library writes a standalone "oṃ" as ॐ when reading IAST-like schemes.
+        self.fix_om = None
+        if scheme_map.from_scheme.name in roman.CAPITALIZABLE_SCHEME_IDS:
+            self.fix_om = scheme_map.to_scheme.fix_om
+        self.trie = {}
+        for token in scheme_map.non_marks_viraama:
+            node = self.trie
+            for ch in token:
+                node = node.setdefault(ch, {})
+            node[""] = token
+
+    def _longest_match(self, text, i):
+        node = self.trie
+        match = None
+        j = i
+        while j < len(text) and text[j] in node:
+            node = node[text[j]]
+            j += 1
+            if "" in node:
+                match = node[""]
+        return match
+
+    def _tokenize(self, word):
+        """Splits a word into scheme tokens; unknown characters become ``(None, ch)``."""
+        tokens = []
+        i = 0
+        while i < len(word):
+            token = self._longest_match(word, i)
+            if token is None:
+                tokens.append((None, word[i]))
+                i += 1
+            else:
+                tokens.append((token, token))
+                i += len(token)
+        return tokens
+
+    def _render(self, tokens):
+        side = self.side
+        buf = []
+        had_consonant = False
+        for token, raw in tokens:
+            if token is None:
+                if had_consonant:
+                    buf.append(side.virama)
+                buf.append(raw)
+                had_consonant = False
+                continue
+            if had_consonant and token in side.vowels:
+                mark = side.vowel_marks.get(token, "")
+                if mark:
+                    buf.append(mark)
+                elif side.to_roman:
+                    buf.append(side.vowels[token])
+            else:
+                if had_consonant:
+                    buf.append(side.virama)
+                buf.append(side.others[token])
+            had_consonant = token in side.consonants
+        if had_consonant:
+            buf.append(side.virama)
+        result = "".join(buf)
+        if side.accent_pattern is not None:
+            result = side.accent_pattern.sub("\\2\\1", result)
+        return result
+
+    def __call__(self, word):
+        result = self._render(self._tokenize(word))
+        if self.fix_om is not None:
+            result = self.fix_om(result)
+        return result
+
+
+class DualTransliterator:
+    """ITRANS → (IAST, Devanagari) from compiled scheme tables.
+
+    The Devanagari side is rendered from the IAST, as in the old
+    ``transliterate(transliterate(text, ITRANS, IAST), IAST, DEVANAGARI)``,
+    so IAST diacritics already in the OCR text ("pramāṇaḥ") come out as
+    Devanagari too. The tables come from indic_transliteration's own scheme
+    maps and the output rules mirror its roman mapper; they are compiled once
+    instead of being walked twice per line, and every distinct word is
+    converted only once (LRU memo). check_against_library() compares the
+    two on real lines.
+    """
+
+    def __init__(self, source=sanscript.ITRANS):
+        self.source = source
+        self.to_iast = _CompiledMap(sanscript.SchemeMap(sanscript.SCHEMES[source], sanscript.SCHEMES[sanscript.IAST]))
+        self.to_devanagari = _CompiledMap(sanscript.SchemeMap(sanscript.SCHEMES[sanscript.IAST],
+                                                              sanscript.SCHEMES[sanscript.DEVANAGARI]))
+        self.word = lru_cache(maxsize=WORD_CACHE_SIZE)(self._word)
+
+    def _word(self, word):
+        iast = self.to_iast(word)
+        return iast, self.to_devanagari(iast)
+
+    def convert(self, text):
+        """Returns ``(iast, devanagari)`` for a line of ITRANS text."""
+        if not text:
+            return "", ""
+        iast, deva = [], []
+        for part in _SPACE.split(text):
+            if not part or part.isspace():
+                iast.append(part)
+                deva.append(part)
+                continue
+            a, b = self.word(part)
+            iast.append(a)
+            deva.append(b)
+        return "".join(iast), "".join(deva)
+
+
+# === INLINE WORD GLOSSARY ===
+_AFFIXED_WORD = re.compile(r"(\W*)(\w+)(\W*)")
+
+
+def iast_to_devanagari(text):
+    return sanscript.transliterate(text, sanscript.IAST, sanscript.DEVANAGARI)
+
+
+class InlineTransliterator:
+    """Swaps known roman words in a line for their IAST and Devanagari forms.
+
+    ``mapping`` is roman → IAST (e.g. feedback.roman_to_iast_dict). Both
+    tables are built once, so the cost per line depends only on its length:
+    split on whitespace, then one memoised lookup per token. Matching follows
+    the old per-word code: the word part of a token (punctuation stripped
+    from both ends) is looked up as written, then lower-cased, and whitespace
+    is collapsed to single spaces.
+    """
+
+    def __init__(self, mapping, to_devanagari=iast_to_devanagari):
+        self.iast = dict(mapping)
+        self.devanagari = {}
+        for iast in self.iast.values():
+            if iast and iast not in self.devanagari:
+                self.devanagari[iast] = to_devanagari(iast)
+        self.token = lru_cache(maxsize=WORD_CACHE_SIZE)(self._token)
+
+    @staticmethod
+    def _lookup(table, word):
+        return table.get(word) or table.get(word.lower())
+
+    def _token(self, token):
+        match = _AFFIXED_WORD.fullmatch(token)
+        if match is None:
+            return token, token
+        prefix, word, suffix = match.groups()
+        iast = self._lookup(self.iast, word) or word
+        devanagari = self._lookup(self.devanagari, iast) or iast
+        return prefix + iast + suffix, prefix + devanagari + suffix
+
+    def convert(self, line):
+        """Returns ``(iast_line, devanagari_line)``."""
+        pairs = [self.token(token) for token in line.split()]
+        return " ".join(p[0] for p in pairs), " ".join(p[1] for p in pairs)
+
+
+# === MODULE-LEVEL HELPERS ===
+_ITRANS = None
+
+def _itrans():
+    global _ITRANS
+    if _ITRANS is None:
+        _ITRANS = DualTransliterator(sanscript.ITRANS)
+    return _ITRANS
+
+def itrans_to_iast_devanagari(text):
+    """ITRANS line → (IAST, Devanagari); the Devanagari is rendered from the IAST."""
+    return _itrans().convert(text)
+
+def itrans_to_iast(text):
+    return _itrans().convert(text)[0]
+
+def itrans_to_devanagari(text):
+    return _itrans().convert(text)[1]
+
+def cache_info():
+    return _itrans().word.cache_info()
+
+def clear_cache():
+    _itrans().word.cache_clear()
+
+
+# === REGRESSION CHECK ===
+CHECK_FILES = ["nyaya_book_final_output.txt", "nyaya_final_hybrid_output.txt", "nyaya_final_cropped_output.txt",
+               "nyaya_ai_only_output.txt",
+               "nyaya_final_perfect_output.txt", "ai_cleaned_output.txt", "data.txt"]
+
+
+def _library_pair(text):
+    iast = sanscript.transliterate(text, sanscript.ITRANS, sanscript.IAST)
+    return iast, sanscript.transliterate(iast, sanscript.IAST, sanscript.DEVANAGARI)
+
+
+def check_against_library(lines, show=5):
+    """Compares itrans_to_iast_devanagari with the old double library call; returns the mismatches."""
+    mismatches = []
+    for line in lines:
+        expected = _library_pair(line)
+        got = itrans_to_iast_devanagari(line)
+        if got != expected:
+            mismatches.append((line, got, expected))
+    if mismatches:
+        print(f"❌ {len(mismatches)}/{len(lines)} lines differ from the library")
+        for line, got, expected in mismatches[:show]:
+            print(f"   {line!r}\n     got      {got!r}\n     expected {expected!r}")
+    else:
+        print(f"✅ {len(lines)} lines match the library")
+    return mismatches
+
+
+if __name__ == "__main__":
+    import os
+
+    lines = []
+    for name in CHECK_FILES:
+        if os.path.exists(name):
+            with open(name, encoding="utf-8") as f:
+                lines.extend(line.rstrip("\n") for line in f if line.strip())
+        else:
+            print(f"⚠️ {name} not found, skipping")
+    check_against_library(lines)
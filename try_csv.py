@@ -4,6 +4,7 @@ import re
 from pathlib import Path
 from pdf2image import convert_from_path
 import pytesseract
+from verse_parser import try_csv_tokenizer, BLANK, CHAPTER, SUTRA, VERSE, DEVANAGARI, SYNONYMS, TRANSLATION
 
 # ------------------ Config ------------------
 PDF_PATH = r"C:\Users\divya\Desktop\New folder\pdf2.pdf"
@@ -72,19 +73,26 @@ def extract_text_from_pdf(pdf_path):
         full_text.append(text)
     return '\n'.join(full_text)
 
+# Which field each token kind's line is appended to; other text goes to sutra_translation.
+SECTION_FIELDS = {
+    VERSE: "sb_verse_roman",
+    DEVANAGARI: "sb_verse_devanagari",
+    SYNONYMS: "sb_verse_synonyms",
+    TRANSLATION: "sb_verse_translation",
+}
+
 def parse_sections(raw_text):
     sections = []
-    lines = raw_text.split('\n')
-    current_chapter = detect_chapter_title(lines)
+    tokens = try_csv_tokenizer(raw_text)
+    current_chapter = next((line.title() for kind, line in tokens if kind == CHAPTER), "")
     subchapter = ""
-    current = {}
+    current = None
     
-    for line in lines:
-        line = line.strip()
-        if not line: continue
+    for kind, line in tokens:
+        if kind == BLANK: continue
 
         # Chapter detection
-        if detect_chapter_title([line]):
+        if kind == CHAPTER:
             current_chapter = line.title()
             continue
 
@@ -92,7 +100,7 @@ def parse_sections(raw_text):
         if line.istitle() and len(line.split()) < 10:
             subchapter = line
 
-        if re.match(r'^\d+\.\d+\.\d+', line):
+        if kind == SUTRA:
             if current: sections.append(current)
             current = {
                 "Chapter Title": current_chapter,
@@ -105,16 +113,8 @@ def parse_sections(raw_text):
                 "sb_verse_synonyms": "",
                 "sb_verse_translation": ""
             }
-        elif "॥" in line or re.search(r'\b(vasudeve|dharmah|om)\b', line.lower()):
-            current["sb_verse_roman"] += " " + line
-        elif re.search(r'[\u0900-\u097F]', line):  # Devanagari
-            current["sb_verse_devanagari"] += " " + line
-        elif '--' in line:  # Synonyms
-            current["sb_verse_synonyms"] += " " + line
-        elif 'translation' in line.lower() or 'meaning' in line.lower() or 'rendering' in line.lower():
-            current["sb_verse_translation"] += " " + line
-        else:
-            current["sutra_translation"] += " " + line
+        elif current is not None:  # lines before the first sutra have no section
+            current[SECTION_FIELDS.get(kind, "sutra_translation")] += " " + line
 
     if current:
         sections.append(current)
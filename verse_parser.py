@@ -0,0 +1,78 @@
+import re
+from collections import namedtuple
+
+# Line tokenizer shared by the verse parsers (csv_for5.extract_verses,
+# try_csv.parse_sections). Every line is stripped and classified exactly
+# once into a ``LineToken``; the parsers then run a small state machine over
+# the token kinds instead of re-matching the raw lines in nested loops.
+# A rule is ``(kind, predicate)`` on the stripped line and the first rule that
+# holds decides the kind, as in line_filter.
+
+LineToken = namedtuple("LineToken", "kind text")
+
+# === TOKEN KINDS ===
+BLANK = "blank"
+TEXT = "text"
+SUTRA = "sutra"              # verse number line, e.g. "1.1.2" or "2.3.4-5"
+SYNONYMS = "synonyms"        # word-for-word line: "word -- meaning"
+TRANSLATION = "translation"  # TRANSLATION marker (csv_for5) or translation line (try_csv)
+HEADING = "heading"          # all-caps sub-chapter heading
+CHAPTER = "chapter"          # CHAPTER / ADHYAYA heading
+VERSE = "verse"              # roman verse line marked by '॥' or a stock word
+DEVANAGARI = "devanagari"
+
+_SUTRA_SINGLE = re.compile(r"\d\.\d+\.\d+")
+_SUTRA = re.compile(r"\d+\.\d+\.\d+")
+_VERSE_WORDS = re.compile(r"\b(vasudeve|dharmah|om)\b")
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+
+
+# === RULE SETS ===
+# csv_for5: numbered sutra, synonyms, TRANSLATION marker, caps heading.
+FOR5_RULES = [
+    (SUTRA, lambda s: _SUTRA_SINGLE.match(s) is not None),
+    (SYNONYMS, lambda s: "--" in s),
+    (TRANSLATION, lambda s: s.upper().startswith("TRANSLATION")),
+    (HEADING, lambda s: s.isupper() and len(s.split()) > 3),
+]
+
+# try_csv: the first matching section wins, in the order parse_sections used.
+TRY_CSV_RULES = [
+    (CHAPTER, lambda s: s.isupper() and ("CHAPTER" in s or "ADHYAYA" in s)),
+    (SUTRA, lambda s: _SUTRA.match(s) is not None),
+    (VERSE, lambda s: "॥" in s or _VERSE_WORDS.search(s.lower()) is not None),
+    (DEVANAGARI, lambda s: _DEVANAGARI.search(s) is not None),
+    (SYNONYMS, lambda s: "--" in s),
+    (TRANSLATION, lambda s: any(w in s.lower() for w in ("translation", "meaning", "rendering"))),
+]
+
+
+# === TOKENIZER ===
+class LineTokenizer:
+    """Classifies lines with a rule list; blank lines are always ``BLANK``."""
+
+    def __init__(self, rules, default=TEXT):
+        self.rules = list(rules)
+        self.default = default
+
+    def classify(self, stripped):
+        if not stripped:
+            return BLANK
+        for kind, predicate in self.rules:
+            if predicate(stripped):
+                return kind
+        return self.default
+
+    def tokenize(self, text):
+        """``[LineToken]`` for every line of ``text``."""
+        tokens = []
+        for line in text.splitlines():
+            stripped = line.strip()
+            tokens.append(LineToken(self.classify(stripped), stripped))
+        return tokens
+
+    __call__ = tokenize
+
+
+for5_tokenizer = LineTokenizer(FOR5_RULES)
+try_csv_tokenizer = LineTokenizer(TRY_CSV_RULES)